@@ -142,6 +142,45 @@ export function RenderCalendarView(schedule, scheduleViewContainer, selectedDays
         return days;
     }
 
+    // Helper function to parse a days_and_times string into the meetings that
+    // Utils/ScheduleCompiler.py precomputes, for schedules that were not compiled
+    function parseMeetings(daysAndTimes) {
+        // Split the days and time range using regex to handle different dash types
+        // and extra spaces
+        const splitResult = daysAndTimes.trim().match(
+            /^([A-Za-z]+)\s+(\d{1,2}:\d{2}(?:AM|PM))\s*[-–—]\s*(\d{1,2}:\d{2}(?:AM|PM))$/i);
+        if (!splitResult) {
+            console.error(`Invalid days_and_times format: "${daysAndTimes}"`);
+            return [];
+        }
+
+        const [, daysStr, startTimeStr, endTimeStr] = splitResult;
+        const start = parseTime(startTimeStr);
+        const end = parseTime(endTimeStr);
+        if (start === null || end === null) {
+            console.error(
+                `Skipping section due to invalid time format: "${daysAndTimes}"`);
+            return [];
+        }
+
+        return extractDays(daysStr).map(day => {
+            return {day: validDays.indexOf(day), start, end, column: 0, columns: 1};
+        });
+    }
+
+    // Helper function to format minutes after midnight as "1:30PM", or "13:30"
+    // without the postfix
+    function formatMinutes(minutes, showPostfix) {
+        const hour = Math.floor(minutes / 60);
+        const minute = String(minutes % 60).padStart(2, '0');
+        if (!showPostfix) {
+            return `${String(hour).padStart(2, '0')}:${minute}`;
+        }
+        const meridiem = hour >= 12 ? 'PM' : 'AM';
+        const displayHour = hour % 12 === 0 ? 12 : hour % 12;
+        return `${displayHour}:${minute}${meridiem}`;
+    }
+
     // Generate time slots
     const timeSlots = generateTimeSlots(startTime, endTime, interval);
     const numberOfSlots = timeSlots.length;
@@ -238,40 +277,20 @@ export function RenderCalendarView(schedule, scheduleViewContainer, selectedDays
         }
 
         course.sections.forEach(section => {
-            // Correctly split the days and time range using regex to handle different
-            // dash types and extra spaces
-            const splitResult = section.daysAndTimes.trim().match(
-                /^([A-Za-z]+)\s+(\d{1,2}:\d{2}(?:AM|PM))\s*[-–—]\s*(\d{1,2}:\d{2}(?:AM|PM))$/i);
-            if (!splitResult) {
-                console.error(`Invalid days_and_times format: "${section.daysAndTimes}"`);
-                return;
-            }
-
-            const [, daysStr, startTimeStr, endTimeStr] = splitResult;
-
-            const days = extractDays(daysStr).filter(day => daysOfWeek.includes(day));
-            if (days.length === 0) {
-                return;
-            }
-
-            const startMinutes = parseTime(startTimeStr);
-            const endMinutes = parseTime(endTimeStr);
-
-            if (startMinutes === null || endMinutes === null) {
-                console.error(`Skipping section due to invalid time format: "${
-                    section.daysAndTimes}"`);
-                return;
-            }
-
-            const duration = endMinutes - startMinutes;
-            const span = duration / interval;
+            // Compiled schedules carry their meetings; otherwise parse them here
+            const meetings = section.meetings || parseMeetings(section.daysAndTimes);
 
-            days.forEach(day => {
+            meetings.forEach(meeting => {
+                const day = validDays[meeting.day];
                 const dayIndex = daysOfWeek.indexOf(day);
                 if (dayIndex === -1) {
                     return;  // Skip if day is not in the selected days
                 }
 
+                const startMinutes = meeting.start;
+                const endMinutes = meeting.end;
+                const span = (endMinutes - startMinutes) / interval;
+
                 // Calculate row index based on start time
                 const calendarStartMinutes = parseTime(startTime);
                 if (calendarStartMinutes === null) {
@@ -321,33 +340,8 @@ export function RenderCalendarView(schedule, scheduleViewContainer, selectedDays
                 }
 
                 if (showTime) {
-                    let newStart = startTimeStr;
-                    let newEnd = endTimeStr;
-                    if (!showTimePostfix) {
-                        const [startHour, startMinute, startMeridiem] =
-                            startTimeStr.match(/(\d{1,2}):(\d{2})(AM|PM)/i).slice(1);
-                        const [endHour, endMinute, endMeridiem] =
-                            endTimeStr.match(/(\d{1,2}):(\d{2})(AM|PM)/i).slice(1);
-
-                        const startHour24 = (startMeridiem.toUpperCase() === 'PM' &&
-                                             parseInt(startHour, 10) !== 12) ?
-                                                parseInt(startHour, 10) + 12 :
-                                            (startMeridiem.toUpperCase() === 'AM' &&
-                                             parseInt(startHour, 10) === 12) ?
-                                                0 :
-                                                parseInt(startHour, 10);
-                        const endHour24 = (endMeridiem.toUpperCase() === 'PM' &&
-                                           parseInt(endHour, 10) !== 12) ?
-                                              parseInt(endHour, 10) + 12 :
-                                          (endMeridiem.toUpperCase() === 'AM' &&
-                                           parseInt(endHour, 10) === 12) ?
-                                              0 :
-                                              parseInt(endHour, 10)
-
-                        newStart =
-                            `${String(startHour24).padStart(2, '0')}:${startMinute}`;
-                        newEnd = `${String(endHour24).padStart(2, '0')}:${endMinute}`;
-                    }
+                    const newStart = formatMinutes(startMinutes, showTimePostfix);
+                    const newEnd = formatMinutes(endMinutes, showTimePostfix);
                     classBlockContent += `${newStart} - ${newEnd}<br>`;
                 }
 
@@ -379,6 +373,16 @@ export function RenderCalendarView(schedule, scheduleViewContainer, selectedDays
 
                 classBlock.style.zIndex = 5000;
 
+                // Overlapping meetings share the cell side by side
+                if (meeting.columns > 1) {
+                    classBlock.style.left = `${(meeting.column / meeting.columns) * 100}%`;
+                    classBlock.style.right = 'auto';
+                    classBlock.style.width = `calc(${100 / meeting.columns}% - 2px)`;
+                }
+                if (meeting.conflict) {
+                    classBlock.classList.add('class-block-conflict');
+                }
+
                 // Append to the cell
                 targetCell.appendChild(classBlock);
             });
@@ -6,7 +6,7 @@
 export class Section {
 
     constructor(classNum, instructionMode, sectionNum, component, daysAndTimes, room,
-                instructor, startEndDate) {
+                instructor, startEndDate, meetings = null) {
 
         this.classNum = classNum;
         this.instructionMode = instructionMode;
@@ -16,6 +16,8 @@ export class Section {
         this.room = room;
         this.instructor = instructor;
         this.startEndDate = startEndDate;
+        // Weekday and minute intervals precomputed by Utils/ScheduleCompiler.py
+        this.meetings = meetings;
     }
 }
 
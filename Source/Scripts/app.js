@@ -10,6 +10,7 @@ import {InitializeAnimation} from './animation.js';
 import {initializeSignInMenu} from './auth.js';
 import {CreateCard, CreateFavoriteCard} from './cards.js';
 import {state} from './constants.js';
+import {AssetUrl, LoadAllLinks, LoadAssetManifest, LoadFavoriteLinks, LoadTaskManifest} from './data.js';
 import {initializeButtonEffects, initializeCardHoverEffects, initializeFavoritesIconHoverEffects, initializeHoverMenus, initializeNavIconsHoverEffects, initializeSwitchToggleEffects} from './effects.js';
 import {InitializeMessages} from './error.js';
 import {isLinkFavorited, loadFavorites, populateFavoritesContainers} from './favorites.js';
@@ -25,54 +26,37 @@ document.addEventListener('DOMContentLoaded', () => {
     // ==============================
     // Data Fetching and Initialization
     // ==============================
+    // The full link list is only fetched up front on pages that list every link
+    const needsAllLinks = document.getElementById('all-links-full-container') ||
+        document.getElementById('all-favorites-container');
     Promise
         .all([
-            fetch('../../Assets/JSON Files/tasks.json').then((response) => {
-                if (!response.ok) {
-                    return response.text().then((text) => {
-                        let errorDetails = text;
-                        try {
-                            const json = JSON.parse(text);
-                            errorDetails = JSON.stringify(json, null, 2);
-                        } catch (e) {
-                            // If not JSON, keep plain text
-                        }
-
-                        const detailedErrorMessage =
-                            `Failed to load tasks.json.\n` +
-                            `Status: ${response.status} ${response.statusText}\n` +
-                            `Details:\n${errorDetails}`;
-
-                        console.error(detailedErrorMessage);
-                        displayErrorMessage(detailedErrorMessage);
-
-                        return Promise.reject(new Error('Failed to load tasks.json'));
-                    });
-                }
-                return response.json();
-            }),
-            fetch('../../../Assets/JSON Files/classSchedules.json').then((response) => {
-                if (!response.ok) {
-                    return response.text().then((text) => {
-                        const detailedErrorMessage =
-                            `Failed to load classSchedules.json\n` +
-                            `Status: ${response.status} ${response.statusText}\n` +
-                            `Details:\n${text}`;
-
-                        console.error(detailedErrorMessage);
-                        displayErrorMessage(detailedErrorMessage);
-
-                        return Promise.reject(
-                            new Error('Failed to load classSchedules.json'));
-                    });
-                }
-                return response.json();
-            })
+            LoadTaskManifest().then(
+                () => (needsAllLinks ? LoadAllLinks() : LoadFavoriteLinks())),
+            LoadAssetManifest()
+                .then(() => fetch(
+                    AssetUrl('../../Assets/JSON Files/compiledSchedules.json')))
+                .then((response) => {
+                    if (!response.ok) {
+                        return response.text().then((text) => {
+                            const detailedErrorMessage =
+                                `Failed to load compiledSchedules.json\n` +
+                                `Status: ${response.status} ${response.statusText}\n` +
+                                `Details:\n${text}`;
+
+                            console.error(detailedErrorMessage);
+                            displayErrorMessage(detailedErrorMessage);
+
+                            return Promise.reject(
+                                new Error('Failed to load compiledSchedules.json'));
+                        });
+                    }
+                    return response.json();
+                })
         ])
-        .then(([tasksData, schedulesData]) => {
-            // Successfully fetched both JSON files
-            // Parse tasksData into state
-            state.linksData = tasksData;
+        .then(([linksData, schedulesData]) => {
+            // Successfully fetched the links and schedules; data.js keeps
+            // state.linksData up to date as shards load
 
             // Initialize the state for class schedules
             state.classSchedules = {};
@@ -85,12 +69,16 @@ document.addEventListener('DOMContentLoaded', () => {
                                 sectionData.class_nbr, sectionData.instruction_mode,
                                 sectionData.section, sectionData.component,
                                 sectionData.days_and_times, sectionData.room,
-                                sectionData.instructor, sectionData.start_end_date);
+                                sectionData.instructor, sectionData.start_end_date,
+                                sectionData.meetings);
                         });
                         return new Class(courseData.course, courseData.status,
                                          courseData.units, courseData.grading, sections);
                     });
-                    state.classSchedules[uniqName] = {courses};
+                    state.classSchedules[uniqName] = {
+                        courses,
+                        conflicts: scheduleData.conflicts || []
+                    };
                 }
             }
 
@@ -126,10 +114,8 @@ document.addEventListener('DOMContentLoaded', () => {
 
         // Populate 'Most Popular'
         const mostPopularContainer = document.getElementById('most-popular-container');
-        if (mostPopularContainer && state.linksData.length > 0) {
-            const sortedByRank =
-                [...state.linksData].sort((a, b) => b.currentRating - a.currentRating);
-            const top4 = sortedByRank.slice(0, 4);
+        if (mostPopularContainer && state.featuredLinks.length > 0) {
+            const top4 = state.featuredLinks.slice(0, 4);
             top4.forEach((link) => {
                 const card = CreateCard(link);
                 mostPopularContainer.append(card);
@@ -164,22 +150,31 @@ document.addEventListener('DOMContentLoaded', () => {
 
         // Populate All Links on Index
         const allLinksContainer = document.getElementById('all-links-container');
-        if (allLinksContainer && state.linksData.length > 0) {
-            const sortedByRank =
-                [...state.linksData].sort((a, b) => b.currentRating - a.currentRating);
-            const top10 = sortedByRank.slice(0, 10);
-            const next30 = sortedByRank.slice(10, 40);
+        if (allLinksContainer && state.featuredLinks.length > 0) {
+            const top10 = state.featuredLinks.slice(0, 10);
 
             top10.forEach((link) => {
                 const card = CreateCard(link);
                 card.classList.add('initial-cards');
                 allLinksContainer.append(card);
             });
-            next30.forEach((link) => {
-                const card = CreateCard(link);
-                card.classList.add('additional-cards', 'hidden');
-                allLinksContainer.append(card);
-            });
+
+            // The rest sit behind 'Show more', so fetch them after first paint
+            LoadAllLinks().then(() => {
+                const sortedByRank = [...state.linksData].sort(
+                    (a, b) => b.currentRating - a.currentRating);
+                const next30 = sortedByRank.slice(10, 40);
+                const expanded =
+                    !document.getElementById('show-less')?.classList.contains('hidden');
+
+                next30.forEach((link) => {
+                    const card = CreateCard(link);
+                    card.classList.add('additional-cards');
+                    card.classList.toggle('hidden', !expanded);
+                    allLinksContainer.append(card);
+                });
+                initializeCardHoverEffects();
+            }).catch((error) => displayErrorMessage(error.message));
         }
 
         // Initialize Favorites in hero/nav
@@ -14,6 +14,48 @@ import {addCardToPinnedsContainers, addPinned, isLinkPinned, loadPinneds, popula
 // ==============================
 // UI Rendering Functions
 // ==============================
+/**
+ * Create the image of a card. Uses the sprite sheet when the link has a place in
+ * one, and otherwise a lazily loaded picture preferring the WebP variants.
+ * @param {Object} link - The link object.
+ * @returns {HTMLElement} - The image element.
+ */
+function createCardImage(link) {
+    if (link.imageSprite) {
+        const [x, y, width, height] = link.imageSprite.rect;
+        const sprite = document.createElement('span');
+        sprite.className = 'card-sprite';
+        sprite.setAttribute('role', 'img');
+        sprite.setAttribute('aria-label', link.alt);
+        sprite.style.width = `${width}px`;
+        sprite.style.height = `${height}px`;
+        sprite.style.backgroundImage = `image-set(url("${link.imageSprite.webp}") ` +
+            `type("image/webp"), url("${link.imageSprite.image}") type("image/png"))`;
+        sprite.style.backgroundPosition = `-${x}px -${y}px`;
+        return sprite;
+    }
+
+    const img = document.createElement('img');
+    img.src = link.image;
+    img.alt = link.alt;
+    img.loading = 'lazy';
+    img.decoding = 'async';
+    if (link.imageSrcset) {
+        img.srcset = link.imageSrcset;
+        img.width = link.imageWidth;
+        img.height = link.imageHeight;
+    }
+    if (!link.imageWebpSrcset) {
+        return img;
+    }
+    const picture = document.createElement('picture');
+    const source = document.createElement('source');
+    source.type = 'image/webp';
+    source.srcset = link.imageWebpSrcset;
+    picture.append(source, img);
+    return picture;
+}
+
 /**
  * Create a card element for a given link.
  * @param {Object} link - The link object.
@@ -35,10 +77,7 @@ export function CreateCard(link) {
     subHeader.className = 'sub-header';
     subHeader.textContent = link.applicationName;
     card.appendChild(subHeader);
-    const img = document.createElement('img');
-    img.src = link.image;
-    img.alt = link.alt;
-    card.appendChild(img);
+    card.appendChild(createCardImage(link));
     const star = document.createElement('span');
     star.className = 'favorite-star';
     if (isLinkFavorited(link)) {
@@ -152,10 +191,7 @@ export function CreateFavoriteCard(link) {
     subHeader.className = 'sub-header';
     subHeader.textContent = link.applicationName;
     card.appendChild(subHeader);
-    const img = document.createElement('img');
-    img.src = link.image;
-    img.alt = link.alt;
-    card.appendChild(img);
+    card.appendChild(createCardImage(link));
 
     card.style.transition = 'transform 0.3s ease';
 
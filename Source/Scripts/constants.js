@@ -12,6 +12,8 @@
 // ==============================
 export const state = {
     linksData: [],
+    featuredLinks: [],
+    taskManifest: null,
     sortByRating: true,
     favoriteStatuses: {},
     pinnedStatuses: {},
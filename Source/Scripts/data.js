@@ -0,0 +1,144 @@
+/**
+ * FILE: data.js
+ * Loads link data lazily from the task manifest and shards written by ParseTasks.
+ *
+ * The manifest is small and carries the featured links, so the first page renders
+ * from it alone. Shards are fetched on demand, and state.linksData always holds the
+ * loaded shards in manifest order, which is tasks.json order once all are loaded.
+ *
+ * When Utils/AssetManifest.py has been run, every asset is fetched under its
+ * content-hashed name from the asset manifest, which is the only file revalidated.
+ */
+
+import {FAVORITES_KEY, PINNED_KEY, state} from './constants.js';
+
+const ASSET_MANIFEST_URL = '../../Assets/assetManifest.json';
+const DATA_DIR = '../../Assets/JSON Files/';
+
+let hashedUrls = {};
+let assetManifestRequest = null;
+
+const shardLinks = [];
+const shardRequests = [];
+
+/**
+ * Load the asset manifest once. Without one, assets keep their plain names.
+ * @returns {Promise<Object>} The hashed URL of each asset by its plain URL.
+ */
+export function LoadAssetManifest() {
+    if (!assetManifestRequest) {
+        assetManifestRequest =
+            fetch(ASSET_MANIFEST_URL, {cache: 'no-cache'})
+                .then((response) => (response.ok ? response.json() : {}))
+                .catch(() => ({}))
+                .then((manifest) => {
+                    hashedUrls = manifest;
+                    return manifest;
+                });
+    }
+    return assetManifestRequest;
+}
+
+/**
+ * Return the content-hashed URL of an asset, or its plain URL if it has none.
+ * @param {string} url - Plain URL of the asset.
+ * @returns {string} The URL to fetch.
+ */
+export function AssetUrl(url) {
+    return hashedUrls[url] || url;
+}
+
+/**
+ * Fetch a JSON file from the data directory, rejecting with the response details
+ * if it cannot be loaded.
+ * @param {string} file - Path of the file relative to the data directory.
+ * @returns {Promise<Object>} The parsed JSON.
+ */
+function fetchJson(file) {
+    return fetch(AssetUrl(DATA_DIR + file)).then((response) => {
+        if (!response.ok) {
+            return response.text().then((text) => {
+                const detailedErrorMessage = `Failed to load ${file}.\n` +
+                    `Status: ${response.status} ${response.statusText}\n` +
+                    `Details:\n${text}`;
+                console.error(detailedErrorMessage);
+                return Promise.reject(new Error(`Failed to load ${file}`));
+            });
+        }
+        return response.json();
+    });
+}
+
+/**
+ * Load the asset manifest, then the task manifest into state.taskManifest and
+ * state.featuredLinks.
+ * @returns {Promise<Object>} The manifest.
+ */
+export function LoadTaskManifest() {
+    return LoadAssetManifest().then(() => fetchJson('taskManifest.json')).then((manifest) => {
+        state.taskManifest = manifest;
+        state.featuredLinks = manifest.featured;
+        return manifest;
+    });
+}
+
+/**
+ * Load shards by id, then rebuild state.linksData from every loaded shard.
+ * Each shard is only fetched once.
+ * @param {Array<number>} shardIds - Ids of the shards to load.
+ * @returns {Promise<Array<Object>>} The updated state.linksData.
+ */
+export function LoadShards(shardIds) {
+    if (!state.taskManifest) {
+        return Promise.resolve(state.linksData);
+    }
+    const requests = shardIds.map((shardId) => {
+        if (!shardRequests[shardId]) {
+            shardRequests[shardId] =
+                fetchJson(state.taskManifest.shards[shardId].file).then((links) => {
+                    shardLinks[shardId] = links;
+                });
+        }
+        return shardRequests[shardId];
+    });
+    return Promise.all(requests).then(() => {
+        state.linksData = state.taskManifest.shards.flatMap(
+            (shard, shardId) => shardLinks[shardId] || []);
+        return state.linksData;
+    });
+}
+
+/**
+ * Load the shards holding links that are favorited or pinned in localStorage, or
+ * favorites by default, which is all the first page needs besides the manifest.
+ * @returns {Promise<Array<Object>>} The updated state.linksData.
+ */
+export function LoadFavoriteLinks() {
+    const uniqueKeys = new Set(state.taskManifest.favorites);
+    [FAVORITES_KEY, PINNED_KEY].forEach((storageKey) => {
+        try {
+            const statuses = JSON.parse(localStorage.getItem(storageKey)) || {};
+            for (const uniqueKey in statuses) {
+                if (statuses[uniqueKey]) {
+                    uniqueKeys.add(uniqueKey);
+                }
+            }
+        } catch (e) {
+            // Unreadable statuses are reported when favorites and pinned load
+        }
+    });
+
+    const shardIds = new Set();
+    uniqueKeys.forEach((uniqueKey) => {
+        (state.taskManifest.keys[uniqueKey] || []).forEach((id) => shardIds.add(id));
+    });
+    return LoadShards([...shardIds]);
+}
+
+/**
+ * Load every shard, so state.linksData holds all links.
+ * @returns {Promise<Array<Object>>} The complete state.linksData.
+ */
+export function LoadAllLinks() {
+    return LoadShards(state.taskManifest.shards.map((shard, shardId) => shardId));
+}
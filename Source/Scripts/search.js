@@ -8,6 +8,87 @@
 // ==============================
 
 import {state} from './constants.js';
+import {AssetUrl, LoadAllLinks, LoadAssetManifest} from './data.js';
+
+const SEARCH_INDEX_URL = '../../Assets/JSON Files/searchIndex.json';
+const MAX_SUGGESTIONS = 5;
+
+let searchIndex = null;
+let searchIndexRequest = null;
+
+/**
+ * Fetch the search index built by ParseTasks once, keeping it in searchIndex.
+ * Suggestions fall back to scanning state.linksData until it and every link
+ * shard have loaded, or if it cannot be loaded.
+ * @returns {Promise<Object|null>} The search index, or null if unavailable.
+ */
+function loadSearchIndex() {
+    if (!searchIndexRequest) {
+        searchIndexRequest =
+            LoadAssetManifest()
+                .then(() => fetch(AssetUrl(SEARCH_INDEX_URL)))
+                .then(response => (response.ok ? response.json() : null))
+                .then(index => {
+                    searchIndex = index;
+                    return index;
+                })
+                .catch(() => null);
+    }
+    return searchIndexRequest;
+}
+
+/**
+ * Find the links whose title or application name contains the query by
+ * looking up its grams in the search index. Mirrors Query in
+ * Utils/SearchIndex.py and returns the same links, in the same order, as
+ * scanLinks.
+ * @param {Object} index - The search index.
+ * @param {string} query - The trimmed, lowercased query.
+ * @param {number} limit - Maximum number of links to return.
+ * @returns {Array<Object>} The matching links.
+ */
+function queryIndex(index, query, limit) {
+    const gramSize = index.gramSize;
+    let postings = null;
+    if (query.length <= gramSize) {
+        postings = index.postings[query] || [];
+    } else {
+        for (let start = 0; start + gramSize <= query.length; start++) {
+            const gramPostings = index.postings[query.slice(start, start + gramSize)];
+            if (!gramPostings)
+                return [];
+            if (!postings || gramPostings.length < postings.length)
+                postings = gramPostings;
+        }
+    }
+
+    const results = [];
+    let docId = 0;
+    for (const delta of postings) {
+        docId += delta;
+        if (query.length <= gramSize || index.text[docId].includes(query)) {
+            results.push(state.linksData[docId]);
+            if (results.length === limit)
+                break;
+        }
+    }
+    return results;
+}
+
+/**
+ * Find the links whose title or application name contains the query by
+ * scanning every link.
+ * @param {string} query - The trimmed, lowercased query.
+ * @param {number} limit - Maximum number of links to return.
+ * @returns {Array<Object>} The matching links.
+ */
+function scanLinks(query, limit) {
+    const filtered = state.linksData.filter(
+        link => (link.title && link.title.toLowerCase().includes(query)) ||
+                (link.applicationName &&
+                 link.applicationName.toLowerCase().includes(query)));
+    return filtered.slice(0, limit);
+}
 
 /**
  * Setup search suggestions for an input element.
@@ -23,6 +104,11 @@ export function SetupSearchSuggestions(inputElement, suggestionsContainer) {
     const formElement = inputElement.closest('form');
     const searchButton = formElement?.querySelector('button');
     searchButton?.addEventListener('click', onSearchButtonClick);
+    // Suggestions need every link and the index; failures are already logged
+    inputElement.addEventListener('focus', () => {
+        LoadAllLinks().catch(() => {});
+        loadSearchIndex();
+    }, {once: true});
 
     function onInput() {
         const query = inputElement.value.trim().toLowerCase();
@@ -30,11 +116,11 @@ export function SetupSearchSuggestions(inputElement, suggestionsContainer) {
             hideSuggestions();
             return;
         }
-        const filtered = state.linksData.filter(
-            link => (link.title && link.title.toLowerCase().includes(query)) ||
-                    (link.applicationName &&
-                     link.applicationName.toLowerCase().includes(query)));
-        buildSuggestions(query, filtered.slice(0, 5));
+        // Only trust the index once every link it was built from has loaded
+        const results = searchIndex && searchIndex.text.length === state.linksData.length ?
+            queryIndex(searchIndex, query, MAX_SUGGESTIONS) :
+            scanLinks(query, MAX_SUGGESTIONS);
+        buildSuggestions(query, results);
     }
 
     function buildSuggestions(query, results) {
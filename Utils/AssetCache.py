@@ -0,0 +1,239 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+from pathlib import Path
+from typing import Any
+
+try:
+    import fcntl
+except ImportError:  # Windows; concurrent saves then rely on merging alone
+    fcntl = None
+
+
+class AssetCache:
+    """
+    On-disk cache of tool outputs keyed on input content hash and tool parameters.
+
+    File outputs are stored once per content hash under blobs/, small results such
+    as metadata are stored inline in the manifest. Entries are evicted least recently
+    used first once the stored bytes exceed maxBytes. Input hashes are remembered by
+    path, size and modification time so unchanged files are not re-read.
+
+    Use as a context manager, or call Save, to write the manifest back. Several
+    processes may share a cache directory: Save merges in entries others saved since
+    this cache was opened.
+    """
+
+    def __init__(
+        self,
+        cacheDir: Path = Path(__file__).resolve().parent / ".assetcache",
+        maxBytes: int = 512 * 1024 * 1024,
+    ):
+        self.cacheDir: Path = Path(cacheDir)
+        self.blobDir: Path = self.cacheDir / "blobs"
+        self.manifestPath: Path = self.cacheDir / "manifest.json"
+        self.maxBytes: int = maxBytes
+
+        self.hits: int = 0
+        self.misses: int = 0
+        self.bytesSaved: int = 0
+        self.openedAt: float = time.time()
+
+        manifest = self._LoadManifest()
+        self.entries: dict[str, dict[str, Any]] = manifest.get("entries", {})
+        self.fileHashes: dict[str, list] = manifest.get("files", {})
+
+    def _LoadManifest(self) -> dict[str, Any]:
+        try:
+            with open(self.manifestPath, "r") as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return {}
+
+    def __enter__(self) -> "AssetCache":
+        return self
+
+    def __exit__(self, *excInfo) -> None:
+        self.Save()
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.entries
+
+    def FileHash(self, filePath: Path) -> str:
+        """
+        Return the SHA-256 of a file, reusing the last hash if its size and mtime match.
+        """
+        stat = os.stat(filePath)
+        pathKey = str(Path(filePath).resolve())
+        known = self.fileHashes.get(pathKey)
+        if known is not None and known[:2] == [stat.st_size, stat.st_mtime_ns]:
+            return known[2]
+
+        digest = hashlib.sha256()
+        with open(filePath, "rb") as file:
+            for chunk in iter(lambda: file.read(1024 * 1024), b""):
+                digest.update(chunk)
+        fileHash = digest.hexdigest()
+        self.fileHashes[pathKey] = [stat.st_size, stat.st_mtime_ns, fileHash]
+        return fileHash
+
+    def Key(self, tool: str, inputHash: str, params: dict[str, Any]) -> str:
+        """
+        Build the cache key for running tool with params on content with inputHash.
+        """
+        keyData = json.dumps([tool, inputHash, params], sort_keys=True, default=str)
+        return hashlib.sha256(keyData.encode("utf-8")).hexdigest()
+
+    def GetFile(self, key: str, outputPath: Path) -> bool:
+        """
+        Restore a cached output file to outputPath, returning False on a miss.
+
+        The file is only copied when outputPath does not already hold the cached content.
+        """
+        entry = self.entries.get(key)
+        blobPath = self.blobDir / entry["blob"] if entry and "blob" in entry else None
+        if blobPath is None or not blobPath.exists():
+            self.misses += 1
+            return False
+
+        outputPath = Path(outputPath)
+        if not (
+            outputPath.exists()
+            and outputPath.stat().st_size == entry["size"]
+            and self.FileHash(outputPath) == entry["blob"]
+        ):
+            outputPath.parent.mkdir(parents=True, exist_ok=True)
+            shutil.copyfile(blobPath, outputPath)
+            self.FileHash(outputPath)
+
+        entry["lastUsed"] = time.time()
+        self.hits += 1
+        self.bytesSaved += entry["size"]
+        return True
+
+    def PutFile(self, key: str, outputPath: Path) -> None:
+        """
+        Store the output file a tool produced for key.
+        """
+        blobHash = self.FileHash(outputPath)
+        blobPath = self.blobDir / blobHash
+        if not blobPath.exists():
+            self.blobDir.mkdir(parents=True, exist_ok=True)
+            # Other processes and threads may be storing the same blob
+            tempPath = blobPath.with_suffix(
+                f".{os.getpid()}.{threading.get_ident()}.tmp"
+            )
+            shutil.copyfile(outputPath, tempPath)
+            os.replace(tempPath, blobPath)
+        self.entries[key] = {
+            "blob": blobHash,
+            "size": blobPath.stat().st_size,
+            "lastUsed": time.time(),
+        }
+
+    def GetValue(self, key: str) -> Any:
+        """
+        Return the cached JSON value for key, or None on a miss.
+        """
+        entry = self.entries.get(key)
+        if entry is None or "value" not in entry:
+            self.misses += 1
+            return None
+        entry["lastUsed"] = time.time()
+        self.hits += 1
+        self.bytesSaved += entry["size"]
+        return entry["value"]
+
+    def PutValue(self, key: str, value: Any) -> None:
+        """
+        Store a JSON-serializable value for key.
+        """
+        self.entries[key] = {
+            "value": value,
+            "size": len(json.dumps(value)),
+            "lastUsed": time.time(),
+        }
+
+    def Evict(self) -> None:
+        """
+        Drop least recently used entries until the stored bytes fit in maxBytes, then
+        delete blobs no entry refers to.
+        """
+        blobSizes = {}
+        valueBytes = 0
+        for entry in self.entries.values():
+            if "blob" in entry:
+                blobSizes[entry["blob"]] = entry["size"]
+            else:
+                valueBytes += entry["size"]
+        totalBytes = valueBytes + sum(blobSizes.values())
+
+        if totalBytes > self.maxBytes:
+            blobRefs = {}
+            for entry in self.entries.values():
+                if "blob" in entry:
+                    blobRefs[entry["blob"]] = blobRefs.get(entry["blob"], 0) + 1
+            for key, entry in sorted(
+                self.entries.items(), key=lambda item: item[1]["lastUsed"]
+            ):
+                if totalBytes <= self.maxBytes:
+                    break
+                del self.entries[key]
+                if "blob" not in entry:
+                    totalBytes -= entry["size"]
+                    continue
+                blobRefs[entry["blob"]] -= 1
+                if not blobRefs[entry["blob"]]:
+                    totalBytes -= entry["size"]
+
+        if self.blobDir.exists():
+            liveBlobs = {
+                entry["blob"] for entry in self.entries.values() if "blob" in entry
+            }
+            for blobPath in self.blobDir.iterdir():
+                # Newer blobs may belong to a process that has not saved yet
+                if (
+                    blobPath.name not in liveBlobs
+                    and blobPath.stat().st_mtime < self.openedAt
+                ):
+                    blobPath.unlink(missing_ok=True)
+
+    def Save(self) -> None:
+        """
+        Merge in entries saved by other processes, evict down to maxBytes and write
+        the manifest.
+        """
+        self.cacheDir.mkdir(parents=True, exist_ok=True)
+        with open(self.cacheDir / "lock", "w") as lockFile:
+            if fcntl is not None:
+                fcntl.flock(lockFile, fcntl.LOCK_EX)
+            saved = self._LoadManifest()
+            for key, entry in saved.get("entries", {}).items():
+                known = self.entries.get(key)
+                if known is None or known["lastUsed"] < entry["lastUsed"]:
+                    self.entries[key] = entry
+            for path, known in saved.get("files", {}).items():
+                self.fileHashes.setdefault(path, known)
+
+            self.Evict()
+            self.fileHashes = {
+                path: known
+                for path, known in self.fileHashes.items()
+                if os.path.exists(path)
+            }
+            tempPath = self.manifestPath.with_suffix(f".{os.getpid()}.tmp")
+            with open(tempPath, "w") as file:
+                json.dump({"entries": self.entries, "files": self.fileHashes}, file)
+            os.replace(tempPath, self.manifestPath)
+
+    def Report(self) -> str:
+        """
+        Summarize cache hits, misses and bytes saved since the cache was opened.
+        """
+        return (
+            f"Cache: {self.hits} hits, {self.misses} misses,"
+            f" {self.bytesSaved / (1024 * 1024):.2f} MiB saved"
+        )
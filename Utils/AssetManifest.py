@@ -0,0 +1,144 @@
+import argparse
+import hashlib
+import json
+import shutil
+from contextlib import nullcontext
+from pathlib import Path
+from typing import Any
+
+from AssetCache import AssetCache
+
+REPO_DIR: Path = Path(__file__).resolve().parent.parent
+ASSETS_DIR: Path = REPO_DIR / "Assets"
+HASHED_DIR: Path = ASSETS_DIR / "Hashed"
+MANIFEST_PATH: Path = ASSETS_DIR / "assetManifest.json"
+HASH_LENGTH: int = 10
+
+
+def WebPath(filePath: Path) -> str:
+    """
+    Return the path pages under Source use for a file in the repository.
+    """
+    return "../../" + filePath.relative_to(REPO_DIR).as_posix()
+
+
+def HashedName(filePath: Path, contentHash: str) -> str:
+    return f"{filePath.stem}.{contentHash[:HASH_LENGTH]}{filePath.suffix}"
+
+
+def RewriteReferences(value: Any, hashedPaths: dict[str, str]) -> Any:
+    """
+    Replace every asset path in a JSON value with its hashed path.
+
+    A string is rewritten if it is an asset path, or a srcset whose candidates are.
+    """
+    if isinstance(value, dict):
+        return {
+            key: RewriteReferences(item, hashedPaths) for key, item in value.items()
+        }
+    if isinstance(value, list):
+        return [RewriteReferences(item, hashedPaths) for item in value]
+    if not isinstance(value, str) or "../../" not in value:
+        return value
+    if value in hashedPaths:
+        return hashedPaths[value]
+    candidates = []
+    for candidate in value.split(", "):
+        url, _, descriptor = candidate.partition(" ")
+        candidates.append(
+            " ".join(filter(None, [hashedPaths.get(url, url), descriptor]))
+        )
+    return ", ".join(candidates)
+
+
+def BuildAssetManifest(
+    assetsDir: Path = ASSETS_DIR,
+    hashedDir: Path = HASHED_DIR,
+    cache: AssetCache | None = None,
+) -> dict[str, str]:
+    """
+    Copy every asset to a name fingerprinted by its content hash and map the original
+    paths to the fingerprinted ones.
+
+    Media are copied as they are. JSON files first have the asset paths in them
+    rewritten to the fingerprinted paths, so their hash covers the files they point
+    to, and are written minified. Fingerprinted files no longer in use are deleted.
+
+    Parameters:
+    - assetsDir: Directory of the assets to fingerprint.
+    - hashedDir: Directory the fingerprinted files are written to.
+    - cache: Reuse file hashes of unchanged media from this cache.
+
+    Returns:
+    - The fingerprinted page path of each asset by its original page path.
+    """
+    hashedDir.mkdir(parents=True, exist_ok=True)
+    assetPaths = sorted(
+        path
+        for path in assetsDir.rglob("*")
+        if path.is_file()
+        and hashedDir not in path.parents
+        and path != MANIFEST_PATH
+        and not any(part.startswith(".") for part in path.relative_to(assetsDir).parts)
+    )
+
+    hashedPaths = {}
+    written = set()
+    for assetPath in assetPaths:
+        if assetPath.suffix == ".json":
+            continue
+        if cache is not None:
+            contentHash = cache.FileHash(assetPath)
+        else:
+            contentHash = hashlib.sha256(assetPath.read_bytes()).hexdigest()
+        hashedPath = hashedDir / HashedName(assetPath, contentHash)
+        if not hashedPath.exists():
+            shutil.copyfile(assetPath, hashedPath)
+        hashedPaths[WebPath(assetPath)] = WebPath(hashedPath)
+        written.add(hashedPath.name)
+
+    # JSON files point at media; pages find the JSON they link to through the manifest
+    for assetPath in assetPaths:
+        if assetPath.suffix != ".json":
+            continue
+        with open(assetPath, "r") as file:
+            data = RewriteReferences(json.load(file), hashedPaths)
+        content = json.dumps(data, separators=(",", ":")).encode("utf-8")
+        hashedPath = hashedDir / HashedName(
+            assetPath, hashlib.sha256(content).hexdigest()
+        )
+        if not hashedPath.exists():
+            hashedPath.write_bytes(content)
+        hashedPaths[WebPath(assetPath)] = WebPath(hashedPath)
+        written.add(hashedPath.name)
+
+    for hashedPath in hashedDir.iterdir():
+        if hashedPath.name not in written:
+            hashedPath.unlink()
+    return hashedPaths
+
+
+def Main():
+    parser = argparse.ArgumentParser(
+        description="Fingerprint every asset by content hash and write the asset manifest."
+    )
+    parser.add_argument(
+        "--no-cache",
+        dest="cache",
+        action="store_false",
+        help="Rehash every file instead of reusing cached hashes.",
+    )
+    args = parser.parse_args()
+
+    with AssetCache() if args.cache else nullcontext() as cache:
+        hashedPaths = BuildAssetManifest(cache=cache)
+
+    tempPath = MANIFEST_PATH.with_suffix(".tmp")
+    with open(tempPath, "w") as file:
+        json.dump(hashedPaths, file, indent=4)
+    tempPath.replace(MANIFEST_PATH)
+    print(f"Fingerprinted {len(hashedPaths)} assets into {HASHED_DIR}")
+
+
+if __name__ == "__main__":
+    Main()
@@ -1,8 +1,16 @@
+import argparse
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+from functools import partial
 from pathlib import Path
 
+import numpy as np
 from PIL import Image
 from tqdm import tqdm
 
+from AssetCache import AssetCache
+
 
 def DeleteOldImages(imageDir: Path):
     oldImagePaths = list(imageDir.glob("Old*.png"))
@@ -10,30 +18,170 @@ def DeleteOldImages(imageDir: Path):
         oldImagePath.unlink()
 
 
-def RemoveWhiteBackground(imageDir: Path):
-    imagePaths = list(imageDir.glob("*.png"))
-    totalImages = len(imagePaths)
+def KeyWhiteBackground(
+    image: Image.Image, threshold: int = 200, softness: int = 0
+) -> Image.Image:
+    """
+    Make the near-white pixels of an image transparent.
 
-    oldDir = imageDir.parent / ("Old" + imageDir.name)
-    oldDir.mkdir(exist_ok=True)
+    Pixels whose red, green and blue are all above threshold become (255, 255, 255, 0).
+    With softness, pixels whose darkest channel is within softness levels at or below
+    threshold keep their colour but have their alpha ramped down towards the keyed
+    pixels, which softens the anti-aliased fringe.
+    """
+    rgba = np.array(image.convert("RGBA"))
+    darkest = rgba[..., :3].min(axis=2).astype(np.int16)
 
-    for imagePath in tqdm(imagePaths, desc="Processing images", total=totalImages):
-        image = Image.open(imagePath).convert("RGBA")
-        datas = image.getdata()
+    if softness > 0:
+        fringe = (darkest > threshold - softness) & (darkest <= threshold)
+        scale = (threshold - darkest[fringe]) / softness
+        rgba[..., 3][fringe] = (rgba[..., 3][fringe] * scale).astype(np.uint8)
 
-        newData = []
-        for item in datas:
-            if item[0] > 200 and item[1] > 200 and item[2] > 200:
-                newData.append((255, 255, 255, 0))
-            else:
-                newData.append(item)
+    rgba[darkest > threshold] = (255, 255, 255, 0)
+    return Image.fromarray(rgba, "RGBA")
 
-        image.putdata(newData)
-        newImagePath = imageDir / imagePath.name
-        image.save(newImagePath)
 
+def BackupOriginal(imagePath: Path, oldDir: Path | None) -> None:
+    """
+    Copy an image into oldDir unless a copy is already there, so repeated runs never
+    overwrite the backup with keyed output.
+    """
+    if oldDir is not None:
         oldImagePath = oldDir / imagePath.name
-        image.save(oldImagePath)
+        if not oldImagePath.exists():
+            shutil.copy2(imagePath, oldImagePath)
+
+
+def RemoveWhiteBackgroundFile(
+    imagePath: Path,
+    threshold: int = 200,
+    softness: int = 0,
+    oldDir: Path | None = None,
+) -> Path:
+    """
+    Key out the white background of one image in place, backing it up to oldDir first.
+    """
+    BackupOriginal(imagePath, oldDir)
+
+    with Image.open(imagePath) as image:
+        keyed = KeyWhiteBackground(image, threshold, softness)
+    keyed.save(imagePath)
+    return imagePath
+
+
+def RemoveWhiteBackground(
+    imageDir: Path,
+    threshold: int = 200,
+    softness: int = 0,
+    backup: bool = True,
+    workers: int | None = None,
+    cache: AssetCache | None = None,
+) -> list[Path]:
+    """
+    Key out the white background of every PNG in a directory across a process pool.
+
+    Originals are backed up to a sibling "Old<name>" directory unless backup is False.
+    With a cache, images whose content and parameters were processed before are
+    restored from the cache, or skipped if they already hold the keyed output.
+    """
+    imagePaths = list(imageDir.glob("*.png"))
+
+    oldDir = None
+    if backup:
+        oldDir = imageDir.parent / ("Old" + imageDir.name)
+        oldDir.mkdir(exist_ok=True)
+
+    misses = imagePaths
+    if cache is not None:
+        params = {"threshold": threshold, "softness": softness}
+        keys = {}
+        misses = []
+        for imagePath in imagePaths:
+            keys[imagePath] = cache.Key(
+                "RemoveWhiteBackground", cache.FileHash(imagePath), params
+            )
+            BackupOriginal(imagePath, oldDir)
+            if not cache.GetFile(keys[imagePath], imagePath):
+                misses.append(imagePath)
+
+    processed = []
+    if misses:
+        process = partial(
+            RemoveWhiteBackgroundFile,
+            threshold=threshold,
+            softness=softness,
+            oldDir=oldDir,
+        )
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            processed = list(
+                tqdm(
+                    executor.map(process, misses, chunksize=4),
+                    desc="Processing images",
+                    total=len(misses),
+                )
+            )
+
+    if cache is not None:
+        for imagePath in processed:
+            cache.PutFile(keys[imagePath], imagePath)
+            # Map the keyed content to itself so the next run skips it
+            keyedKey = cache.Key(
+                "RemoveWhiteBackground", cache.FileHash(imagePath), params
+            )
+            cache.PutFile(keyedKey, imagePath)
+    return imagePaths
+
+
+def Main():
+    parser = argparse.ArgumentParser(
+        description="Make the white background of PNG images transparent."
+    )
+    parser.add_argument(
+        "imageDir",
+        nargs="?",
+        type=Path,
+        default=Path(__file__).resolve().parent.parent / "Assets" / "Media" / "Current",
+        help="Directory of PNG images to process in place.",
+    )
+    parser.add_argument(
+        "--threshold",
+        type=int,
+        default=200,
+        help="Channel level above which a pixel counts as white.",
+    )
+    parser.add_argument(
+        "--softness",
+        type=int,
+        default=0,
+        help="Number of levels below the threshold to ramp alpha over.",
+    )
+    parser.add_argument(
+        "--no-backup",
+        dest="backup",
+        action="store_false",
+        help="Do not copy originals to the Old directory.",
+    )
+    parser.add_argument("--workers", type=int, help="Number of worker processes.")
+    parser.add_argument(
+        "--no-cache",
+        dest="cache",
+        action="store_false",
+        help="Reprocess every image instead of reusing cached results.",
+    )
+    args = parser.parse_args()
+
+    with AssetCache() if args.cache else nullcontext() as cache:
+        RemoveWhiteBackground(
+            args.imageDir,
+            args.threshold,
+            args.softness,
+            args.backup,
+            args.workers,
+            cache,
+        )
+        if cache is not None:
+            print(cache.Report())
 
 
-RemoveWhiteBackground(Path("../../../Assets/Media/Current"))
+if __name__ == "__main__":
+    Main()
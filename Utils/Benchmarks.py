@@ -0,0 +1,391 @@
+import argparse
+import io
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections.abc import Callable
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+from PIL import Image
+
+from BackgroundRemove import KeyWhiteBackground
+from ImageIndexer import SINKS, ImageMetadataExtractor
+from LineCounter import countLines
+from ParseTasks import ParseTasks
+from Vectorizer import PngToSvg
+
+REPO_DIR: Path = Path(__file__).resolve().parent.parent
+
+
+def SyntheticImage(size: int, colors: int, seed: int = 0) -> Image.Image:
+    """
+    Draw a size by size RGBA image of blocky regions in colors random opaque colours,
+    with a quarter of the blocks transparent and some near-white background.
+
+    Regions are 8 by 8 pixel blocks so the contiguous tracers have shapes to follow.
+    """
+    rng = np.random.default_rng(seed)
+    palette = rng.integers(0, 256, size=(colors, 4), dtype=np.uint8)
+    palette[:, 3] = 255
+    palette[0] = (250, 250, 250, 255)
+    blocks = -(-size // 8)
+    indices = rng.integers(0, colors, size=(blocks, blocks))
+    rgba = palette[indices]
+    rgba[rng.random((blocks, blocks)) < 0.25] = 0
+    rgba = rgba.repeat(8, axis=0).repeat(8, axis=1)[:size, :size]
+    return Image.fromarray(np.ascontiguousarray(rgba), "RGBA")
+
+
+def SyntheticExport(taskCount: int, collectionCount: int = 10, seed: int = 0) -> dict:
+    """
+    Build a task export shaped like currentTasks.json with taskCount tiles spread
+    over collectionCount collections.
+    """
+    rng = random.Random(seed)
+    words = ["Student", "Business", "Register", "Classes", "Pay", "Benefits", "Travel"]
+    collections = [
+        {"name": f"Collection {num}", "uniqueKey": f"collection-{num}", "tiles": []}
+        for num in range(collectionCount)
+    ]
+    for num in range(taskCount):
+        collection = collections[num % collectionCount]
+        collection["tiles"].append(
+            {
+                "task": {
+                    "taskId": num,
+                    "applicationName": " ".join(rng.sample(words, 2)),
+                    "averageRating": rng.randint(0, 5),
+                    "ratingCount": rng.randint(0, 500),
+                    "tabletHighResolutionImageCdnUrl": f"/media/task/{num}/high",
+                    "tabletLowResolutionImageCdnUrl": f"/media/task/{num}/low",
+                    "openInNewWindow": rng.random() < 0.5,
+                    "taskType": "REGULAR",
+                },
+                "favorite": rng.random() < 0.05,
+                "announcements": 0,
+                "collectionName": collection["name"],
+                "title": f"{' '.join(rng.sample(words, 3))} {num}",
+                "uniqueKey": f"task-{num}",
+            }
+        )
+    return {"taskCollections": collections}
+
+
+def SyntheticTree(root: Path, dirCount: int, filesPerDir: int, seed: int = 0) -> None:
+    """
+    Write dirCount package directories of source files under root, each with a
+    node_modules and a .git directory that tools walking the tree should prune.
+    """
+    rng = random.Random(seed)
+    extensions = (".py", ".js", ".html", ".css", ".txt")
+    for dirNum in range(dirCount):
+        sourceDir = root / f"package{dirNum}" / "src"
+        sourceDir.mkdir(parents=True)
+        for fileNum in range(filesPerDir):
+            filePath = sourceDir / f"file{fileNum}{rng.choice(extensions)}"
+            filePath.write_text("line\n" * rng.randint(1, 400))
+        for prunedName in ("node_modules", ".git"):
+            prunedDir = root / f"package{dirNum}" / prunedName
+            prunedDir.mkdir()
+            for fileNum in range(filesPerDir):
+                (prunedDir / f"pruned{fileNum}.js").write_text("line\n" * 100)
+
+
+def Measure(function: Callable[[], Any], repeat: int = 3) -> tuple[float, int]:
+    """
+    Time a function and measure its peak memory.
+
+    Returns:
+    - The fastest of repeat timed calls in seconds, and the peak bytes allocated
+      during one further call traced by tracemalloc, which is not timed since tracing
+      slows it down.
+    """
+    seconds = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        seconds = min(seconds, time.perf_counter() - start)
+
+    tracemalloc.start()
+    try:
+        function()
+        _, peakBytes = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return seconds, peakBytes
+
+
+def _ImageBenchmarks(
+    workDir: Path, sizes: tuple[int, ...], colorCounts: tuple[int, ...]
+):
+    for size in sizes:
+        for colors in colorCounts:
+            image = SyntheticImage(size, colors)
+            imagePath = workDir / f"image-{size}-{colors}.png"
+            image.save(imagePath)
+            params = {"size": size, "colors": colors}
+            megapixels = size * size / 1e6
+
+            yield "BackgroundRemove.KeyWhiteBackground", params, megapixels, "MP", (
+                lambda: KeyWhiteBackground(image, threshold=200, softness=20)
+            )
+            yield "Vectorizer.PngToSvg pixels", params, megapixels, "MP", (
+                lambda: PngToSvg(
+                    imagePath,
+                    opaque=True,
+                    merge="runs",
+                    output=io.StringIO(),
+                    progress=False,
+                )
+            )
+            yield "Vectorizer.PngToSvg contiguous", params, megapixels, "MP", (
+                lambda: PngToSvg(
+                    imagePath,
+                    contiguous=True,
+                    opaque=True,
+                    output=io.StringIO(),
+                    progress=False,
+                )
+            )
+
+
+def _DataBenchmarks(workDir: Path, taskCounts: tuple[int, ...], treeSize: int):
+    for taskCount in taskCounts:
+        exportDir = workDir / f"export-{taskCount}"
+        exportDir.mkdir()
+        export = SyntheticExport(taskCount)
+        exportPath = exportDir / "currentTasks.json"
+        exportPath.write_text(json.dumps(export))
+        imageData = {
+            tile["title"]: f"../../Assets/Media/{tile['uniqueKey']}.png"
+            for collection in export["taskCollections"]
+            for tile in collection["tiles"]
+        }
+        (exportDir / "imageData.json").write_text(json.dumps(imageData))
+        yield "ParseTasks.ParseTasks", {"tasks": taskCount}, taskCount, "tasks", (
+            lambda: ParseTasks(exportPath)
+        )
+
+    treeDir = workDir / "tree"
+    SyntheticTree(treeDir, treeSize, 20)
+    yield "LineCounter.countLines", {"files": treeSize * 20}, treeSize * 20, "files", (
+        lambda: countLines(treeDir, useCache=False)
+    )
+
+    # ImageMetadataExtractor reads every image under the included MPhotos directory
+    photoDir = workDir / "photos" / "MPhotos"
+    photoDir.mkdir(parents=True)
+    for num in range(treeSize):
+        exif = Image.Exif()
+        exif[0x010F] = "Synthetic"  # Make
+        exif[0x0132] = "2025:01:01 00:00:00"  # DateTime
+        SyntheticImage(64, 8, seed=num).convert("RGB").save(
+            photoDir / f"photo{num}.jpg", exif=exif
+        )
+    extractor = ImageMetadataExtractor(str(photoDir.parent), outputFormat="jsonl")
+
+    def IndexPhotos():
+        sink = SINKS["jsonl"](io.StringIO())
+        for record in extractor.Records():
+            sink.Write(record)
+        sink.Close()
+
+    yield "ImageIndexer.Records", {"images": treeSize}, treeSize, "images", IndexPhotos
+
+
+def SimplifySizes(
+    imagePath: Path = REPO_DIR / "Assets" / "Media" / "WolverineAccessBanner.png",
+) -> list[dict[str, Any]]:
+    """
+    Convert a real image to contiguous SVG with and without simplify, as traced and
+    after colour reduction, to check that simplifying never makes the SVG larger.
+
+    Returns:
+    - Per set of options, the "options" and the "bytes" of the SVG with them, and
+      the "plainBytes" of the SVG with the same options except simplify and curves.
+    """
+    sizes = []
+    for reduce in ({}, {"colors": 16, "minArea": 4}):
+        plain = io.StringIO()
+        PngToSvg(imagePath, contiguous=True, opaque=True, output=plain, **reduce)
+        for simplify in ({"simplify": 1}, {"simplify": 1, "curves": True}):
+            options = {**reduce, **simplify}
+            svg = io.StringIO()
+            PngToSvg(imagePath, contiguous=True, opaque=True, output=svg, **options)
+            sizes.append(
+                {
+                    "options": options,
+                    "bytes": len(svg.getvalue()),
+                    "plainBytes": len(plain.getvalue()),
+                }
+            )
+            print(
+                f"Vectorizer.PngToSvg simplify {options}: {sizes[-1]['bytes']} bytes,"
+                f" {sizes[-1]['plainBytes']} without simplify"
+            )
+    return sizes
+
+
+def GitCommit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            cwd=REPO_DIR,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def RunBenchmarks(
+    sizes: tuple[int, ...] = (128, 512, 1024),
+    colorCounts: tuple[int, ...] = (4, 64),
+    taskCounts: tuple[int, ...] = (1000, 10000),
+    treeSize: int = 200,
+    repeat: int = 3,
+    only: str | None = None,
+) -> dict[str, Any]:
+    """
+    Time every tool on synthetic inputs generated in a temporary directory.
+
+    Parameters:
+    - sizes: Widths and heights of the synthetic images.
+    - colorCounts: Numbers of colours in the synthetic images.
+    - taskCounts: Numbers of tasks in the synthetic task exports.
+    - treeSize: Number of directories in the synthetic source tree, and of photos.
+    - repeat: Number of timed calls per benchmark; the fastest is kept.
+    - only: Only run benchmarks whose name contains this.
+
+    Returns:
+    - The commit, environment and, per benchmark, its name, params, fastest
+      seconds, throughput in unit per second and peak traced memory in bytes.
+      Unless only excludes it, also the SimplifySizes of the banner.
+    """
+    results = []
+    with tempfile.TemporaryDirectory() as tempDir:
+        workDir = Path(tempDir)
+        benchmarks = [
+            _ImageBenchmarks(workDir, sizes, colorCounts),
+            _DataBenchmarks(workDir, taskCounts, treeSize),
+        ]
+        for group in benchmarks:
+            for name, params, amount, unit, function in group:
+                if only and only not in name:
+                    continue
+                seconds, peakBytes = Measure(function, repeat)
+                result = {
+                    "name": name,
+                    "params": params,
+                    "seconds": seconds,
+                    "throughput": amount / seconds,
+                    "unit": unit,
+                    "peakMemoryBytes": peakBytes,
+                }
+                print(
+                    f"{name} {params}: {seconds * 1e3:.1f}ms,"
+                    f" {result['throughput']:.1f} {unit}/s,"
+                    f" {peakBytes / (1024 * 1024):.1f} MiB peak"
+                )
+                results.append(result)
+
+    simplifySizes = []
+    if not only or only in "Vectorizer.PngToSvg simplify":
+        simplifySizes = SimplifySizes()
+
+    return {
+        "commit": GitCommit(),
+        "date": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "results": results,
+        "simplifySizes": simplifySizes,
+    }
+
+
+def Compare(baseline: dict[str, Any], current: dict[str, Any]) -> None:
+    """
+    Print the change in time and peak memory of each benchmark in both runs.
+    """
+    baselineResults = {
+        (result["name"], json.dumps(result["params"], sort_keys=True)): result
+        for result in baseline["results"]
+    }
+    print(f"\nCompared with {baseline.get('commit') or 'baseline'}:")
+    for result in current["results"]:
+        key = (result["name"], json.dumps(result["params"], sort_keys=True))
+        if key not in baselineResults:
+            continue
+        old = baselineResults[key]
+        print(
+            f"{result['name']} {result['params']}:"
+            f" time {result['seconds'] / old['seconds']:.2f}x,"
+            f" memory {result['peakMemoryBytes'] / max(1, old['peakMemoryBytes']):.2f}x"
+        )
+
+
+def Main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark the Utils tools on synthetic inputs."
+    )
+    parser.add_argument(
+        "--output",
+        type=Path,
+        default=Path(__file__).resolve().parent / "benchmarkResults.json",
+        help="JSON file to write the results to.",
+    )
+    parser.add_argument(
+        "--compare",
+        type=Path,
+        help="Results file of an earlier run to compare against.",
+    )
+    parser.add_argument("--only", help="Only run benchmarks whose name contains this.")
+    parser.add_argument(
+        "--quick",
+        action="store_true",
+        help="Use small inputs and a single timed call, for a fast check.",
+    )
+    args = parser.parse_args()
+
+    if args.quick:
+        results = RunBenchmarks(
+            sizes=(64, 256),
+            colorCounts=(4,),
+            taskCounts=(500,),
+            treeSize=20,
+            repeat=1,
+            only=args.only,
+        )
+    else:
+        results = RunBenchmarks(only=args.only)
+
+    with open(args.output, "w") as file:
+        json.dump(results, file, indent=4)
+    print(f"Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare, "r") as file:
+            Compare(json.load(file), results)
+
+    larger = [
+        size for size in results["simplifySizes"] if size["bytes"] > size["plainBytes"]
+    ]
+    for size in larger:
+        print(f"Simplifying made the SVG larger with {size['options']}")
+    if larger:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    Main()
@@ -0,0 +1,350 @@
+import argparse
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from fnmatch import fnmatch
+from pathlib import Path
+from typing import Any
+
+UTILS_DIR: Path = Path(__file__).resolve().parent
+REPO_DIR: Path = UTILS_DIR.parent
+STATE_PATH: Path = UTILS_DIR / ".buildstate.json"
+
+
+class Stage:
+    """
+    One step of the asset build: a Utils script run with arguments, reading the
+    files matching its input patterns and writing those matching its output patterns.
+
+    Patterns are globs relative to the repository. A stage may list the same
+    pattern as input and output when it rewrites files in place.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        command: list[str],
+        inputs: list[str],
+        outputs: list[str],
+    ):
+        self.name: str = name
+        self.command: list[str] = command
+        self.inputs: list[str] = inputs
+        self.outputs: list[str] = outputs
+
+    def Feeds(self, other: "Stage") -> bool:
+        """
+        Check if other reads any file this stage writes.
+        """
+        return other is not self and any(
+            output == pattern or fnmatch(output, pattern) or fnmatch(pattern, output)
+            for output in self.outputs
+            for pattern in other.inputs
+        )
+
+    def Signature(self) -> str:
+        """
+        Hash the command, the script and the path, size and mtime of every input and
+        output file, so any change to them, or a missing output, changes it.
+        """
+        files = {UTILS_DIR / self.command[0]}
+        for pattern in self.inputs + self.outputs:
+            files.update(path for path in REPO_DIR.glob(pattern) if path.is_file())
+        digest = hashlib.sha256(json.dumps(self.command).encode("utf-8"))
+        for path in sorted(files):
+            stat = path.stat()
+            entry = (
+                f"{path.relative_to(REPO_DIR)}\0{stat.st_size}\0{stat.st_mtime_ns}\n"
+            )
+            digest.update(entry.encode("utf-8"))
+        return digest.hexdigest()
+
+
+JSON_DIR: str = "Assets/JSON Files"
+
+STAGES: list[Stage] = [
+    Stage(
+        "backgrounds",
+        ["BackgroundRemove.py"],
+        inputs=["Assets/Media/Current/*.png"],
+        outputs=["Assets/Media/Current/*.png", "Assets/Media/OldCurrent/*.png"],
+    ),
+    Stage(
+        "banner",
+        ["Vectorizer.py"],
+        inputs=["Assets/Media/WolverineAccessBanner.png"],
+        outputs=["Assets/Media/WolverineAccessBanner.svg"],
+    ),
+    Stage(
+        "tiles",
+        ["TileImages.py"],
+        inputs=[f"{JSON_DIR}/imageData.json", "Assets/Media/Current/*.png"],
+        outputs=["Assets/Media/Tiles/*", f"{JSON_DIR}/imageVariants.json"],
+    ),
+    Stage(
+        "tasks",
+        ["ParseTasks.py"],
+        inputs=[
+            f"{JSON_DIR}/currentTasks.json",
+            f"{JSON_DIR}/imageData.json",
+            f"{JSON_DIR}/imageVariants.json",
+        ],
+        outputs=[
+            f"{JSON_DIR}/collections.json",
+            f"{JSON_DIR}/tasks.json",
+            f"{JSON_DIR}/searchIndex.json",
+            f"{JSON_DIR}/taskManifest.json",
+            f"{JSON_DIR}/Tasks/*",
+        ],
+    ),
+    Stage(
+        "schedules",
+        ["ScheduleCompiler.py"],
+        inputs=[f"{JSON_DIR}/classSchedules.json"],
+        outputs=[f"{JSON_DIR}/compiledSchedules.json"],
+    ),
+    Stage(
+        "imageIndex",
+        [
+            "ImageIndexer.py",
+            "--directory",
+            str(REPO_DIR / "Assets" / "Media"),
+            "--include-dirs",
+            "MPhotos",
+        ],
+        inputs=["Assets/Media/MPhotos/**/*"],
+        outputs=["Utils/ImageIndex.xml"],
+    ),
+    Stage(
+        "manifest",
+        ["AssetManifest.py"],
+        inputs=[
+            f"{JSON_DIR}/*",
+            f"{JSON_DIR}/**/*",
+            "Assets/Media/*",
+            "Assets/Media/**/*",
+        ],
+        outputs=["Assets/Hashed/*", "Assets/assetManifest.json"],
+    ),
+]
+
+
+def Dependencies(stages: list[Stage]) -> dict[str, list[str]]:
+    """
+    Return the names of the stages each stage reads outputs of, raising a ValueError
+    if they form a cycle.
+    """
+    dependencies = {
+        stage.name: [other.name for other in stages if other.Feeds(stage)]
+        for stage in stages
+    }
+    visiting, done = set(), set()
+
+    def Visit(name: str, path: list[str]) -> None:
+        if name in done:
+            return
+        if name in visiting:
+            cycle = path[path.index(name) :] + [name]
+            raise ValueError(f"Build stages form a cycle: {' -> '.join(cycle)}")
+        visiting.add(name)
+        for dependency in dependencies[name]:
+            Visit(dependency, path + [name])
+        done.add(name)
+
+    for name in dependencies:
+        Visit(name, [])
+    return dependencies
+
+
+def Select(
+    stages: list[Stage], dependencies: dict[str, list[str]], targets: list[str]
+) -> list[Stage]:
+    """
+    Return the target stages and every stage they depend on, in declaration order.
+    """
+    names = {stage.name for stage in stages}
+    unknown = [target for target in targets if target not in names]
+    if unknown:
+        raise ValueError(f"Unknown build stages: {', '.join(unknown)}")
+    selected = set()
+    pending = list(targets)
+    while pending:
+        name = pending.pop()
+        if name not in selected:
+            selected.add(name)
+            pending += dependencies[name]
+    return [stage for stage in stages if stage.name in selected]
+
+
+def RunStage(stage: Stage, verbose: bool = False) -> tuple[int, str, float]:
+    """
+    Run a stage's script from the Utils directory, as the scripts expect.
+
+    Returns:
+    - The exit code, the captured output unless verbose, in which case it goes
+      straight to the terminal, and the seconds the script took.
+    """
+    start = time.perf_counter()
+    completed = subprocess.run(
+        [sys.executable, *stage.command],
+        cwd=UTILS_DIR,
+        stdout=None if verbose else subprocess.PIPE,
+        stderr=None if verbose else subprocess.STDOUT,
+        text=True,
+    )
+    return completed.returncode, completed.stdout or "", time.perf_counter() - start
+
+
+def Build(
+    stages: list[Stage] = STAGES,
+    targets: list[str] | None = None,
+    force: bool = False,
+    jobs: int | None = None,
+    verbose: bool = False,
+    dryRun: bool = False,
+) -> list[dict[str, Any]]:
+    """
+    Run the stages that are out of date, each as soon as the stages it depends on
+    have finished, with independent stages running concurrently.
+
+    A stage is out of date when its signature differs from the one recorded after
+    it last succeeded, or when a stage it depends on ran in this build. Stages
+    depending on a failed stage are skipped.
+
+    Parameters:
+    - stages: Stages of the build.
+    - targets: Names of the stages to build along with their dependencies, or None
+      for every stage.
+    - force: Run every selected stage even if it is up to date.
+    - jobs: Most stages to run at once. Defaults to the CPU count.
+    - verbose: Show each stage's output as it runs instead of only on failure.
+    - dryRun: Only report which stages would run.
+
+    Returns:
+    - A record per selected stage with its "name", "status" ("ran", "failed",
+      "skipped", "upToDate" or "wouldRun") and "seconds".
+    """
+    dependencies = Dependencies(stages)
+    selected = Select(stages, dependencies, targets or [stage.name for stage in stages])
+    try:
+        with open(STATE_PATH, "r") as file:
+            state = json.load(file)
+    except (OSError, ValueError):
+        state = {}
+
+    statuses = {}
+    seconds = {}
+    waiting = list(selected)
+    running = {}
+    with ThreadPoolExecutor(max_workers=jobs or os.cpu_count()) as executor:
+        while waiting or running:
+            for stage in list(waiting):
+                upstream = [statuses.get(name) for name in dependencies[stage.name]]
+                if None in upstream:
+                    continue
+                if any(status in ("failed", "skipped") for status in upstream):
+                    statuses[stage.name] = "skipped"
+                elif (
+                    not force
+                    and all(status == "upToDate" for status in upstream)
+                    and state.get(stage.name) == stage.Signature()
+                ):
+                    statuses[stage.name] = "upToDate"
+                elif dryRun:
+                    statuses[stage.name] = "wouldRun"
+                else:
+                    print(f"Running {stage.name}: {' '.join(stage.command)}")
+                    running[executor.submit(RunStage, stage, verbose)] = stage
+                waiting.remove(stage)
+
+            if not running:
+                continue
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                stage = running.pop(future)
+                returnCode, output, seconds[stage.name] = future.result()
+                if returnCode == 0:
+                    statuses[stage.name] = "ran"
+                    state[stage.name] = stage.Signature()
+                    print(f"Finished {stage.name} in {seconds[stage.name]:.2f}s")
+                else:
+                    statuses[stage.name] = "failed"
+                    state.pop(stage.name, None)
+                    print(f"{output}Failed {stage.name} with exit code {returnCode}")
+
+    if not dryRun:
+        tempPath = STATE_PATH.with_suffix(".tmp")
+        with open(tempPath, "w") as file:
+            json.dump(state, file, indent=4)
+        os.replace(tempPath, STATE_PATH)
+    return [
+        {
+            "name": stage.name,
+            "status": statuses[stage.name],
+            "seconds": seconds.get(stage.name, 0.0),
+        }
+        for stage in selected
+    ]
+
+
+def Main():
+    parser = argparse.ArgumentParser(
+        description="Rebuild the site assets, running only the out of date stages."
+    )
+    parser.add_argument(
+        "targets",
+        nargs="*",
+        help="Stages to build along with the stages they depend on. Defaults to all.",
+    )
+    parser.add_argument(
+        "--force", action="store_true", help="Run every stage even if up to date."
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        help="Most stages to run at once. Defaults to the CPU count.",
+    )
+    parser.add_argument(
+        "--verbose",
+        action="store_true",
+        help="Show the output of every stage, not only of failed ones.",
+    )
+    parser.add_argument(
+        "--dry-run", action="store_true", help="Only list the stages that would run."
+    )
+    parser.add_argument(
+        "--list", action="store_true", help="List the stages and their dependencies."
+    )
+    args = parser.parse_args()
+
+    if args.list:
+        for name, names in Dependencies(STAGES).items():
+            print(f"{name}: {', '.join(names) or '-'}")
+        return
+
+    start = time.perf_counter()
+    try:
+        records = Build(
+            targets=args.targets,
+            force=args.force,
+            jobs=args.jobs,
+            verbose=args.verbose,
+            dryRun=args.dry_run,
+        )
+    except ValueError as e:
+        parser.error(str(e))
+
+    print()
+    for record in records:
+        print(f"{record['name']}: {record['status']}, {record['seconds']:.2f}s")
+    print(f"Total {time.perf_counter() - start:.2f}s")
+    if any(record["status"] in ("failed", "skipped") for record in records):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    Main()
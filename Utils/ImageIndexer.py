@@ -1,148 +1,868 @@
+import argparse
 import json
 import os
+import struct
+import threading
+import time
+from collections import deque
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
 from pathlib import Path
+from typing import TextIO
+from xml.sax.saxutils import escape
 
 from PIL import Image
 from PIL.ExifTags import TAGS
+from tqdm import tqdm
+
+from AssetCache import AssetCache
+
+DESIRED_TAGS: list[str] = [
+    "Make",
+    "Model",
+    "DateTime",
+    "Orientation",
+    "Artist",
+    "XResolution",
+    "YResolution",
+]
+
+# Byte size of each TIFF field type, by type id
+TIFF_TYPE_SIZES: dict[int, int] = {
+    1: 1,
+    2: 1,
+    3: 2,
+    4: 4,
+    5: 8,
+    6: 1,
+    7: 1,
+    8: 2,
+    9: 4,
+    10: 8,
+    11: 4,
+    12: 8,
+}
+
+# struct format of each numeric TIFF field type; rationals are two of these
+TIFF_TYPE_FORMATS: dict[int, str] = {
+    1: "B",
+    3: "H",
+    4: "I",
+    5: "I",
+    6: "b",
+    8: "h",
+    9: "i",
+    10: "i",
+    11: "f",
+    12: "d",
+}
+
+
+def ReadExifSegment(filePath: Path) -> bytes | None:
+    """
+    Return the raw TIFF-structured EXIF block of a JPEG, PNG or WebP file, or None if
+    it has none.
+
+    Only the segment headers are read: JPEG markers are skipped by their lengths up to
+    the start of scan, and PNG and WebP chunks are skipped by their lengths without
+    decoding any image data.
+    """
+    with open(filePath, "rb") as file:
+        signature = file.read(8)
+        if signature[:2] == b"\xff\xd8":
+            file.seek(2)
+            while True:
+                marker = file.read(2)
+                while marker[1:] == b"\xff":
+                    marker = marker[1:] + file.read(1)
+                if len(marker) < 2 or marker[0] != 0xFF or marker[1] in (0xD9, 0xDA):
+                    return None
+                lengthBytes = file.read(2)
+                if len(lengthBytes) < 2:
+                    return None
+                length = int.from_bytes(lengthBytes, "big")
+                if marker[1] == 0xE1:
+                    data = file.read(length - 2)
+                    if data.startswith(b"Exif\0\0"):
+                        return data[6:]
+                else:
+                    file.seek(length - 2, os.SEEK_CUR)
+        elif signature == b"\x89PNG\r\n\x1a\n":
+            while True:
+                header = file.read(8)
+                if len(header) < 8 or header[4:] == b"IEND":
+                    return None
+                length = int.from_bytes(header[:4], "big")
+                if header[4:] == b"eXIf":
+                    return file.read(length)
+                file.seek(length + 4, os.SEEK_CUR)
+        elif signature[:4] == b"RIFF" and file.read(4) == b"WEBP":
+            while True:
+                header = file.read(8)
+                if len(header) < 8:
+                    return None
+                length = int.from_bytes(header[4:], "little")
+                if header[:4] == b"EXIF":
+                    data = file.read(length)
+                    return data[6:] if data.startswith(b"Exif\0\0") else data
+                file.seek(length + (length & 1), os.SEEK_CUR)
+    return None
+
+
+def ParseExifTags(data: bytes, tagNames: dict[int, str]) -> dict[str, str]:
+    """
+    Read the wanted tags from the first IFD of a TIFF-structured EXIF block.
+
+    Values are formatted the way str() formats Pillow's decoded values: text without
+    its terminating NUL, rationals as floats, and multi-valued fields as tuples.
+    """
+    byteOrder = {b"II": "<", b"MM": ">"}.get(data[:2])
+    if byteOrder is None:
+        raise ValueError("Invalid TIFF byte order")
+    (ifdOffset,) = struct.unpack_from(byteOrder + "I", data, 4)
+    (entryCount,) = struct.unpack_from(byteOrder + "H", data, ifdOffset)
+
+    tags = {}
+    for entry in range(entryCount):
+        entryOffset = ifdOffset + 2 + 12 * entry
+        tag, fieldType, count = struct.unpack_from(byteOrder + "HHI", data, entryOffset)
+        if tag not in tagNames or fieldType not in TIFF_TYPE_SIZES:
+            continue
+        size = TIFF_TYPE_SIZES[fieldType] * count
+        if size > 4:
+            (valueOffset,) = struct.unpack_from(byteOrder + "I", data, entryOffset + 8)
+        else:
+            valueOffset = entryOffset + 8
+        raw = data[valueOffset : valueOffset + size]
+
+        if fieldType == 2:
+            if raw.endswith(b"\0"):
+                raw = raw[:-1]
+            value = raw.decode("latin-1", "replace")
+        elif fieldType == 7:
+            value = raw
+        elif fieldType in (5, 10):
+            parts = struct.unpack(
+                byteOrder + TIFF_TYPE_FORMATS[fieldType] * 2 * count, raw
+            )
+            values = tuple(
+                numerator / denominator if denominator else float("nan")
+                for numerator, denominator in zip(parts[::2], parts[1::2])
+            )
+            value = values[0] if count == 1 else values
+        else:
+            values = struct.unpack(
+                byteOrder + TIFF_TYPE_FORMATS[fieldType] * count, raw
+            )
+            value = values[0] if count == 1 else values
+        tags[tagNames[tag]] = str(value)
+    return tags
+
+
+# Side of the grid a perceptual hash compares; hashes have HASH_SIZE ** 2 bits
+HASH_SIZE: int = 8
+
+# Side of the grid of mean colours kept alongside each hash
+COLOR_GRID: int = 4
+
+
+def PerceptualHash(filePath: Path) -> tuple[int, bytes]:
+    """
+    Compute the difference hash of an image: shrink it to a greyscale grid one pixel
+    wider than HASH_SIZE and set a bit wherever a pixel is brighter than its left
+    neighbour. Re-encoding, resizing and small edits flip few bits, so the Hamming
+    distance between hashes measures how different two images look.
+
+    The hash only sees brightness, so the mean colour of each cell of a coarse grid
+    is returned as well, which tells recoloured copies of an image apart.
+
+    Transparent pixels are composited onto white first, so icons saved with and
+    without an alpha channel hash alike.
+
+    Parameters:
+    - filePath: Path to a raster image.
+
+    Returns:
+    - The hash as an integer of HASH_SIZE ** 2 bits.
+    - The colour signature: the RGB bytes of a COLOR_GRID by COLOR_GRID grid.
+    """
+    with Image.open(filePath) as image:
+        # JPEGs then decode at a fraction of their size
+        image.draft("RGB", (HASH_SIZE * 8, HASH_SIZE * 8))
+        if image.mode in ("RGBA", "LA", "PA") or "transparency" in image.info:
+            image = image.convert("RGBA")
+            background = Image.new("RGBA", image.size, "white")
+            image = Image.alpha_composite(background, image)
+        image = image.convert("RGB")
+        grid = image.convert("L").resize(
+            (HASH_SIZE + 1, HASH_SIZE), Image.Resampling.LANCZOS
+        )
+        colors = image.resize((COLOR_GRID, COLOR_GRID), Image.Resampling.BOX)
+    pixels = grid.tobytes()
+    imageHash = 0
+    for row in range(0, len(pixels), HASH_SIZE + 1):
+        for column in range(row, row + HASH_SIZE):
+            imageHash = (imageHash << 1) | (pixels[column + 1] > pixels[column])
+    return imageHash, colors.tobytes()
+
+
+def ColorDifference(colors: bytes, otherColors: bytes) -> int:
+    """
+    Return the largest difference of any channel of any cell of two colour
+    signatures from PerceptualHash.
+    """
+    return max(abs(a - b) for a, b in zip(colors, otherColors))
+
+
+class HashIndex:
+    """
+    Perceptual hashes of images by path, held in a BK-tree so the images within a
+    Hamming distance of a hash are found without comparing against every image.
+
+    Each node holds one distinct hash and the paths of the images with it, and its
+    children are keyed by their distance from it. By the triangle inequality, a
+    query within maxDistance of a hash at distance d from a node only descends into
+    the children keyed d - maxDistance to d + maxDistance.
+
+    Each image's colour signature is kept too, and images only count as near
+    duplicates when their colours also match.
+
+    Images are added and removed one at a time, so the index kept on disk is updated
+    in place as files change. A removed hash leaves its node behind to keep the tree
+    searchable, and the tree is rebuilt once most nodes are empty.
+    """
+
+    def __init__(self):
+        self.hashes: list[int] = []
+        self.paths: list[list[str]] = []
+        self.children: list[dict[int, int]] = []
+        self.pathHashes: dict[str, int] = {}
+        self.pathColors: dict[str, bytes] = {}
+        self._nodes: dict[int, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.pathHashes)
+
+    def Add(self, path: str, imageHash: int, colors: bytes) -> None:
+        """
+        Index the image at path under imageHash and its colour signature, replacing
+        any it had before.
+        """
+        if self.pathHashes.get(path) == imageHash:
+            self.pathColors[path] = colors
+            return
+        self.Remove(path)
+        self.pathHashes[path] = imageHash
+        self.pathColors[path] = colors
+
+        node = self._nodes.get(imageHash)
+        if node is None:
+            node = self._AddNode(imageHash)
+        self.paths[node].append(path)
+
+    def _AddNode(self, imageHash: int) -> int:
+        newNode = len(self.hashes)
+        self.hashes.append(imageHash)
+        self.paths.append([])
+        self.children.append({})
+        self._nodes[imageHash] = newNode
+
+        node = 0
+        while newNode:
+            distance = (self.hashes[node] ^ imageHash).bit_count()
+            child = self.children[node].get(distance)
+            if child is None:
+                self.children[node][distance] = newNode
+                break
+            node = child
+        return newNode
+
+    def Remove(self, path: str) -> bool:
+        """
+        Drop the image at path from the index, returning False if it was not in it.
+        """
+        imageHash = self.pathHashes.pop(path, None)
+        if imageHash is None:
+            return False
+        del self.pathColors[path]
+        self.paths[self._nodes[imageHash]].remove(path)
+        if len(self._nodes) > 2 * len(self.pathHashes) + 32:
+            self._Rebuild()
+        return True
+
+    def _Rebuild(self) -> None:
+        pathHashes, pathColors = self.pathHashes, self.pathColors
+        self.__init__()
+        for path, imageHash in pathHashes.items():
+            self.Add(path, imageHash, pathColors[path])
+
+    def _QueryNodes(self, imageHash: int, maxDistance: int) -> list[tuple[int, int]]:
+        matches = []
+        pending = [0] if self.hashes else []
+        while pending:
+            node = pending.pop()
+            distance = (self.hashes[node] ^ imageHash).bit_count()
+            if distance <= maxDistance and self.paths[node]:
+                matches.append((distance, node))
+            for childDistance, child in self.children[node].items():
+                if abs(childDistance - distance) <= maxDistance:
+                    pending.append(child)
+        return matches
+
+    def Query(
+        self,
+        imageHash: int,
+        maxDistance: int,
+        colors: bytes | None = None,
+        maxColorDifference: int = 16,
+    ) -> list[tuple[int, str]]:
+        """
+        Find the indexed images whose hashes are within maxDistance bits of imageHash
+        and, if colors is given, whose colour signatures are within
+        maxColorDifference of it.
+
+        Returns:
+        - (distance, path) of every match, nearest first.
+        """
+        return sorted(
+            (distance, path)
+            for distance, node in self._QueryNodes(imageHash, maxDistance)
+            for path in self.paths[node]
+            if colors is None
+            or ColorDifference(colors, self.pathColors[path]) <= maxColorDifference
+        )
+
+    def NearDuplicates(
+        self, maxDistance: int, maxColorDifference: int = 16
+    ) -> list[list[str]]:
+        """
+        Group the indexed images that are within maxDistance bits and
+        maxColorDifference levels of each other, directly or through a chain of near
+        duplicates.
+
+        Returns:
+        - Each group of two or more paths, sorted, with the groups sorted by their
+          first path.
+        """
+        parents = {path: path for path in self.pathHashes}
+
+        def Find(path: str) -> str:
+            while parents[path] != path:
+                parents[path] = parents[parents[path]]
+                path = parents[path]
+            return path
+
+        for node in set(self._nodes.values()):
+            for _, match in self._QueryNodes(self.hashes[node], maxDistance):
+                if match < node:
+                    continue
+                for path in self.paths[node]:
+                    for other in self.paths[match]:
+                        if (
+                            ColorDifference(
+                                self.pathColors[path], self.pathColors[other]
+                            )
+                            <= maxColorDifference
+                        ):
+                            parents[Find(other)] = Find(path)
+
+        groups = {}
+        for path in parents:
+            groups.setdefault(Find(path), []).append(path)
+        return sorted(sorted(paths) for paths in groups.values() if len(paths) > 1)
+
+    def Save(self, indexPath: Path) -> None:
+        """
+        Write the tree to indexPath as JSON, with hashes and colour signatures in
+        hex.
+        """
+        nodes = [
+            [f"{imageHash:x}", paths, children]
+            for imageHash, paths, children in zip(
+                self.hashes, self.paths, self.children
+            )
+        ]
+        tempPath = Path(indexPath).with_suffix(".tmp")
+        with open(tempPath, "w", encoding="utf-8") as file:
+            json.dump(
+                {
+                    "hashSize": HASH_SIZE,
+                    "colorGrid": COLOR_GRID,
+                    "nodes": nodes,
+                    "colors": {
+                        path: colors.hex() for path, colors in self.pathColors.items()
+                    },
+                },
+                file,
+            )
+        os.replace(tempPath, indexPath)
+
+    @classmethod
+    def Load(cls, indexPath: Path) -> "HashIndex":
+        """
+        Read a tree written by Save, or return an empty one if there is none or it
+        was built with another HASH_SIZE or COLOR_GRID.
+        """
+        index = cls()
+        try:
+            with open(indexPath, "r", encoding="utf-8") as file:
+                data = json.load(file)
+        except (OSError, ValueError):
+            return index
+        if data.get("hashSize") != HASH_SIZE or data.get("colorGrid") != COLOR_GRID:
+            return index
+        for node, (hexHash, paths, children) in enumerate(data["nodes"]):
+            imageHash = int(hexHash, 16)
+            index.hashes.append(imageHash)
+            index.paths.append(paths)
+            index.children.append(
+                {int(distance): child for distance, child in children.items()}
+            )
+            index._nodes[imageHash] = node
+            for path in paths:
+                index.pathHashes[path] = imageHash
+                index.pathColors[path] = bytes.fromhex(data["colors"][path])
+        return index
+
+
+class JsonLinesSink:
+    """
+    Write each image record as one line of compact JSON.
+    """
+
+    extension: str = "jsonl"
+
+    def __init__(self, file: TextIO):
+        self.file: TextIO = file
+
+    def Write(self, record: dict) -> None:
+        self.file.write(json.dumps(record, separators=(",", ":")) + "\n")
+
+    def Close(self) -> None:
+        pass
+
+
+class JsonSink:
+    """
+    Stream image records into a compact {"Images": [...]} JSON document.
+    """
+
+    extension: str = "json"
+
+    def __init__(self, file: TextIO):
+        self.file: TextIO = file
+        self.separator: str = ""
+        self.file.write('{"Images":[')
+
+    def Write(self, record: dict) -> None:
+        self.file.write(self.separator + json.dumps(record, separators=(",", ":")))
+        self.separator = ","
+
+    def Close(self) -> None:
+        self.file.write("]}\n")
+
+
+class XmlSink:
+    """
+    Stream image records into an <Images> XML document, escaping every value.
+    """
+
+    extension: str = "xml"
+
+    def __init__(self, file: TextIO):
+        self.file: TextIO = file
+        self.file.write('<?xml version="1.0" encoding="UTF-8"?>\n<Images>\n')
+
+    def Write(self, record: dict) -> None:
+        parts = [
+            "  <Image>\n",
+            f"    <Path>{escape(record['Path'])}</Path>\n",
+            f"    <Name>{escape(record['Name'])}</Name>\n",
+        ]
+        if "PerceptualHash" in record:
+            parts.append(
+                f"    <PerceptualHash>{record['PerceptualHash']}</PerceptualHash>\n"
+                f"    <ColorSignature>{record['ColorSignature']}</ColorSignature>\n"
+            )
+        metadata = record.get("Metadata")
+        if isinstance(metadata, dict):
+            parts.append("    <Metadata>\n")
+            for key, value in metadata.items():
+                parts.append(f"      <{key}>{escape(value)}</{key}>\n")
+            parts.append("    </Metadata>\n")
+        elif metadata is not None:
+            parts.append(f"    <Metadata>{escape(metadata)}</Metadata>\n")
+        parts.append("  </Image>\n")
+        self.file.write("".join(parts))
+
+    def Close(self) -> None:
+        self.file.write("</Images>\n")
+
+
+SINKS: dict[str, type] = {
+    sink.extension: sink for sink in (XmlSink, JsonSink, JsonLinesSink)
+}
 
 
 class ImageMetadataExtractor:
 
     def __init__(
-        self, directory: str, outputEmptyMetadata: bool = True, outputAsXml: bool = True
+        self,
+        directory: str,
+        outputEmptyMetadata: bool = True,
+        outputFormat: str = "xml",
+        cache: AssetCache | None = None,
+        includeDirs: tuple[str, ...] = ("MPhotos",),
+        workers: int | None = None,
+        verbose: bool = False,
+        perceptualHashes: bool = False,
+        excludeDirs: tuple[str, ...] = ("Tiles", "Hashed"),
     ):
         self.currentDir: Path = Path("..").resolve()
         self.directory: Path = self.currentDir / Path(directory)
-        self.supportedFormats: tuple[str, str, str, str] = (
+        self.supportedFormats: tuple[str, ...] = (
             ".jpeg",
             ".jpg",
             ".png",
             ".svg",
+            ".webp",
         )
-        self.outputFile: str = "ImageIndex." + ("xml" if outputAsXml else "json")
+        self.outputFile: str = "ImageIndex." + outputFormat
         self.outputEmptyMetadata: bool = outputEmptyMetadata
-        self.outputAsXml: bool = outputAsXml
+        self.outputFormat: str = outputFormat
+        self.cache: AssetCache | None = cache
+        self.includeDirs: tuple[str, ...] = includeDirs
+        self.excludeDirs: tuple[str, ...] = excludeDirs
+        self.workers: int | None = workers
+        self.verbose: bool = verbose
+        self.perceptualHashes: bool = perceptualHashes
+        self.hashIndexFile: str = "ImageHashes.json"
+        self.desiredTags: dict[int, str] = {
+            tag: name for tag, name in TAGS.items() if name in DESIRED_TAGS
+        }
+        self._cacheLock = threading.Lock()
 
     def ExtractMetadata(self) -> None:
-        if self.outputAsXml:
-            self._extractMetadataXml()
-        else:
-            self._extractMetadataJson()
-
-    def _extractMetadataXml(self) -> None:
-        with open(self.outputFile, "w") as file:
-            file.write('<?xml version="1.0" encoding="UTF-8"?>\n<Images>\n')
-            for root, _, files in os.walk(self.directory):
-                for fileName in files:
-                    if fileName.lower().endswith(self.supportedFormats):
-                        filePath: Path = Path(root) / fileName
-                        if "MPhotos" not in filePath.as_posix():
-                            continue
-                        relativePath: Path = filePath.relative_to(self.currentDir)
-                        metadata: dict[str, str] | str = self.GetImageMetadata(filePath)
-                        if (
-                            fileName.lower().endswith(".svg")
-                            or metadata == "No EXIF metadata found"
-                            or len(metadata) == 0
-                        ):
-                            if self.outputEmptyMetadata:
-                                file.write(
-                                    f"  <Image>\n    <Path>{relativePath}</Path>\n    <Name>{fileName}</Name>\n    <Metadata>None</Metadata>\n  </Image>\n\n"
-                                )
-                                print(
-                                    f"Path: {relativePath}\nName: {fileName}\nMetadata: None\n\n"
-                                )
-                            else:
-                                file.write(
-                                    f"  <Image>\n    <Path>{relativePath}</Path>\n    <Name>{fileName}</Name>\n  </Image>\n\n"
-                                )
-                                print(f"Path: {relativePath}\nName: {fileName}\n\n")
-                        else:
-                            metadataXml: str = "\n      ".join(
-                                [
-                                    f"<{key}>{value}</{key}>"
-                                    for key, value in metadata.items()
-                                ]
-                            )
-                            file.write(
-                                f"  <Image>\n    <Path>{relativePath}</Path>\n    <Name>{fileName}</Name>\n    <Metadata>\n      {metadataXml}\n    </Metadata>\n  </Image>\n\n"
-                            )
-                            print(
-                                f"Path: {relativePath}\nName: {fileName}\nMetadata: {metadataXml}\n\n"
-                            )
-            file.write("</Images>")
-
-    def _extractMetadataJson(self) -> None:
-        with open(self.outputFile, "w") as file:
-            images = []
-            for root, _, files in os.walk(self.directory):
-                for fileName in files:
-                    if fileName.lower().endswith(self.supportedFormats):
-                        filePath: Path = Path(root) / fileName
-                        if "MPhotos" not in filePath.as_posix():
-                            continue
-                        relativePath: Path = filePath.relative_to(self.currentDir)
-                        metadata: dict[str, str] | str = self.GetImageMetadata(filePath)
-                        if (
-                            fileName.lower().endswith(".svg")
-                            or metadata == "No EXIF metadata found"
-                            or len(metadata) == 0
-                        ):
-                            if self.outputEmptyMetadata:
-                                images.append(
-                                    {
-                                        "Path": str(relativePath),
-                                        "Name": fileName,
-                                        "Metadata": "None",
-                                    }
-                                )
-                                print(
-                                    f"Path: {relativePath}\nName: {fileName}\nMetadata: None\n\n"
-                                )
-                            else:
-                                images.append(
-                                    {"Path": str(relativePath), "Name": fileName}
-                                )
-                                print(f"Path: {relativePath}\nName: {fileName}\n\n")
-                        else:
-                            images.append(
-                                {
-                                    "Path": str(relativePath),
-                                    "Name": fileName,
-                                    "Metadata": metadata,
-                                }
-                            )
-                            print(
-                                f"Path: {relativePath}\nName: {fileName}\nMetadata: {metadata}\n\n"
-                            )
-            json.dump({"Images": images}, file, indent=4)
+        """
+        Write the index to outputFile through the sink for outputFormat, one record
+        at a time. Only a progress bar is shown unless verbose is set, in which case
+        each record is also printed on one line.
+
+        With perceptualHashes set, the hash index in hashIndexFile is also brought up
+        to date: images that are new or changed are added and images no longer found
+        are removed.
+        """
+        imageHashes = {}
+        with open(self.outputFile, "w", encoding="utf-8") as file:
+            sink = SINKS[self.outputFormat](file)
+            for record in tqdm(
+                self.Records(), desc="Indexing images", disable=self.verbose
+            ):
+                sink.Write(record)
+                if "PerceptualHash" in record:
+                    imageHashes[record["Path"]] = (
+                        int(record["PerceptualHash"], 16),
+                        bytes.fromhex(record["ColorSignature"]),
+                    )
+                if self.verbose:
+                    print(json.dumps(record))
+            sink.Close()
+
+        if self.perceptualHashes:
+            hashIndex = HashIndex.Load(self.hashIndexFile)
+            for path in list(hashIndex.pathHashes):
+                if path not in imageHashes:
+                    hashIndex.Remove(path)
+            for path, (imageHash, colors) in imageHashes.items():
+                hashIndex.Add(path, imageHash, colors)
+            hashIndex.Save(self.hashIndexFile)
+
+    def Records(self) -> Iterator[dict]:
+        """
+        Yield the index record of every image: its Path and Name, its PerceptualHash
+        and ColorSignature in hex if perceptualHashes is set and it is a raster
+        image, plus its Metadata unless it has none and outputEmptyMetadata is False.
+        """
+        for filePath, metadata, perceptualHash in self._scanImages():
+            record = {
+                "Path": os.path.relpath(filePath, self.currentDir),
+                "Name": filePath.name,
+            }
+            if perceptualHash is not None:
+                imageHash, colors = perceptualHash
+                record["PerceptualHash"] = f"{imageHash:0{HASH_SIZE ** 2 // 4}x}"
+                record["ColorSignature"] = colors.hex()
+            if (
+                filePath.suffix.lower() == ".svg"
+                or metadata == "No EXIF metadata found"
+                or len(metadata) == 0
+            ):
+                if self.outputEmptyMetadata:
+                    record["Metadata"] = "None"
+            else:
+                record["Metadata"] = metadata
+            yield record
+
+    def _iterImagePaths(self) -> Iterator[Path]:
+        """
+        Yield the supported images under the directory, in walk order.
+
+        includeDirs are paths relative to the directory, and only images inside one
+        of them are yielded, or every image if includeDirs is empty. Directories that
+        neither lie inside an included path nor lead to one are pruned from the walk,
+        as are hidden directories and those named in excludeDirs, which hold build
+        outputs.
+        """
+        includeParts = [Path(includeDir).parts for includeDir in self.includeDirs]
+        for root, dirNames, fileNames in os.walk(self.directory):
+            rootParts = Path(root).relative_to(self.directory).parts
+            included = not includeParts or any(
+                rootParts[: len(parts)] == parts for parts in includeParts
+            )
+            dirNames[:] = sorted(
+                name
+                for name in dirNames
+                if not name.startswith(".")
+                and name not in self.excludeDirs
+                and (
+                    included
+                    or any(
+                        parts[: len(rootParts) + 1] == (*rootParts, name)
+                        for parts in includeParts
+                    )
+                )
+            )
+            if not included:
+                continue
+            for fileName in fileNames:
+                if fileName.lower().endswith(self.supportedFormats):
+                    yield Path(root) / fileName
+
+    def _scanImages(
+        self,
+    ) -> Iterator[tuple[Path, dict[str, str] | str, tuple[int, bytes] | None]]:
+        """
+        Yield (filePath, metadata, perceptualHash) for every image, in walk order,
+        reading each image on a thread pool. Only a few reads per thread are kept in
+        flight, so memory does not grow with the number of images.
+        """
+        workers = self.workers or min(32, (os.cpu_count() or 1) + 4)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            window = 4 * workers
+            pending = deque()
+            for filePath in self._iterImagePaths():
+                pending.append((filePath, executor.submit(self._readImage, filePath)))
+                if len(pending) >= window:
+                    filePath, future = pending.popleft()
+                    yield filePath, *future.result()
+            for filePath, future in pending:
+                yield filePath, *future.result()
+
+    def _readImage(
+        self, filePath: Path
+    ) -> tuple[dict[str, str] | str, tuple[int, bytes] | None]:
+        perceptualHash = None
+        if self.perceptualHashes and filePath.suffix.lower() != ".svg":
+            perceptualHash = self._getPerceptualHash(filePath)
+        # Header-only reads are cheaper than hashing the file to look them up
+        return self.GetImageMetadata(filePath), perceptualHash
+
+    def _getPerceptualHash(self, filePath: Path) -> tuple[int, bytes] | None:
+        """
+        Return the perceptual hash and colour signature of an image, or None if it
+        cannot be decoded.
+        """
+        key = None
+        if self.cache is not None:
+            # Hashed outside the lock so threads read their files concurrently
+            fileHash = self.cache.FileHash(filePath)
+            key = self.cache.Key(
+                "PerceptualHash",
+                fileHash,
+                {"hashSize": HASH_SIZE, "colorGrid": COLOR_GRID},
+            )
+            with self._cacheLock:
+                cached = self.cache.GetValue(key)
+            if cached is not None:
+                return int(cached[0], 16), bytes.fromhex(cached[1])
+        try:
+            imageHash, colors = PerceptualHash(filePath)
+        except Exception as e:
+            if self.verbose:
+                print(f"Error hashing {filePath}: {e}")
+            return None
+        if key is not None:
+            with self._cacheLock:
+                self.cache.PutValue(key, [f"{imageHash:x}", colors.hex()])
+        return imageHash, colors
+
+    def FindDuplicates(
+        self, maxDistance: int = 4, maxColorDifference: int = 16
+    ) -> list[list[str]]:
+        """
+        Group the images in the hash index written by ExtractMetadata that look alike.
+
+        Parameters:
+        - maxDistance: Most bits in which hashes of the same image may differ.
+        - maxColorDifference: Most levels by which any channel of their colour
+          signatures may differ.
+
+        Returns:
+        - Groups of paths relative to the repository, as from HashIndex.NearDuplicates.
+        """
+        return HashIndex.Load(self.hashIndexFile).NearDuplicates(
+            maxDistance, maxColorDifference
+        )
 
     def GetImageMetadata(self, filePath: Path) -> dict[str, str] | str:
+        try:
+            exif = ReadExifSegment(filePath)
+            if exif is not None:
+                return ParseExifTags(exif, self.desiredTags)
+            return "No EXIF metadata found"
+        except Exception as e:
+            return f"Error reading metadata: {e}"
+
+    def GetImageMetadataPil(self, filePath: Path) -> dict[str, str] | str:
+        """
+        Read the metadata through Pillow, which GetImageMetadata replaces. Kept as the
+        reference for Benchmark.
+        """
         try:
             image = Image.open(filePath)
             info = image._getexif()
             if info is not None:
-                desiredTags = [
-                    "Make",
-                    "Model",
-                    "DateTime",
-                    "Orientation",
-                    "Artist",
-                    "XResolution",
-                    "YResolution",
-                ]
                 return {
                     TAGS.get(tag): str(value)
                     for tag, value in info.items()
-                    if TAGS.get(tag) in desiredTags
+                    if TAGS.get(tag) in DESIRED_TAGS
                 }
             return "No EXIF metadata found"
         except Exception as e:
             return f"Error reading metadata: {e}"
 
+    def Benchmark(self) -> None:
+        """
+        Time Pillow against header-only reads, serially and on the thread pool, over
+        every supported image under the directory, and check that they agree.
+        """
+        filePaths = list(self._iterImagePaths())
+
+        timings = {}
+        results = {}
+        for name, reader, threaded in (
+            ("Pillow, serial", self.GetImageMetadataPil, False),
+            ("Header only, serial", self.GetImageMetadata, False),
+            ("Header only, thread pool", self.GetImageMetadata, True),
+        ):
+            start = time.perf_counter()
+            if threaded:
+                with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                    results[name] = list(executor.map(reader, filePaths))
+            else:
+                results[name] = [reader(filePath) for filePath in filePaths]
+            timings[name] = time.perf_counter() - start
+
+        baseline = timings["Pillow, serial"]
+        print(f"{len(filePaths)} images")
+        for name, seconds in timings.items():
+            print(f"{name}: {seconds:.3f}s ({baseline / seconds:.1f}x)")
+
+        mismatches = [
+            filePath
+            for filePath, pil, header in zip(
+                filePaths, results["Pillow, serial"], results["Header only, serial"]
+            )
+            if isinstance(pil, dict) and pil != header
+        ]
+        for filePath in mismatches:
+            print(f"Metadata mismatch: {filePath}")
+
 
 if __name__ == "__main__":
-    extractor = ImageMetadataExtractor(
-        "../../Assets/Media/", outputEmptyMetadata=True, outputAsXml=True
+    parser = argparse.ArgumentParser(description="Index image EXIF metadata.")
+    parser.add_argument("--directory", default="../../Assets/Media/")
+    parser.add_argument(
+        "--format", choices=SINKS, default="xml", help="Output format of the index."
+    )
+    parser.add_argument(
+        "--verbose", action="store_true", help="Print every record, not a progress bar."
+    )
+    parser.add_argument("--workers", type=int, help="Number of reader threads.")
+    parser.add_argument(
+        "--benchmark",
+        action="store_true",
+        help="Compare Pillow and header-only metadata reads instead of indexing.",
+    )
+    parser.add_argument(
+        "--include-dirs",
+        nargs="*",
+        default=["MPhotos"],
+        help="Only index images inside these directories, relative to --directory."
+        " Pass none to index every image.",
+    )
+    parser.add_argument(
+        "--perceptual-hash",
+        action="store_true",
+        help="Also hash every raster image and update the near-duplicate index.",
     )
-    extractor.ExtractMetadata()
+    parser.add_argument(
+        "--duplicates",
+        type=int,
+        metavar="DISTANCE",
+        help="After indexing, list the images whose perceptual hashes differ in at"
+        " most DISTANCE bits and whose colours match. Implies --perceptual-hash.",
+    )
+    parser.add_argument(
+        "--color-difference",
+        type=int,
+        default=16,
+        help="Most levels by which the colours of duplicates may differ.",
+    )
+    parser.add_argument(
+        "--exclude-dirs",
+        nargs="*",
+        default=["Tiles", "Hashed"],
+        help="Never index images inside directories with these names, such as build"
+        " outputs.",
+    )
+    parser.add_argument(
+        "--no-cache",
+        dest="cache",
+        action="store_false",
+        help="Recompute every perceptual hash instead of reusing cached ones.",
+    )
+    args = parser.parse_args()
+
+    with AssetCache() if args.cache else nullcontext() as cache:
+        extractor = ImageMetadataExtractor(
+            args.directory,
+            outputEmptyMetadata=True,
+            outputFormat=args.format,
+            cache=cache,
+            includeDirs=tuple(args.include_dirs),
+            workers=args.workers,
+            verbose=args.verbose,
+            perceptualHashes=args.perceptual_hash or args.duplicates is not None,
+            excludeDirs=tuple(args.exclude_dirs),
+        )
+        if args.benchmark:
+            extractor.includeDirs = ()
+            extractor.cache = None
+            extractor.Benchmark()
+        else:
+            extractor.ExtractMetadata()
+            if cache is not None:
+                print(cache.Report())
+        if args.duplicates is not None:
+            reclaimable = 0
+            for paths in extractor.FindDuplicates(
+                args.duplicates, args.color_difference
+            ):
+                sizes = [os.path.getsize(extractor.currentDir / path) for path in paths]
+                reclaimable += sum(sizes) - min(sizes)
+                print()
+                for path, size in zip(paths, sizes):
+                    print(f"{size:>10}  {path}")
+            print(f"\n{reclaimable / 1024:.1f} KiB reclaimable by keeping the smallest")
@@ -0,0 +1,138 @@
+import json
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any
+
+
+class Phase:
+    """
+    One timed phase of an Instrumentation, used as a context manager. Add counts the
+    items the phase processed.
+    """
+
+    def __init__(self, instrumentation: "Instrumentation", name: str, unit: str):
+        self.instrumentation: Instrumentation = instrumentation
+        self.name: str = name
+        self.unit: str = unit
+        self.items: int = 0
+        self.seconds: float = 0.0
+        self.peakMemoryBytes: int | None = None
+        self._start: float = 0.0
+
+    def __enter__(self) -> "Phase":
+        if self.instrumentation.memory:
+            tracemalloc.reset_peak()
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *excInfo) -> None:
+        self.seconds = time.perf_counter() - self._start
+        if self.instrumentation.memory:
+            self.peakMemoryBytes = tracemalloc.get_traced_memory()[1]
+        self.instrumentation.phases.append(self)
+
+    def Add(self, items: int = 1) -> None:
+        self.items += items
+
+    def Record(self) -> dict[str, Any]:
+        return {
+            "name": self.name,
+            "seconds": self.seconds,
+            "items": self.items,
+            "unit": self.unit,
+            "peakMemoryBytes": self.peakMemoryBytes,
+        }
+
+
+class _NullPhase:
+    """
+    Phase of a disabled Instrumentation, which records nothing.
+    """
+
+    def __enter__(self) -> "_NullPhase":
+        return self
+
+    def __exit__(self, *excInfo) -> None:
+        pass
+
+    def Add(self, items: int = 1) -> None:
+        pass
+
+
+_NULL_PHASE = _NullPhase()
+
+
+class Instrumentation:
+    """
+    Records the wall time, item count and, optionally, peak traced memory of each
+    phase of a conversion.
+
+    Phases are entered one after another, not nested, and are kept in the order they
+    finished. When disabled, Phase hands back one shared do-nothing context, so
+    instrumented code costs a method call per phase and nothing per item.
+
+    Parameters:
+    - enabled: Record phases at all.
+    - memory: Also record each phase's peak memory with tracemalloc, which slows the
+      phases down. Tracing starts with the first phase and stops at Close.
+    """
+
+    def __init__(self, enabled: bool = True, memory: bool = False):
+        self.enabled: bool = enabled
+        self.memory: bool = enabled and memory
+        self.phases: list[Phase] = []
+        self._startedTracing: bool = False
+
+    def Phase(self, name: str, unit: str = "items") -> Phase | _NullPhase:
+        """
+        Return a context manager timing a phase called name, whose items are counted
+        in unit.
+        """
+        if not self.enabled:
+            return _NULL_PHASE
+        if self.memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._startedTracing = True
+        return Phase(self, name, unit)
+
+    def Close(self) -> None:
+        """
+        Stop tracing memory if this instrumentation started it.
+        """
+        if self._startedTracing:
+            tracemalloc.stop()
+            self._startedTracing = False
+
+    def Summary(self) -> str:
+        """
+        Summarize every phase on one line, such as
+        "labeling 12.1ms (340 regions), writing 3.0ms (12 paths); total 15.1ms".
+        """
+        parts = []
+        for phase in self.phases:
+            part = (
+                f"{phase.name} {phase.seconds * 1e3:.1f}ms ({phase.items} {phase.unit}"
+            )
+            if phase.peakMemoryBytes is not None:
+                part += f", {phase.peakMemoryBytes / (1024 * 1024):.1f} MiB peak"
+            parts.append(part + ")")
+        total = sum(phase.seconds for phase in self.phases)
+        return f"{', '.join(parts)}; total {total * 1e3:.1f}ms"
+
+    def Trace(self) -> dict[str, Any]:
+        return {
+            "phases": [phase.Record() for phase in self.phases],
+            "seconds": sum(phase.seconds for phase in self.phases),
+        }
+
+    def WriteTrace(self, tracePath: Path) -> None:
+        """
+        Write the recorded phases to a JSON file.
+        """
+        with open(tracePath, "w") as file:
+            json.dump(self.Trace(), file, indent=4)
+
+
+# Shared disabled instance used when a caller does not pass one
+NO_INSTRUMENTATION: Instrumentation = Instrumentation(enabled=False)
@@ -1,48 +1,159 @@
+import argparse
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 # Define the file extensions to include
 includedExtensions = {".py", ".js", ".html", ".css"}
 
+# Directories never descended into, besides hidden ones
+excludedDirs = {"node_modules", "__pycache__"}
 
-def isHidden(path):
-    """Check if the path or any of its parents is hidden."""
-    return any(part.startswith(".") for part in path.parts)
+cachePath = Path(__file__).resolve().parent / ".linecountcache.json"
+
+
+def isPruned(name):
+    """Check if a directory or file name is hidden or excluded."""
+    return name.startswith(".") or name in excludedDirs
+
+
+def findFiles(root, extensions):
+    """
+    Yield (path, size, mtime) of every file under root with an included extension,
+    without descending into hidden or excluded directories.
+    """
+    pending = [root]
+    while pending:
+        try:
+            with os.scandir(pending.pop()) as entries:
+                for entry in entries:
+                    if isPruned(entry.name):
+                        continue
+                    if entry.is_dir(follow_symlinks=False):
+                        pending.append(entry.path)
+                    elif os.path.splitext(entry.name)[1] in extensions:
+                        stat = entry.stat()
+                        yield entry.path, stat.st_size, stat.st_mtime_ns
+        except OSError as e:
+            print(f"Error reading directory: {e}")
 
 
 def countLinesInFile(filePath):
-    """Count the number of lines in a given file."""
+    """
+    Count the number of lines in a given file, reading it in binary chunks. A last
+    line without a trailing newline still counts.
+    """
+    lineCount = 0
+    lastChunk = b"\n"
     try:
-        with filePath.open("r", encoding="utf-8") as file:
-            return sum(1 for _ in file)
-    except Exception as e:
+        with open(filePath, "rb") as file:
+            for chunk in iter(lambda: file.read(1024 * 1024), b""):
+                lineCount += chunk.count(b"\n")
+                lastChunk = chunk
+    except OSError as e:
         print(f"Error reading file {filePath}: {e}")
         return 0
+    return lineCount + (not lastChunk.endswith(b"\n"))
 
 
-def main():
-    currentScript = Path(__file__).resolve()
-    totalLines = 0
+def loadCache():
+    """Load line counts of previous runs by path, with the size and mtime counted."""
+    try:
+        with open(cachePath, "r") as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return {}
+
+
+def saveCache(cache):
+    tempPath = cachePath.with_suffix(".tmp")
+    with open(tempPath, "w") as file:
+        json.dump(cache, file)
+    os.replace(tempPath, cachePath)
 
-    print("Counting lines in files...")
 
-    for path in currentScript.parent.parent.rglob("*"):
-        # Skip hidden files and directories
-        if isHidden(path):
+def countLines(root, extensions=includedExtensions, useCache=True, workers=None):
+    """
+    Count the lines of every included file under root.
+
+    Files whose size and mtime match the last run reuse its count, the rest are
+    counted on a thread pool.
+
+    Returns:
+    - The line count of each file by path, sorted by path.
+    """
+    cache = loadCache() if useCache else {}
+    skipped = os.path.realpath(__file__)
+    lineCounts = {}
+    misses = []
+    for path, size, mtime in findFiles(os.fspath(root), extensions):
+        # Skip counting the current script file
+        if os.path.realpath(path) == skipped:
             continue
+        known = cache.get(path)
+        if known is not None and known[:2] == [size, mtime]:
+            lineCounts[path] = known[2]
+        else:
+            misses.append((path, size, mtime))
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        counted = executor.map(countLinesInFile, [path for path, _, _ in misses])
+        for (path, size, mtime), lineCount in zip(misses, counted):
+            lineCounts[path] = lineCount
+            cache[path] = [size, mtime, lineCount]
 
-        # Check the file extension
-        if path.suffix in includedExtensions:
-            # Skip counting the current script file
-            if path == currentScript:
-                continue
+    if useCache and (misses or len(cache) != len(lineCounts)):
+        saveCache({path: cache[path] for path in lineCounts})
+    return dict(sorted(lineCounts.items()))
 
-            # Count lines in the file
-            lineCount = countLinesInFile(path)
-            totalLines += lineCount
 
+def main():
+    parser = argparse.ArgumentParser(description="Count lines of source files.")
+    parser.add_argument(
+        "root",
+        nargs="?",
+        type=Path,
+        default=Path(__file__).resolve().parent.parent,
+        help="Directory to count lines under.",
+    )
+    parser.add_argument(
+        "--extensions",
+        nargs="+",
+        default=sorted(includedExtensions),
+        help="File extensions to include.",
+    )
+    parser.add_argument(
+        "--no-cache",
+        dest="cache",
+        action="store_false",
+        help="Recount every file instead of reusing counts of unchanged files.",
+    )
+    parser.add_argument("--workers", type=int, help="Number of counting threads.")
+    parser.add_argument(
+        "--quiet", action="store_true", help="Only print the totals, not every file."
+    )
+    args = parser.parse_args()
+
+    print("Counting lines in files...")
+
+    lineCounts = countLines(args.root, set(args.extensions), args.cache, args.workers)
+
+    extensionCounts = {}
+    for path, lineCount in lineCounts.items():
+        if not args.quiet:
             print(f"{path}: {lineCount} lines")
+        extension = os.path.splitext(path)[1]
+        files, lines = extensionCounts.get(extension, (0, 0))
+        extensionCounts[extension] = (files + 1, lines + lineCount)
+
+    print()
+    for extension, (files, lines) in sorted(
+        extensionCounts.items(), key=lambda item: item[1][1], reverse=True
+    ):
+        print(f"{extension}: {lines} lines in {files} files")
 
-    print("\nTotal lines across all files:", totalLines)
+    print("\nTotal lines across all files:", sum(lineCounts.values()))
 
 
 if __name__ == "__main__":
@@ -1,132 +1,398 @@
+import argparse
+import heapq
 import json
-from pathlib import *
-
-if __name__ == "__main__":
-
-    def GetImagePath(title: str) -> str:
-
-        if title in imageData:
-
-            return imageData[title]
-
-        else:
-
-            print(title)
-
-    currentDir = Path("..").resolve()
-
-    path = Path(currentDir, "Assets/JSON Files/currentTasks.json").resolve()
-
-    collectionsPath = path.with_stem("collections")
-    tasksPath = path.with_stem("tasks")
-
-    isolatedTasks = []
-
-    with open(path, "r") as file:
-
-        tasksDicts = json.load(file)
-
-    with path.with_stem("imageData").open("r") as file:
-
-        imageData = json.load(file)
-
-    newTasksDicts = tasksDicts
-
-    keepKeys = ["taskCollections"]
-
-    newTasksDicts = {key: value for key, value in tasksDicts.items() if key in keepKeys}
-
-    keepKeys = ["name", "uniqueKey", "tiles"]
-
-    for collectionNum, collectionDict in enumerate(newTasksDicts["taskCollections"]):
-
-        newTasksDicts["taskCollections"][collectionNum] = {
-            key: value for key, value in collectionDict.items() if key in keepKeys
+import re
+import sys
+from collections.abc import Iterator
+from pathlib import Path
+from typing import Any, TextIO
+
+from SearchIndex import SearchIndexBuilder
+
+# Keys kept from each collection, tile and tile["task"] of the Wolverine Access export
+COLLECTION_KEYS: tuple[str, ...] = ("name", "uniqueKey")
+TILE_KEYS: tuple[str, ...] = (
+    "favorite",
+    "announcements",
+    "collectionName",
+    "title",
+    "uniqueKey",
+)
+TASK_KEYS: tuple[str, ...] = (
+    "applicationName",
+    "averageRating",
+    "ratingCount",
+    "tabletHighResolutionImageCdnUrl",
+    "tabletLowResolutionImageCdnUrl",
+    "openInNewWindow",
+)
+
+# Link attributes by tile title; every other tile launches its task
+HREF_RULES: dict[str, dict[str, str]] = {
+    "Class Schedule": {"href": "class-schedule.html"},
+    "Canvas": {
+        "href": "https://canvas.it.umich.edu/",
+        "target": "_blank",
+        "rel": "noopener",
+    },
+    "Google Mail": {
+        "href": "https://gmail.com",
+        "target": "_blank",
+        "rel": "noopener",
+    },
+}
+LAUNCH_TASK_HREF: str = "https://wolverineaccess.umich.edu/launch-task/all/{uniqueKey}"
+
+MINIFIED: dict[str, Any] = {"separators": (",", ":")}
+
+
+def GetImagePath(title: str, uniqueKey: str, imageData: dict[str, Any]) -> Any:
+    """
+    Look up a tile's image by its uniqueKey, for titles shared by several tasks, and
+    then by its title, printing the title if neither is found.
+    """
+    if uniqueKey in imageData:
+        return imageData[uniqueKey]
+    if title in imageData:
+        return imageData[title]
+    print(title)
+
+
+def ImageFields(image: Any, imageVariants: dict[str, Any] | None) -> dict[str, Any]:
+    """
+    Return the image fields of a tile, using the display-size variants written by
+    TileImages.py when it has them.
+
+    Returns:
+    - image: The 1x PNG variant, or the original image.
+    - imageSrcset, imageWebpSrcset: PNG and WebP srcsets of every variant.
+    - imageWidth, imageHeight: The 1x size of the image.
+    - imageSprite: The sprite sheet and the [x, y, width, height] of the image in it,
+      if a sheet was built.
+    """
+    variant = (imageVariants or {}).get("images", {}).get(image)
+    if not isinstance(image, str) or variant is None:
+        return {"image": image}
+
+    fields = {
+        "image": variant["image"],
+        "imageSrcset": variant["srcset"],
+        "imageWebpSrcset": variant["webpSrcset"],
+        "imageWidth": variant["width"],
+        "imageHeight": variant["height"],
+    }
+    if imageVariants["sprite"] is not None:
+        fields["imageSprite"] = {**imageVariants["sprite"], "rect": variant["sprite"]}
+    return fields
+
+
+def Project(source: dict[str, Any], keys: tuple[str, ...]) -> dict[str, Any]:
+    """
+    Return the items of source whose key is in keys, in source order.
+    """
+    return {key: value for key, value in source.items() if key in keys}
+
+
+def ProjectTile(
+    tile: dict[str, Any],
+    rating: int,
+    imageData: dict[str, Any],
+    imageVariants: dict[str, Any] | None = None,
+) -> dict[str, Any]:
+    """
+    Flatten an exported tile and its task into the record the site renders.
+
+    Parameters:
+    - tile: A tile from a task collection of the export.
+    - rating: The 1-based position of the tile in its collection.
+    - imageData: Mapping of tile titles and uniqueKeys to image paths.
+    - imageVariants: Image variants from TileImages.py, if they were built.
+
+    Returns:
+    - The projected tile with its rating, alt text, image and link attributes.
+    """
+    projected = Project(tile, TILE_KEYS)
+    projected.update(Project(tile["task"], TASK_KEYS))
+    projected["currentRating"] = rating
+    projected["alt"] = projected["title"]
+    projected.update(
+        ImageFields(
+            GetImagePath(projected["title"], projected["uniqueKey"], imageData),
+            imageVariants,
+        )
+    )
+    projected.update(
+        HREF_RULES.get(projected["title"])
+        or {"href": LAUNCH_TASK_HREF.format(uniqueKey=projected["uniqueKey"])}
+    )
+    return projected
+
+
+def _Drain(items: list) -> Iterator:
+    """
+    Yield the items of a list, dropping the list's reference to each once consumed.
+    """
+    for index in range(len(items)):
+        item, items[index] = items[index], None
+        yield item
+
+
+def _Nested(value: Any, depth: int) -> str:
+    """
+    Format value as json.dump(indent=4) would when nested depth levels deep.
+    """
+    return json.dumps(value, indent=4).replace("\n", "\n" + "    " * depth)
+
+
+class TaskShardWriter:
+    """
+    Write projected tasks as minified shards of at most shardSize tasks per
+    collection, plus a manifest the site loads first.
+
+    The manifest lists the collections and their shards, maps each task's uniqueKey
+    to the shards holding it, names the tasks that are favorites by default, and
+    inlines the featuredCount tasks with the highest currentRating so the first page
+    can render without fetching any shard. Concatenating the shards in manifest
+    order gives tasks.json.
+    """
+
+    def __init__(self, outputDir: Path, shardSize: int = 25, featuredCount: int = 10):
+        self.outputDir: Path = outputDir
+        self.shardDir: Path = outputDir / "Tasks"
+        self.shardSize: int = shardSize
+        self.featuredCount: int = featuredCount
+
+        self.collections: list[dict[str, Any]] = []
+        self.shards: list[dict[str, Any]] = []
+        self.keys: dict[str, list[int]] = {}
+        self.favorites: list[str] = []
+        self.taskCount: int = 0
+        # Min-heap of (currentRating, -taskNum, task) holding the featured tasks
+        self.featured: list[tuple[int, int, dict[str, Any]]] = []
+        self.pending: list[dict[str, Any]] = []
+
+        self.shardDir.mkdir(parents=True, exist_ok=True)
+
+    def Add(self, collection: dict[str, Any], task: dict[str, Any]) -> None:
+        """
+        Add the next task of tasks.json, which belongs to the projected collection.
+        """
+        if (
+            not self.collections
+            or self.collections[-1]["uniqueKey"] != collection["uniqueKey"]
+        ):
+            self._Flush()
+            self.collections.append({**collection, "shards": []})
+
+        # The shard the task goes into, before a full shard is flushed
+        shardId = len(self.shards)
+        self.pending.append(task)
+        if len(self.pending) == self.shardSize:
+            self._Flush()
+
+        shardIds = self.keys.setdefault(task["uniqueKey"], [])
+        if shardId not in shardIds:
+            shardIds.append(shardId)
+        if task.get("favorite") and task["uniqueKey"] not in self.favorites:
+            self.favorites.append(task["uniqueKey"])
+
+        # Ties keep tasks.json order, as the stable sort in app.js does
+        entry = (task["currentRating"], -self.taskCount, task)
+        if len(self.featured) < self.featuredCount:
+            heapq.heappush(self.featured, entry)
+        elif self.featuredCount:
+            heapq.heappushpop(self.featured, entry)
+        self.taskCount += 1
+
+    def _Flush(self) -> None:
+        if not self.pending:
+            return
+        collection = self.collections[-1]
+        name = re.sub(r"[^\w-]", "_", collection["uniqueKey"])
+        fileName = f"{name}-{len(collection['shards'])}.json"
+        with open(self.shardDir / fileName, "w") as file:
+            json.dump(self.pending, file, **MINIFIED)
+
+        collection["shards"].append(len(self.shards))
+        self.shards.append(
+            {"file": f"{self.shardDir.name}/{fileName}", "count": len(self.pending)}
+        )
+        self.pending = []
+
+    def Close(self) -> None:
+        """
+        Write the last shard and the manifest, and delete shards left by older builds.
+        """
+        self._Flush()
+        featured = sorted(self.featured, key=lambda entry: entry[:2], reverse=True)
+        manifest = {
+            "taskCount": self.taskCount,
+            "collections": self.collections,
+            "shards": self.shards,
+            "keys": self.keys,
+            "favorites": self.favorites,
+            "featured": [task for _, _, task in featured],
         }
+        with open(self.outputDir / "taskManifest.json", "w") as file:
+            json.dump(manifest, file, **MINIFIED)
+
+        written = {Path(shard["file"]).name for shard in self.shards}
+        for shardPath in self.shardDir.glob("*.json"):
+            if shardPath.name not in written:
+                shardPath.unlink()
+
+
+def CheckTaskManifest(outputDir: Path) -> list[str]:
+    """
+    Check that every shard id in taskManifest.json's keys exists and holds the task
+    with that uniqueKey, and that every task in a shard is keyed to it.
+
+    Returns:
+    - A description of each problem found, empty if there are none.
+    """
+    with open(outputDir / "taskManifest.json", "r") as file:
+        manifest = json.load(file)
+    shardKeys = []
+    for shard in manifest["shards"]:
+        with open(outputDir / shard["file"], "r") as file:
+            shardKeys.append({task["uniqueKey"] for task in json.load(file)})
+
+    problems = []
+    for uniqueKey, shardIds in manifest["keys"].items():
+        for shardId in shardIds:
+            if not 0 <= shardId < len(shardKeys):
+                problems.append(f"{uniqueKey} points to missing shard {shardId}")
+            elif uniqueKey not in shardKeys[shardId]:
+                problems.append(f"{uniqueKey} is not in shard {shardId}")
+    for shardId, keys in enumerate(shardKeys):
+        for uniqueKey in sorted(keys):
+            if shardId not in manifest["keys"].get(uniqueKey, []):
+                problems.append(f"{uniqueKey} in shard {shardId} is not keyed to it")
+    return problems
+
+
+def WriteProjection(
+    collections: list[dict[str, Any]],
+    imageData: dict[str, Any],
+    collectionsFile: TextIO,
+    tasksFile: TextIO,
+    searchIndex: SearchIndexBuilder | None = None,
+    shards: TaskShardWriter | None = None,
+    imageVariants: dict[str, Any] | None = None,
+) -> int:
+    """
+    Project every collection and tile in one pass, streaming the collections document
+    and the flat task list to their files as each tile is projected.
+
+    The output matches json.dump(indent=4) of the fully built documents. Collections
+    and tiles are released from the input list as they are written. Each task is
+    also added to searchIndex and shards when they are given.
+
+    Returns:
+    - The number of tasks written.
+    """
+    collectionsFile.write('{\n    "taskCollections": [')
+    tasksFile.write("[")
+    taskCount = 0
+    collectionCount = 0
+    for collection in _Drain(collections):
+        collectionsFile.write("," * bool(collectionCount) + "\n        {")
+        projectedCollection = Project(collection, COLLECTION_KEYS)
+        for key, value in projectedCollection.items():
+            collectionsFile.write(
+                f"\n            {json.dumps(key)}: {_Nested(value, 3)},"
+            )
+        collectionsFile.write('\n            "tiles": [')
+
+        tiles = collection["tiles"]
+        for tileNum, tile in enumerate(_Drain(tiles)):
+            projected = ProjectTile(tile, tileNum + 1, imageData, imageVariants)
+            collectionsFile.write(
+                "," * bool(tileNum) + "\n                " + _Nested(projected, 4)
+            )
+            tasksFile.write("," * bool(taskCount) + "\n    " + _Nested(projected, 1))
+            taskCount += 1
+            if searchIndex is not None:
+                searchIndex.Add(projected)
+            if shards is not None:
+                shards.Add(projectedCollection, projected)
+
+        collectionsFile.write("\n            ]\n        }" if tiles else "]\n        }")
+        collectionCount += 1
+
+    collectionsFile.write("\n    ]\n}" if collectionCount else "]\n}")
+    tasksFile.write("\n]" if taskCount else "]")
+    return taskCount
+
+
+def ParseTasks(sourcePath: Path) -> int:
+    """
+    Write collections.json, tasks.json, searchIndex.json and the task shards and
+    manifest next to a Wolverine Access task export.
+
+    Parameters:
+    - sourcePath: Path of the export, with imageData.json in the same directory,
+      and imageVariants.json too if TileImages.py has been run.
+
+    Returns:
+    - The number of tasks written.
+    """
+    with sourcePath.with_stem("imageData").open("r") as file:
+        imageData = json.load(file)
+    try:
+        with sourcePath.with_stem("imageVariants").open("r") as file:
+            imageVariants = json.load(file)
+    except FileNotFoundError:
+        imageVariants = None
+
+    # Only the collections are needed, drop the rest of the export straight away
+    with open(sourcePath, "r") as file:
+        collections = json.load(file)["taskCollections"]
+
+    searchIndex = SearchIndexBuilder()
+    shards = TaskShardWriter(sourcePath.parent)
+    with open(sourcePath.with_stem("collections"), "w") as collectionsFile, open(
+        sourcePath.with_stem("tasks"), "w"
+    ) as tasksFile:
+        taskCount = WriteProjection(
+            collections,
+            imageData,
+            collectionsFile,
+            tasksFile,
+            searchIndex,
+            shards,
+            imageVariants,
+        )
+    shards.Close()
+
+    with open(sourcePath.with_stem("searchIndex"), "w") as file:
+        json.dump(searchIndex.Build(), file, **MINIFIED)
+    return taskCount
+
+
+def Main():
+    parser = argparse.ArgumentParser(
+        description="Project a Wolverine Access task export into site data."
+    )
+    parser.add_argument(
+        "source",
+        nargs="?",
+        type=Path,
+        default=Path(__file__).resolve().parent.parent
+        / "Assets"
+        / "JSON Files"
+        / "currentTasks.json",
+        help="Task export to read; outputs are written alongside it.",
+    )
+    args = parser.parse_args()
+
+    ParseTasks(args.source)
+    problems = CheckTaskManifest(args.source.parent)
+    for problem in problems:
+        print(f"Task manifest: {problem}")
+    if problems:
+        sys.exit(1)
 
-    for collectionNum, collectionDict in enumerate(newTasksDicts["taskCollections"]):
-
-        keepKeys = [
-            "favorite",
-            "announcements",
-            "collectionName",
-            "title",
-            "uniqueKey",
-            "task",
-        ]
-
-        for tileNum, tile in enumerate(collectionDict["tiles"]):
-
-            newTasksDicts["taskCollections"][collectionNum]["tiles"][tileNum] = {
-                key: value for key, value in tile.items() if key in keepKeys
-            }
-
-    for collectionNum, collectionDict in enumerate(newTasksDicts["taskCollections"]):
-
-        for tileNum, tile in enumerate(collectionDict["tiles"]):
-
-            keepKeys = [
-                "applicationName",
-                "averageRating",
-                "ratingCount",
-                "tabletHighResolutionImageCdnUrl",
-                "tabletLowResolutionImageCdnUrl",
-                "openInNewWindow",
-            ]
-
-            taskDict = tile["task"]
-
-            taskDict = {
-                key: value for key, value in taskDict.items() if key in keepKeys
-            }
-
-            currentDict = newTasksDicts["taskCollections"][collectionNum]["tiles"][
-                tileNum
-            ]
-
-            currentDict = {
-                key: value for key, value in currentDict.items() if key != "task"
-            }
-
-            currentDict.update(taskDict)
-
-            currentDict["currentRating"] = tileNum + 1
-            currentDict["alt"] = currentDict["title"]
-            currentDict["image"] = GetImagePath(title=currentDict["title"])
-            currentDict["href"] = "not-implemented.html"
-
-            if currentDict["title"] == "Canvas":
-
-                currentDict["target"] = "_blank"
-                currentDict["rel"] = "noopener"
-                currentDict["href"] = "https://canvas.it.umich.edu/"
-
-            elif currentDict["title"] == "Google Mail":
-
-                currentDict["target"] = "_blank"
-                currentDict["rel"] = "noopener"
-                currentDict["href"] = "https://gmail.com"
-
-            else:
-
-                currentDict["href"] = (
-                    f"https://wolverineaccess.umich.edu/launch-task/all/{currentDict['uniqueKey']}"
-                )
-
-            newTasksDicts["taskCollections"][collectionNum]["tiles"][
-                tileNum
-            ] = currentDict
-
-    for collectionNum, collectionDict in enumerate(newTasksDicts["taskCollections"]):
-
-        for tileNum, tile in enumerate(collectionDict["tiles"]):
-
-            isolatedTasks.append(tile)
-
-    with open(collectionsPath, "w") as newFile:
-
-        json.dump(newTasksDicts, newFile, indent=4)
-
-    with open(tasksPath, "w") as newFile:
 
-        json.dump(isolatedTasks, newFile, indent=4)
+if __name__ == "__main__":
+    Main()
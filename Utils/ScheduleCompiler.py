@@ -0,0 +1,296 @@
+import argparse
+import heapq
+import json
+import random
+import re
+import time
+from bisect import bisect_left, bisect_right
+from datetime import date, datetime
+from itertools import accumulate
+from pathlib import Path
+from typing import Any
+
+DAY_ABBREVIATIONS: tuple[str, ...] = ("Mo", "Tu", "We", "Th", "Fr", "Sa", "Su")
+MINUTES_PER_DAY: int = 24 * 60
+MEETING_PATTERN = re.compile(
+    r"^([A-Za-z]+)\s+(\d{1,2}):(\d{2})\s*(AM|PM)\s*[-–—]\s*(\d{1,2}):(\d{2})\s*(AM|PM)$",
+    re.IGNORECASE,
+)
+
+
+def ParseMinutes(hour: str, minute: str, meridiem: str) -> int:
+    """
+    Return the minutes after midnight of a 12-hour clock time.
+    """
+    return (int(hour) % 12 + 12 * (meridiem.upper() == "PM")) * 60 + int(minute)
+
+
+def ParseDays(daysStr: str) -> list[int] | None:
+    """
+    Return the weekdays, 0 for Monday, of a string such as "MoWeFr", or None if it
+    holds anything but day abbreviations.
+    """
+    pairs = [daysStr[i : i + 2].capitalize() for i in range(0, len(daysStr), 2)]
+    if len(daysStr) % 2 or not all(pair in DAY_ABBREVIATIONS for pair in pairs):
+        return None
+    return [DAY_ABBREVIATIONS.index(pair) for pair in pairs]
+
+
+def ParseMeetingTimes(daysAndTimes: str) -> list[tuple[int, int, int]]:
+    """
+    Parse a days_and_times string such as "TuTh 11:30AM - 1:00PM".
+
+    Returns:
+    - A (weekday, start minute, end minute) per meeting, or nothing if the string
+      is not a weekly meeting time, such as "TBA".
+    """
+    match = MEETING_PATTERN.match(daysAndTimes.strip())
+    days = match and ParseDays(match[1])
+    if not days:
+        return []
+    start = ParseMinutes(*match.group(2, 3, 4))
+    end = ParseMinutes(*match.group(5, 6, 7))
+    if end <= start:
+        return []
+    return [(day, start, end) for day in days]
+
+
+def ParseDateRange(startEndDate: str) -> tuple[date, date]:
+    """
+    Parse a start_end_date string such as "01/08/2025 - 04/22/2025", treating an
+    unparseable one as unbounded.
+    """
+    try:
+        start, end = (
+            datetime.strptime(part.strip(), "%m/%d/%Y").date()
+            for part in startEndDate.split("-")
+        )
+        return start, end
+    except (AttributeError, ValueError):
+        return date.min, date.max
+
+
+class IntervalIndex:
+    """
+    Static index of half-open [start, end) intervals for overlap queries.
+
+    Intervals are sorted by start alongside the running maximum of their ends. An
+    interval overlapping [start, end) must begin before end, and must come at or
+    after the first position whose running maximum end passes start, so a query
+    only scans between two binary searches.
+    """
+
+    def __init__(self, intervals: list[tuple[int, int]]):
+        self.order: list[int] = sorted(
+            range(len(intervals)), key=lambda i: intervals[i]
+        )
+        self.starts: list[int] = [intervals[i][0] for i in self.order]
+        self.ends: list[int] = [intervals[i][1] for i in self.order]
+        self.maxEnds: list[int] = list(accumulate(self.ends, max))
+
+    def Overlapping(self, start: int, end: int) -> list[int]:
+        """
+        Return the positions, in the original list, of the intervals overlapping
+        [start, end).
+        """
+        low = bisect_right(self.maxEnds, start)
+        high = bisect_left(self.starts, end)
+        return [
+            self.order[position]
+            for position in range(low, high)
+            if self.ends[position] > start
+        ]
+
+
+def LayoutDay(meetings: list[dict[str, Any]]) -> None:
+    """
+    Assign side-by-side columns to one day's meetings, in place.
+
+    Meetings that overlap, directly or through others, form a cluster whose width
+    is split into "columns"; each meeting takes the lowest "column" free at its
+    start.
+    """
+    meetings.sort(key=lambda meeting: (meeting["start"], meeting["end"]))
+    cluster = []
+    clusterEnd = -1
+    freeColumns = []
+    busyColumns = []  # Min-heap of (end, column)
+    for meeting in meetings + [None]:
+        if meeting is None or meeting["start"] >= clusterEnd:
+            columns = max((entry["column"] for entry in cluster), default=-1) + 1
+            for entry in cluster:
+                entry["columns"] = columns
+            if meeting is None:
+                break
+            cluster, clusterEnd, freeColumns, busyColumns = [], -1, [], []
+
+        while busyColumns and busyColumns[0][0] <= meeting["start"]:
+            heapq.heappush(freeColumns, heapq.heappop(busyColumns)[1])
+        meeting["column"] = (
+            heapq.heappop(freeColumns) if freeColumns else len(busyColumns)
+        )
+        heapq.heappush(busyColumns, (meeting["end"], meeting["column"]))
+        cluster.append(meeting)
+        clusterEnd = max(clusterEnd, meeting["end"])
+
+
+def CompileSchedule(schedule: dict[str, Any]) -> dict[str, Any]:
+    """
+    Compile one user's schedule so the renderers only have to draw it.
+
+    Parameters:
+    - schedule: A user's entry in classSchedules.json.
+
+    Returns:
+    - The schedule with "meetings" added to every section, each with a "day" (0 for
+      Monday), "start" and "end" minute, "column" and "columns" for side-by-side
+      layout, and whether it is in a "conflict". "conflicts" lists each pair of
+      class numbers whose meetings overlap during overlapping terms, with the day
+      and the overlapping minutes.
+    """
+    compiled = {**schedule, "courses": []}
+    meetings = []
+    owners = []
+    for course in schedule["courses"]:
+        sections = []
+        for section in course["sections"]:
+            sectionMeetings = [
+                {"day": day, "start": start, "end": end, "conflict": False}
+                for day, start, end in ParseMeetingTimes(section["days_and_times"])
+            ]
+            sections.append({**section, "meetings": sectionMeetings})
+            dates = ParseDateRange(section.get("start_end_date"))
+            for meeting in sectionMeetings:
+                meetings.append(meeting)
+                owners.append((section["class_nbr"], dates))
+        compiled["courses"].append({**course, "sections": sections})
+
+    # Meetings on a single week-long axis, so days never overlap each other
+    weekIntervals = [
+        (
+            meeting["day"] * MINUTES_PER_DAY + meeting["start"],
+            meeting["day"] * MINUTES_PER_DAY + meeting["end"],
+        )
+        for meeting in meetings
+    ]
+    index = IntervalIndex(weekIntervals)
+    conflicts = []
+    for first, (start, end) in enumerate(weekIntervals):
+        for second in sorted(index.Overlapping(start, end)):
+            (firstClass, firstDates), (secondClass, secondDates) = (
+                owners[first],
+                owners[second],
+            )
+            if (
+                second <= first
+                or firstClass == secondClass
+                or firstDates[1] < secondDates[0]
+                or secondDates[1] < firstDates[0]
+            ):
+                continue
+            meetings[first]["conflict"] = meetings[second]["conflict"] = True
+            conflicts.append(
+                {
+                    "classNumbers": [firstClass, secondClass],
+                    "day": meetings[first]["day"],
+                    "start": max(meetings[first]["start"], meetings[second]["start"]),
+                    "end": min(meetings[first]["end"], meetings[second]["end"]),
+                }
+            )
+    compiled["conflicts"] = conflicts
+
+    days = {}
+    for meeting in meetings:
+        days.setdefault(meeting["day"], []).append(meeting)
+    for dayMeetings in days.values():
+        LayoutDay(dayMeetings)
+    return compiled
+
+
+def CompileSchedules(schedules: dict[str, Any]) -> dict[str, Any]:
+    return {
+        uniqName: CompileSchedule(schedule) for uniqName, schedule in schedules.items()
+    }
+
+
+def FormatMeetingTime(minutes: int) -> str:
+    """
+    Format minutes after midnight as a 12-hour clock time such as "1:30PM".
+    """
+    hour, minute = divmod(minutes, 60)
+    return f"{(hour - 1) % 12 + 1}:{minute:02d}{'AM' if hour < 12 else 'PM'}"
+
+
+def SyntheticSchedules(
+    schedules: dict[str, Any], count: int, seed: int = 0
+) -> dict[str, Any]:
+    """
+    Generate count users, each enrolled in a random mix of the given courses with
+    their sections moved to random meeting times, so some of them conflict.
+    """
+    rng = random.Random(seed)
+    courses = [
+        course for schedule in schedules.values() for course in schedule["courses"]
+    ]
+    dayPatterns = ("MoWeFr", "TuTh", "MoWe", "We", "Fr", "Th")
+    synthetic = {}
+    for num in range(count):
+        userCourses = []
+        for course in rng.sample(courses, min(len(courses), 5)):
+            sections = []
+            for section in course["sections"]:
+                start = rng.randrange(8 * 60, 18 * 60, 30)
+                end = start + rng.choice((50, 80, 110))
+                daysAndTimes = (
+                    f"{rng.choice(dayPatterns)} "
+                    f"{FormatMeetingTime(start)} - {FormatMeetingTime(end)}"
+                )
+                sections.append({**section, "days_and_times": daysAndTimes})
+            userCourses.append({**course, "sections": sections})
+        synthetic[f"user{num}"] = {"courses": userCourses}
+    return synthetic
+
+
+def Main():
+    parser = argparse.ArgumentParser(
+        description="Compile class schedules into meeting intervals, layouts and conflicts."
+    )
+    parser.add_argument(
+        "source",
+        nargs="?",
+        type=Path,
+        default=Path(__file__).resolve().parent.parent
+        / "Assets"
+        / "JSON Files"
+        / "classSchedules.json",
+        help="Schedules to compile; compiledSchedules.json is written alongside.",
+    )
+    parser.add_argument(
+        "--benchmark",
+        type=int,
+        metavar="USERS",
+        help="Time compiling this many synthetic users instead of writing output.",
+    )
+    args = parser.parse_args()
+
+    with open(args.source, "r") as file:
+        schedules = json.load(file)
+
+    if args.benchmark:
+        synthetic = SyntheticSchedules(schedules, args.benchmark)
+        start = time.perf_counter()
+        compiled = CompileSchedules(synthetic)
+        elapsed = time.perf_counter() - start
+        conflicts = sum(len(schedule["conflicts"]) for schedule in compiled.values())
+        print(
+            f"{args.benchmark} users in {elapsed:.2f}s"
+            f" ({args.benchmark / elapsed:.0f} users/s), {conflicts} conflicts"
+        )
+        return
+
+    with open(args.source.with_stem("compiledSchedules"), "w") as file:
+        json.dump(CompileSchedules(schedules), file, indent=4)
+
+
+if __name__ == "__main__":
+    Main()
@@ -0,0 +1,258 @@
+import argparse
+import json
+import random
+import time
+from pathlib import Path
+from typing import Any
+
+# Task fields matched by the search box, and the lengths of substring indexed
+SEARCH_FIELDS: tuple[str, ...] = ("title", "applicationName")
+GRAM_SIZES: tuple[int, ...] = (1, 2, 3)
+
+
+def Normalize(text: str) -> str:
+    """
+    Normalize a task field or query the way search.js compares them.
+    """
+    return text.lower()
+
+
+def DeltaEncode(docIds: list[int]) -> list[int]:
+    """
+    Store ascending document ids as the first id followed by successive gaps.
+    """
+    return [docId - previous for previous, docId in zip([0] + docIds, docIds)]
+
+
+def DeltaDecode(deltas: list[int]) -> list[int]:
+    docIds = []
+    docId = 0
+    for delta in deltas:
+        docId += delta
+        docIds.append(docId)
+    return docIds
+
+
+class SearchIndexBuilder:
+    """
+    Build the search index one task at a time, in tasks.json order.
+
+    Every substring of up to max(GRAM_SIZES) characters of a normalized search field
+    gets a posting list of the tasks containing it. Queries that short are answered
+    by a single lookup, longer ones by verifying the tasks on their rarest gram.
+    """
+
+    def __init__(self):
+        self.texts: list[str] = []
+        self.ratings: list[list[float]] = []
+        self.postings: dict[str, list[int]] = {}
+
+    def Add(self, task: dict[str, Any]) -> None:
+        docId = len(self.texts)
+        fields = [Normalize(task.get(field) or "") for field in SEARCH_FIELDS]
+
+        grams = set()
+        for field in fields:
+            for size in GRAM_SIZES:
+                for start in range(len(field) - size + 1):
+                    grams.add(field[start : start + size])
+        for gram in grams:
+            self.postings.setdefault(gram, []).append(docId)
+
+        self.texts.append("\n".join(fields))
+        self.ratings.append(
+            [task.get("averageRating") or 0, task.get("ratingCount") or 0]
+        )
+
+    def Build(self) -> dict[str, Any]:
+        """
+        Return the index as a JSON-serializable dict.
+
+        Returns:
+        - fields, gramSize: The indexed task fields and longest indexed gram.
+        - text: Per task, its normalized fields joined by newlines, for verification.
+        - ratings: Per task, [averageRating, ratingCount] for ranking.
+        - postings: Delta encoded task ids per gram.
+        """
+        return {
+            "fields": list(SEARCH_FIELDS),
+            "gramSize": max(GRAM_SIZES),
+            "text": self.texts,
+            "ratings": self.ratings,
+            "postings": {
+                gram: DeltaEncode(docIds)
+                for gram, docIds in sorted(self.postings.items())
+            },
+        }
+
+
+def BuildSearchIndex(tasks: list[dict[str, Any]]) -> dict[str, Any]:
+    builder = SearchIndexBuilder()
+    for task in tasks:
+        builder.Add(task)
+    return builder.Build()
+
+
+def Query(
+    index: dict[str, Any], query: str, limit: int = 5, ranked: bool = False
+) -> list[int]:
+    """
+    Return the ids of the tasks whose title or application name contains query.
+
+    This is the reference for the lookup in search.js: it returns exactly the tasks
+    the old per-keystroke scan found, in tasks.json order.
+
+    Parameters:
+    - index: An index from SearchIndexBuilder.Build.
+    - query: Text typed into the search box.
+    - limit: Maximum number of ids to return.
+    - ranked: Order matches by averageRating then ratingCount instead.
+
+    Returns:
+    - Up to limit task ids.
+    """
+    query = Normalize(query.strip())
+    if not query or "\n" in query:
+        return []
+
+    gramSize = index["gramSize"]
+    postings = index["postings"]
+    if len(query) <= gramSize:
+        deltas = postings.get(query, [])
+    else:
+        grams = [
+            postings.get(query[start : start + gramSize])
+            for start in range(len(query) - gramSize + 1)
+        ]
+        if not all(grams):
+            return []
+        deltas = min(grams, key=len)
+
+    texts = index["text"]
+    matches = []
+    for docId in DeltaDecode(deltas):
+        if len(query) <= gramSize or query in texts[docId]:
+            matches.append(docId)
+            if len(matches) == limit and not ranked:
+                break
+
+    if ranked:
+        ratings = index["ratings"]
+        matches.sort(key=lambda docId: ratings[docId], reverse=True)
+    return matches[:limit]
+
+
+def ScanQuery(tasks: list[dict[str, Any]], query: str, limit: int = 5) -> list[int]:
+    """
+    Return the matching task ids by scanning every task, as search.js used to.
+    """
+    query = Normalize(query.strip())
+    if not query:
+        return []
+    return [
+        docId
+        for docId, task in enumerate(tasks)
+        if any(query in Normalize(task.get(field) or "") for field in SEARCH_FIELDS)
+    ][:limit]
+
+
+def SyntheticTasks(tasks: list[dict[str, Any]], count: int) -> list[dict[str, Any]]:
+    """
+    Generate count tasks whose titles and application names are shuffled words of
+    the real tasks, so gram frequencies stay realistic at any size.
+    """
+    rng = random.Random(count)
+    titleWords = [word for task in tasks for word in (task.get("title") or "").split()]
+    appWords = [
+        word for task in tasks for word in (task.get("applicationName") or "").split()
+    ]
+    return [
+        {
+            "title": " ".join(rng.choices(titleWords, k=rng.randint(1, 5))),
+            "applicationName": " ".join(rng.choices(appWords, k=rng.randint(1, 4))),
+            "averageRating": rng.randint(0, 5),
+            "ratingCount": rng.randint(0, 500),
+        }
+        for _ in range(count)
+    ]
+
+
+def Benchmark(tasks: list[dict[str, Any]], sizes: tuple[int, ...]) -> None:
+    """
+    Compare index lookups with the scan on synthetic task lists of each size,
+    checking both return the same tasks.
+    """
+    rng = random.Random(0)
+    titles = [task["title"] for task in tasks if task.get("title")]
+    queries = []
+    for _ in range(200):
+        title = rng.choice(titles)
+        length = rng.randint(1, min(12, len(title)))
+        start = rng.randint(0, len(title) - length)
+        queries.append(title[start : start + length])
+    queries += ["zzzz", "qx", "registr", "student business"]
+
+    for size in sizes:
+        synthetic = SyntheticTasks(tasks, size)
+
+        start = time.perf_counter()
+        index = BuildSearchIndex(synthetic)
+        buildTime = time.perf_counter() - start
+        indexBytes = len(json.dumps(index, separators=(",", ":")))
+
+        start = time.perf_counter()
+        scanned = [ScanQuery(synthetic, query) for query in queries]
+        scanTime = (time.perf_counter() - start) / len(queries)
+
+        start = time.perf_counter()
+        looked = [Query(index, query) for query in queries]
+        queryTime = (time.perf_counter() - start) / len(queries)
+
+        mismatches = sum(a != b for a, b in zip(scanned, looked))
+        print(
+            f"{size} tasks: build {buildTime:.2f}s, {indexBytes / 1e6:.1f} MB,"
+            f" scan {scanTime * 1e3:.2f}ms, lookup {queryTime * 1e3:.3f}ms"
+            f" ({scanTime / queryTime:.0f}x), {mismatches} mismatches"
+        )
+
+
+def Main():
+    parser = argparse.ArgumentParser(description="Query or benchmark the search index.")
+    parser.add_argument("query", nargs="?", help="Text to search for.")
+    parser.add_argument(
+        "--tasks",
+        type=Path,
+        default=Path(__file__).resolve().parent.parent
+        / "Assets"
+        / "JSON Files"
+        / "tasks.json",
+        help="tasks.json, with searchIndex.json alongside it.",
+    )
+    parser.add_argument("--limit", type=int, default=5)
+    parser.add_argument(
+        "--ranked", action="store_true", help="Order matches by rating."
+    )
+    parser.add_argument(
+        "--benchmark",
+        type=int,
+        nargs="*",
+        metavar="SIZE",
+        help="Benchmark lookups against the scan on synthetic task lists.",
+    )
+    args = parser.parse_args()
+
+    with open(args.tasks, "r") as file:
+        tasks = json.load(file)
+
+    if args.benchmark is not None:
+        Benchmark(tasks, tuple(args.benchmark) or (10000, 30000, 100000))
+        return
+
+    with open(args.tasks.with_stem("searchIndex"), "r") as file:
+        index = json.load(file)
+    for docId in Query(index, args.query or "", args.limit, args.ranked):
+        print(f"{tasks[docId]['title']}: {tasks[docId]['href']}")
+
+
+if __name__ == "__main__":
+    Main()
@@ -0,0 +1,406 @@
+import argparse
+import gzip
+import json
+import mimetypes
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import formatdate, parsedate_to_datetime
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any
+from urllib.parse import unquote, urlsplit
+
+from AssetCache import AssetCache
+
+try:
+    import brotli
+except ImportError:  # Optional; without it only gzip variants are made
+    brotli = None
+
+REPO_DIR: Path = Path(__file__).resolve().parent.parent
+SERVE_CACHE_DIR: Path = Path(__file__).resolve().parent / ".servecache"
+SERVED_DIRS: tuple[str, ...] = ("Source", "Assets")
+INDEX_PATH: str = "/Source/index.html"
+STATS_PATH: str = "/__stats"
+# Fingerprinted by AssetManifest.py, so their content never changes under a name
+IMMUTABLE_DIR: str = "Assets/Hashed"
+COMPRESSIBLE_SUFFIXES: set[str] = {
+    ".css",
+    ".html",
+    ".js",
+    ".json",
+    ".map",
+    ".svg",
+    ".txt",
+    ".xml",
+}
+CONTENT_TYPES: dict[str, str] = {
+    ".js": "text/javascript; charset=utf-8",
+    ".json": "application/json",
+    ".svg": "image/svg+xml",
+    ".webp": "image/webp",
+}
+ENCODING_SUFFIXES: dict[str, str] = {"br": ".br", "gzip": ".gz"}
+
+
+def Compress(data: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(data, quality=11)
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+
+def AcceptedEncodings(acceptEncoding: str) -> set[str]:
+    """
+    Return the codings an Accept-Encoding header allows, ignoring those with q=0.
+    """
+    accepted = set()
+    for item in acceptEncoding.split(","):
+        coding, _, params = item.strip().partition(";")
+        quality = params.strip().removeprefix("q=")
+        try:
+            if params and float(quality) == 0:
+                continue
+        except ValueError:
+            continue
+        accepted.add(coding.strip().lower())
+    return accepted
+
+
+class Asset:
+    """
+    A servable file with its validators and the precompressed variants that came
+    out smaller than it, by content coding.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        stat: os.stat_result,
+        contentHash: str,
+        variants: dict[str, Path],
+    ):
+        self.path: Path = path
+        self.size: int = stat.st_size
+        self.mtimeNs: int = stat.st_mtime_ns
+        self.lastModified: str = formatdate(stat.st_mtime, usegmt=True)
+        self.etag: str = contentHash[:20]
+        self.variants: dict[str, Path] = variants
+        self.contentType: str = CONTENT_TYPES.get(path.suffix) or (
+            mimetypes.guess_type(path.name)[0] or "application/octet-stream"
+        )
+        if self.contentType.startswith("text/") and "charset" not in self.contentType:
+            self.contentType += "; charset=utf-8"
+        relative = path.relative_to(REPO_DIR).as_posix()
+        self.cacheControl: str = (
+            "public, max-age=31536000, immutable"
+            if relative.startswith(IMMUTABLE_DIR + "/")
+            else "no-cache"
+        )
+
+    def Representation(self, acceptEncoding: str) -> tuple[Path, str | None, str]:
+        """
+        Pick the smallest variant the client accepts.
+
+        Returns:
+        - The file to send, its content coding, or None for the file as is, and its
+          quoted ETag, which differs per coding.
+        """
+        accepted = AcceptedEncodings(acceptEncoding)
+        for encoding in ENCODING_SUFFIXES:
+            if encoding in accepted and encoding in self.variants:
+                return self.variants[encoding], encoding, f'"{self.etag}-{encoding}"'
+        return self.path, None, f'"{self.etag}"'
+
+
+class AssetStore:
+    """
+    Index of the served files and their precompressed variants.
+
+    Variants are written once per content hash under cacheDir, so restarts reuse
+    them. A file changed after startup is reindexed when it is next requested.
+    """
+
+    def __init__(self, cache: AssetCache, cacheDir: Path = SERVE_CACHE_DIR):
+        self.cache: AssetCache = cache
+        self.cacheDir: Path = cacheDir
+        self.encodings: tuple[str, ...] = ("br", "gzip") if brotli else ("gzip",)
+        self.assets: dict[Path, Asset] = {}
+        self._lock = threading.Lock()
+
+    def _Variant(self, path: Path, contentHash: str, encoding: str) -> Path | None:
+        variantPath = self.cacheDir / (contentHash + ENCODING_SUFFIXES[encoding])
+        if not variantPath.exists():
+            compressed = Compress(path.read_bytes(), encoding)
+            if len(compressed) >= path.stat().st_size:
+                return None
+            tempPath = variantPath.with_suffix(f".{threading.get_ident()}.tmp")
+            tempPath.write_bytes(compressed)
+            os.replace(tempPath, variantPath)
+        return variantPath
+
+    def _Index(self, path: Path, stat: os.stat_result) -> Asset:
+        with self._lock:
+            contentHash = self.cache.FileHash(path)
+        variants = {}
+        if path.suffix in COMPRESSIBLE_SUFFIXES:
+            for encoding in self.encodings:
+                variantPath = self._Variant(path, contentHash, encoding)
+                if variantPath is not None:
+                    variants[encoding] = variantPath
+        asset = Asset(path, stat, contentHash, variants)
+        self.assets[path] = asset
+        return asset
+
+    def Precompress(self, workers: int | None = None) -> int:
+        """
+        Index every file under the served directories, compressing the text ones on
+        a thread pool, and delete variants of content no longer served.
+
+        Returns:
+        - The number of files indexed.
+        """
+        self.cacheDir.mkdir(parents=True, exist_ok=True)
+        paths = [
+            path
+            for served in SERVED_DIRS
+            for path in (REPO_DIR / served).rglob("*")
+            if path.is_file()
+            and not any(
+                part.startswith(".") for part in path.relative_to(REPO_DIR).parts
+            )
+        ]
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            list(executor.map(lambda path: self._Index(path, path.stat()), paths))
+
+        live = {
+            variantPath.name
+            for asset in self.assets.values()
+            for variantPath in asset.variants.values()
+        }
+        for variantPath in self.cacheDir.iterdir():
+            if variantPath.name not in live:
+                variantPath.unlink(missing_ok=True)
+        return len(paths)
+
+    def Lookup(self, urlPath: str) -> Asset | None:
+        """
+        Return the asset a URL path names, or None if it is not a served file.
+        """
+        parts = [part for part in urlPath.split("/") if part]
+        if (
+            not parts
+            or parts[0] not in SERVED_DIRS
+            or any(part.startswith(".") or "\\" in part for part in parts)
+        ):
+            return None
+        path = REPO_DIR.joinpath(*parts)
+        try:
+            stat = path.stat()
+        except OSError:
+            return None
+        if not path.is_file():
+            return None
+        asset = self.assets.get(path)
+        if asset is None or (asset.size, asset.mtimeNs) != (
+            stat.st_size,
+            stat.st_mtime_ns,
+        ):
+            asset = self._Index(path, stat)
+        return asset
+
+
+class ServerStats:
+    """
+    Request counts, bytes served and the latencies of the most recent requests.
+    """
+
+    def __init__(self, window: int = 10000):
+        self.startedAt: float = time.time()
+        self.requests: int = 0
+        self.statuses: dict[int, int] = {}
+        self.bytesServed: int = 0
+        self.bytesByEncoding: dict[str, int] = {}
+        self.latencies: deque[float] = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def Record(self, status: int, bytesSent: int, encoding: str, seconds: float):
+        with self._lock:
+            self.requests += 1
+            self.statuses[status] = self.statuses.get(status, 0) + 1
+            self.bytesServed += bytesSent
+            self.bytesByEncoding[encoding] = (
+                self.bytesByEncoding.get(encoding, 0) + bytesSent
+            )
+            self.latencies.append(seconds)
+
+    def Snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            latencies = sorted(self.latencies)
+            snapshot = {
+                "uptimeSeconds": time.time() - self.startedAt,
+                "requests": self.requests,
+                "statuses": {str(status): n for status, n in self.statuses.items()},
+                "bytesServed": self.bytesServed,
+                "bytesByEncoding": dict(self.bytesByEncoding),
+            }
+
+        latencyMs = {"window": len(latencies)}
+        if latencies:
+            latencyMs["mean"] = sum(latencies) / len(latencies) * 1e3
+            for name, fraction in (("p50", 0.5), ("p90", 0.9), ("p99", 0.99)):
+                position = min(len(latencies) - 1, int(fraction * len(latencies)))
+                latencyMs[name] = latencies[position] * 1e3
+            latencyMs["max"] = latencies[-1] * 1e3
+        snapshot["latencyMs"] = latencyMs
+        return snapshot
+
+
+class AssetRequestHandler(BaseHTTPRequestHandler):
+    """
+    Serve GET and HEAD requests from the server's AssetStore, with keep-alive.
+    """
+
+    protocol_version = "HTTP/1.1"
+    # Headers and the sendfile body go out in separate writes
+    disable_nagle_algorithm = True
+    quiet: bool = False
+
+    def log_message(self, format: str, *args) -> None:
+        if not self.quiet:
+            super().log_message(format, *args)
+
+    def do_GET(self) -> None:
+        self._Serve(sendBody=True)
+
+    def do_HEAD(self) -> None:
+        self._Serve(sendBody=False)
+
+    def _Serve(self, sendBody: bool) -> None:
+        start = time.perf_counter()
+        urlPath = unquote(urlsplit(self.path).path)
+        if urlPath == STATS_PATH:
+            self._SendBytes(
+                json.dumps(self.server.stats.Snapshot(), indent=4).encode("utf-8"),
+                "application/json",
+                sendBody,
+            )
+            return
+
+        status, bytesSent, encoding = HTTPStatus.NOT_FOUND, 0, "identity"
+        try:
+            if urlPath in ("", "/"):
+                status = HTTPStatus.FOUND
+                self.send_response(status)
+                self.send_header("Location", INDEX_PATH)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+
+            asset = self.server.store.Lookup(urlPath)
+            if asset is None:
+                self.send_error(status)
+                return
+
+            filePath, encoding, etag = asset.Representation(
+                self.headers.get("Accept-Encoding", "")
+            )
+            encoding = encoding or "identity"
+            status = HTTPStatus.NOT_MODIFIED if self._NotModified(asset, etag) else 200
+            self.send_response(status)
+            self.send_header("ETag", etag)
+            self.send_header("Last-Modified", asset.lastModified)
+            self.send_header("Cache-Control", asset.cacheControl)
+            if asset.variants:
+                self.send_header("Vary", "Accept-Encoding")
+            if status == HTTPStatus.NOT_MODIFIED:
+                self.end_headers()
+                return
+
+            with open(filePath, "rb") as file:
+                size = os.fstat(file.fileno()).st_size
+                self.send_header("Content-Type", asset.contentType)
+                self.send_header("Content-Length", str(size))
+                if encoding != "identity":
+                    self.send_header("Content-Encoding", encoding)
+                self.end_headers()
+                if sendBody:
+                    # socket.sendfile uses os.sendfile where the platform has it
+                    bytesSent = self.connection.sendfile(file)
+        finally:
+            self.server.stats.Record(
+                int(status), bytesSent, encoding, time.perf_counter() - start
+            )
+
+    def _NotModified(self, asset: Asset, etag: str) -> bool:
+        """
+        Evaluate If-None-Match, or If-Modified-Since when there is none.
+        """
+        ifNoneMatch = self.headers.get("If-None-Match")
+        if ifNoneMatch is not None:
+            tags = [tag.strip().removeprefix("W/") for tag in ifNoneMatch.split(",")]
+            return "*" in tags or etag in tags
+        ifModifiedSince = self.headers.get("If-Modified-Since")
+        if ifModifiedSince is None:
+            return False
+        try:
+            since = parsedate_to_datetime(ifModifiedSince).timestamp()
+        except (TypeError, ValueError):
+            return False
+        return asset.mtimeNs // 1_000_000_000 <= since
+
+    def _SendBytes(self, body: bytes, contentType: str, sendBody: bool) -> None:
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", contentType)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        if sendBody:
+            self.wfile.write(body)
+
+
+def Main():
+    parser = argparse.ArgumentParser(
+        description="Serve Source and Assets locally with precompression and validators."
+    )
+    parser.add_argument("--port", type=int, default=3000)
+    parser.add_argument("--bind", default="127.0.0.1", help="Address to listen on.")
+    parser.add_argument(
+        "--workers", type=int, help="Number of threads compressing assets at startup."
+    )
+    parser.add_argument(
+        "--quiet", action="store_true", help="Do not log every request."
+    )
+    args = parser.parse_args()
+
+    with AssetCache() as cache:
+        store = AssetStore(cache)
+        start = time.perf_counter()
+        fileCount = store.Precompress(args.workers)
+        variantCount = sum(len(asset.variants) for asset in store.assets.values())
+        print(
+            f"Indexed {fileCount} files with {variantCount} compressed variants"
+            f" ({', '.join(store.encodings)}) in {time.perf_counter() - start:.2f}s"
+        )
+
+        AssetRequestHandler.quiet = args.quiet
+        server = ThreadingHTTPServer((args.bind, args.port), AssetRequestHandler)
+        server.store = store
+        server.stats = ServerStats()
+        print(
+            f"Serving http://{args.bind}:{args.port}{INDEX_PATH},"
+            f" stats at {STATS_PATH}"
+        )
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+
+
+if __name__ == "__main__":
+    Main()
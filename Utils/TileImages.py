@@ -0,0 +1,256 @@
+import argparse
+import json
+import math
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+from functools import partial
+from pathlib import Path
+
+from PIL import Image
+from tqdm import tqdm
+
+from AssetCache import AssetCache
+
+REPO_DIR: Path = Path(__file__).resolve().parent.parent
+# Tile images are shown at 144 CSS pixels; variants are made at 1x and 2x of that
+TILE_SIZE: int = 144
+SCALES: tuple[int, ...] = (1, 2)
+
+
+def RepoPath(webPath: str) -> Path:
+    """
+    Return the file a page path such as "../../Assets/Media/X.png" refers to.
+    """
+    return REPO_DIR.joinpath(*[part for part in Path(webPath).parts if part != ".."])
+
+
+def WebPath(filePath: Path) -> str:
+    """
+    Return the page path of a file in the repository, the inverse of RepoPath.
+    """
+    return "../../" + filePath.relative_to(REPO_DIR).as_posix()
+
+
+def TileVariantSizes(imageSize: tuple[int, int], tileSize: int) -> list[int]:
+    """
+    Return the box sizes to render an image at: one per scale of tileSize, skipping
+    scales the image is too small for, but always at least the 1x size.
+    """
+    sizes = [tileSize * scale for scale in SCALES]
+    return [size for size in sizes if size <= max(imageSize)] or sizes[:1]
+
+
+def Fit(image: Image.Image, size: int) -> Image.Image:
+    """
+    Scale an image down to fit a size by size box, keeping its aspect ratio.
+    """
+    scale = min(1, size / max(image.size))
+    fitted = (
+        max(1, round(image.width * scale)),
+        max(1, round(image.height * scale)),
+    )
+    if fitted == image.size:
+        return image.copy()
+    return image.resize(fitted, Image.LANCZOS)
+
+
+def WriteTileVariants(
+    imagePath: Path, outputDir: Path, tileSize: int = TILE_SIZE
+) -> list[Path]:
+    """
+    Write the PNG and lossless WebP variants of one tile image.
+
+    Parameters:
+    - imagePath: The full-size image.
+    - outputDir: Directory to write "<stem>-<size>.png" and ".webp" files into.
+    - tileSize: The 1x display size of the tile.
+
+    Returns:
+    - The written files, PNG then WebP for each size from smallest to largest.
+    """
+    outputPaths = []
+    with Image.open(imagePath) as image:
+        image = image.convert("RGBA")
+        for size in TileVariantSizes(image.size, tileSize):
+            fitted = Fit(image, size)
+            pngPath = outputDir / f"{imagePath.stem}-{size}.png"
+            webpPath = pngPath.with_suffix(".webp")
+            fitted.save(pngPath, optimize=True)
+            fitted.save(webpPath, lossless=True, method=6)
+            outputPaths += [pngPath, webpPath]
+    return outputPaths
+
+
+def WriteSprite(
+    imagePaths: list[Path], outputDir: Path, tileSize: int = TILE_SIZE
+) -> dict[str, list[int]]:
+    """
+    Pack the 1x variants of every image into one square grid sprite sheet, written as
+    sprite.png and sprite.webp.
+
+    Returns:
+    - The [x, y, width, height] of each image in the sheet by its file path.
+    """
+    columns = max(1, math.ceil(math.sqrt(len(imagePaths))))
+    rows = math.ceil(len(imagePaths) / columns)
+    sheet = Image.new("RGBA", (columns * tileSize, rows * tileSize))
+    offsets = {}
+    for num, imagePath in enumerate(imagePaths):
+        with Image.open(imagePath) as image:
+            fitted = Fit(image.convert("RGBA"), tileSize)
+        x, y = num % columns * tileSize, num // columns * tileSize
+        sheet.paste(fitted, (x, y))
+        offsets[str(imagePath)] = [x, y, fitted.width, fitted.height]
+
+    sheet.save(outputDir / "sprite.png", optimize=True)
+    sheet.save(outputDir / "sprite.webp", lossless=True, method=6)
+    return offsets
+
+
+def BuildTileImages(
+    imageData: dict[str, str | list[str]],
+    outputDir: Path = REPO_DIR / "Assets" / "Media" / "Tiles",
+    tileSize: int = TILE_SIZE,
+    sprite: bool = False,
+    workers: int | None = None,
+    cache: AssetCache | None = None,
+) -> dict[str, dict | None]:
+    """
+    Write display-size PNG and WebP variants of every image in imageData.
+
+    Parameters:
+    - imageData: Mapping of tile titles to image page paths, or lists of them.
+    - outputDir: Directory the variants are written to.
+    - tileSize: The 1x display size of a tile image.
+    - sprite: Also pack the 1x variants into a sprite sheet.
+    - workers: Number of worker processes.
+    - cache: Restore variants of unchanged images from this cache.
+
+    Returns:
+    - images: The variants of each image by its page path. "image" is the 1x PNG,
+      "srcset" and "webpSrcset" list every size, "width" and "height" are the 1x
+      size, and "sprite" is its [x, y, width, height] in the sheet if one was made.
+    - sprite: The PNG "image" and "webp" paths of the sheet, or None.
+    """
+    outputDir.mkdir(parents=True, exist_ok=True)
+    webPaths = sorted(
+        {
+            path
+            for paths in imageData.values()
+            for path in ([paths] if isinstance(paths, str) else paths)
+        }
+    )
+    imagePaths = [RepoPath(webPath) for webPath in webPaths]
+
+    outputs = {}
+    misses = imagePaths
+    if cache is not None:
+        params = {"tileSize": tileSize, "scales": SCALES}
+        keys = {}
+        misses = []
+        for imagePath in imagePaths:
+            # Variants are named after the image, and several images share content
+            keys[imagePath] = cache.Key(
+                "TileImages",
+                cache.FileHash(imagePath),
+                {**params, "stem": imagePath.stem},
+            )
+            variants = cache.GetValue(keys[imagePath])
+            if variants is not None and all(
+                cache.GetFile(f"{keys[imagePath]}:{name}", outputDir / name)
+                for name in variants
+            ):
+                outputs[imagePath] = [outputDir / name for name in variants]
+            else:
+                misses.append(imagePath)
+
+    process = partial(WriteTileVariants, outputDir=outputDir, tileSize=tileSize)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        written = tqdm(
+            executor.map(process, misses, chunksize=8),
+            desc="Resizing tile images",
+            total=len(misses),
+        )
+        for imagePath, outputPaths in zip(misses, written):
+            outputs[imagePath] = outputPaths
+            if cache is not None:
+                for outputPath in outputPaths:
+                    cache.PutFile(f"{keys[imagePath]}:{outputPath.name}", outputPath)
+                cache.PutValue(keys[imagePath], [path.name for path in outputPaths])
+
+    offsets = WriteSprite(imagePaths, outputDir, tileSize) if sprite else {}
+
+    variants = {}
+    for webPath, imagePath in zip(webPaths, imagePaths):
+        pngPaths = outputs[imagePath][0::2]
+        webpPaths = outputs[imagePath][1::2]
+        with Image.open(pngPaths[0]) as image:
+            width, height = image.size
+        variants[webPath] = {
+            "image": WebPath(pngPaths[0]),
+            "srcset": ", ".join(
+                f"{WebPath(path)} {num + 1}x" for num, path in enumerate(pngPaths)
+            ),
+            "webpSrcset": ", ".join(
+                f"{WebPath(path)} {num + 1}x" for num, path in enumerate(webpPaths)
+            ),
+            "width": width,
+            "height": height,
+        }
+        if sprite:
+            variants[webPath]["sprite"] = offsets[str(imagePath)]
+
+    sheet = None
+    if sprite:
+        sheet = {
+            "image": WebPath(outputDir / "sprite.png"),
+            "webp": WebPath(outputDir / "sprite.webp"),
+        }
+    return {"images": variants, "sprite": sheet}
+
+
+def Main():
+    parser = argparse.ArgumentParser(
+        description="Write display-size PNG and WebP variants of the tile images."
+    )
+    parser.add_argument(
+        "--image-data",
+        type=Path,
+        default=REPO_DIR / "Assets" / "JSON Files" / "imageData.json",
+        help="Mapping of tile titles to images; imageVariants.json is written alongside.",
+    )
+    parser.add_argument(
+        "--tile-size", type=int, default=TILE_SIZE, help="1x display size of a tile."
+    )
+    parser.add_argument(
+        "--sprite", action="store_true", help="Also pack the tiles into a sprite sheet."
+    )
+    parser.add_argument("--workers", type=int, help="Number of worker processes.")
+    parser.add_argument(
+        "--no-cache",
+        dest="cache",
+        action="store_false",
+        help="Rebuild every variant instead of reusing cached results.",
+    )
+    args = parser.parse_args()
+
+    with open(args.image_data, "r") as file:
+        imageData = json.load(file)
+
+    with AssetCache() if args.cache else nullcontext() as cache:
+        variants = BuildTileImages(
+            imageData,
+            tileSize=args.tile_size,
+            sprite=args.sprite,
+            workers=args.workers,
+            cache=cache,
+        )
+        if cache is not None:
+            print(cache.Report())
+
+    with open(args.image_data.with_stem("imageVariants"), "w") as file:
+        json.dump(variants, file, indent=4)
+
+
+if __name__ == "__main__":
+    Main()
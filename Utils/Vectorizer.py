@@ -1,221 +1,1403 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
+import argparse
+import gzip
 import logging
-import operator
+import os
 import sys
-from collections import deque
-from io import StringIO
+import time
+from array import array
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    ProcessPoolExecutor,
+    as_completed,
+    wait,
+)
+from contextlib import nullcontext
+from io import StringIO, TextIOWrapper
+from itertools import groupby
+from operator import itemgetter
+from pathlib import Path
 
+import numpy as np
 from PIL import Image
 from tqdm import tqdm
 
+from AssetCache import AssetCache
+from Instrumentation import NO_INSTRUMENTATION, Instrumentation
+
 logging.basicConfig()
 log = logging.getLogger("png2svg")
 
 
-def AddTuple(a, b):
-    return tuple(map(operator.add, a, b))
+def SvgHeader(width, height):
+    return f"""<?xml version="1.0" encoding="UTF-8" standalone="no"?>
+<!DOCTYPE svg PUBLIC "-//W3C//DTD SVG 1.1//EN"
+  "http://www.w3.org/Graphics/SVG/1.1/DTD/svg11.dtd">
+<svg width="{width}" height="{height}"
+     xmlns="http://www.w3.org/2000/svg" version="1.1">
+"""
 
 
-def SubTuple(a, b):
-    return tuple(map(operator.sub, a, b))
+def FillStyle(rgba):
+    return f"fill:rgb{tuple(rgba[0:3])}; fill-opacity:{float(rgba[3]) / 255:.3f}; stroke:none;"
 
 
-def NegTuple(a):
-    return tuple(map(operator.neg, a))
+def PixelRects(im, opaque=None, merge=None):
+    """
+    Find the rectangles to draw for an RGBA image in pixel mode.
 
+    Parameters:
+    - im: RGBA image.
+    - opaque: If True, skip fully transparent pixels.
+    - merge: None for one rect per pixel in column-major order, "runs" to merge
+      horizontal runs of identical RGBA, or "spans" to additionally merge identical
+      runs in consecutive rows into taller rects.
 
-def Direction(edge):
-    return SubTuple(edge[1], edge[0])
+    Returns:
+    - xs, ys, widths, heights and packed colours of the rects, as NumPy arrays.
+    """
+    packed = PackRgba(im)
+    height = packed.shape[0]
 
+    if merge is None:
+        colors = packed.T.ravel()
+        xs, ys = np.divmod(np.arange(colors.size), height)
+        widths = np.ones(colors.size, dtype=np.int64)
+        heights = widths
+    elif merge in ("runs", "spans"):
+        runStarts = np.ones(packed.shape, dtype=bool)
+        runStarts[:, 1:] = packed[:, 1:] != packed[:, :-1]
+        ys, xs = np.nonzero(runStarts)
+        colors = packed[ys, xs]
+        widths = np.diff(np.append(np.flatnonzero(runStarts.ravel()), packed.size))
+        heights = np.ones(colors.size, dtype=np.int64)
+        if merge == "spans":
+            order = np.lexsort((ys, colors, widths, xs))
+            xs, ys, widths, colors = xs[order], ys[order], widths[order], colors[order]
+            continues = np.zeros(colors.size, dtype=bool)
+            continues[1:] = (
+                (xs[1:] == xs[:-1])
+                & (widths[1:] == widths[:-1])
+                & (colors[1:] == colors[:-1])
+                & (ys[1:] == ys[:-1] + 1)
+            )
+            rectStarts = np.flatnonzero(~continues)
+            heights = np.diff(np.append(rectStarts, colors.size))
+            xs, ys, widths, colors = (
+                xs[rectStarts],
+                ys[rectStarts],
+                widths[rectStarts],
+                colors[rectStarts],
+            )
+            order = np.lexsort((xs, ys))
+            xs, ys, widths, heights, colors = (
+                xs[order],
+                ys[order],
+                widths[order],
+                heights[order],
+                colors[order],
+            )
+    else:
+        raise ValueError(f"Unknown merge mode: {merge!r}")
 
-def Magnitude(a):
-    return int(pow(pow(a[0], 2) + pow(a[1], 2), 0.5))
+    if opaque:
+        keep = colors.view(np.uint8).reshape(-1, 4)[:, 3] != 0
+        xs, ys, widths, heights, colors = (
+            xs[keep],
+            ys[keep],
+            widths[keep],
+            heights[keep],
+            colors[keep],
+        )
+    return xs, ys, widths, heights, colors
 
 
-def Normalize(a):
-    mag = Magnitude(a)
-    if mag <= 0:
-        raise ValueError("Cannot normalize a zero-length vector")
-    return tuple(map(operator.truediv, a, [mag] * len(a)))
+def RgbaImageToSvgPixels(
+    im,
+    opaque=None,
+    merge=None,
+    out=None,
+    chunkSize=65536,
+    instrumentation=NO_INSTRUMENTATION,
+):
+    """
+    Convert an RGBA image to SVG with one <rect> per pixel, run or span.
 
+    Parameters:
+    - im: RGBA image.
+    - opaque: If True, ignore fully transparent pixels.
+    - merge: Rect merging mode, see PixelRects.
+    - out: Text file handle to stream the SVG to. If None, the SVG is returned.
+    - chunkSize: Number of rects formatted per write.
+    - instrumentation: Records the "rects" and "writing" phases.
 
-def SvgHeader(width, height):
-    return f"""<?xml version="1.0" encoding="UTF-8" standalone="no"?>
-<!DOCTYPE svg PUBLIC "-//W3C//DTD SVG 1.1//EN"
-  "http://www.w3.org/Graphics/SVG/1.1/DTD/svg11.dtd">
-<svg width="{width}" height="{height}"
-     xmlns="http://www.w3.org/2000/svg" version="1.1">
-"""
+    Returns:
+    - The SVG as a string if out is None, otherwise None.
+    """
+    s = StringIO() if out is None else out
 
+    with instrumentation.Phase("rects", "rects") as phase:
+        xs, ys, widths, heights, colors = PixelRects(im, opaque, merge)
+        phase.Add(colors.size)
 
-def RgbaImageToSvgPixels(im, opaque=None):
-    s = StringIO()
-    s.write(SvgHeader(*im.size))
+    with instrumentation.Phase("writing", "rects") as phase:
+        s.write(SvgHeader(*im.size))
+        styles = {}
+        for start in range(0, colors.size, chunkSize):
+            stop = start + chunkSize
+            lines = []
+            for x, y, w, h, packed in zip(
+                xs[start:stop].tolist(),
+                ys[start:stop].tolist(),
+                widths[start:stop].tolist(),
+                heights[start:stop].tolist(),
+                colors[start:stop].tolist(),
+            ):
+                style = styles.get(packed)
+                if style is None:
+                    style = styles[packed] = FillStyle(UnpackRgba(packed))
+                lines.append(
+                    f"""  <rect x="{x}" y="{y}" width="{w}" height="{h}" style="{style}" />\n"""
+                )
+            s.write("".join(lines))
+        s.write("</svg>\n")
+        phase.Add(colors.size)
+    if out is None:
+        return s.getvalue()
 
-    width, height = im.size
-    for x in tqdm(range(width), desc="Processing width"):
-        for y in tqdm(range(height), desc="Processing height", leave=False):
-            here = (x, y)
-            rgba = im.getpixel(here)
-            if opaque and not rgba[3]:
-                continue
-            s.write(
-                f"""  <rect x="{x}" y="{y}" width="1" height="1" style="fill:rgb{rgba[0:3]}; fill-opacity:{float(rgba[3]) / 255:.3f}; stroke:none;" />\n"""
-            )
-    s.write("</svg>\n")
-    return s.getvalue()
-
-
-def JoinedEdges(assortedEdges, keepEveryPoint=False):
-    pieces = []
-    piece = []
-    directions = deque(
-        [
-            (0, 1),
-            (1, 0),
-            (0, -1),
-            (-1, 0),
-        ]
-    )
-    while assortedEdges:
-        if not piece:
-            piece.append(assortedEdges.pop())
-        currentDirection = Normalize(Direction(piece[-1]))
-        while currentDirection != directions[2]:
-            directions.rotate()
-        for i in tqdm(range(1, 4), desc="Finding next edge", leave=False):
-            nextEnd = AddTuple(piece[-1][1], directions[i])
-            nextEdge = (piece[-1][1], nextEnd)
-            if nextEdge in assortedEdges:
-                assortedEdges.remove(nextEdge)
-                if i == 2 and not keepEveryPoint:
-                    piece[-1] = (piece[-1][0], nextEdge[1])
-                else:
-                    piece.append(nextEdge)
-                if piece[0][0] == piece[-1][1]:
-                    if not keepEveryPoint and Normalize(
-                        Direction(piece[0])
-                    ) == Normalize(Direction(piece[-1])):
-                        piece[-1] = (piece[-1][0], piece.pop(0)[1])
-                    pieces.append(piece)
-                    piece = []
+
+def PackRgba(im):
+    """
+    Return the pixels of an RGBA image as a (height, width) array of uint32 colours.
+    """
+    rgba = np.ascontiguousarray(np.asarray(im, dtype=np.uint8))
+    return rgba.view(np.uint32)[..., 0]
+
+
+def UnpackRgba(packed):
+    """
+    Convert a packed uint32 colour back into an (r, g, b, a) tuple.
+    """
+    return tuple(int(c) for c in np.array([packed], dtype=np.uint32).view(np.uint8))
+
+
+def _UnionRuns(nRuns, a, b):
+    """
+    Union-find over run ids, returning the root (smallest run id) of every run.
+
+    Roots are hooked onto the smaller root of each linked pair and the forest is
+    fully compressed after every round, so a round is a handful of array operations.
+    """
+    parent = np.arange(nRuns, dtype=np.int64)
+    while a.size:
+        rootA = parent[a]
+        rootB = parent[b]
+        linked = rootA != rootB
+        if not linked.any():
+            break
+        a = a[linked]
+        b = b[linked]
+        lo = np.minimum(rootA[linked], rootB[linked])
+        hi = np.maximum(rootA[linked], rootB[linked])
+        np.minimum.at(parent, hi, lo)
+        while True:
+            grandparent = parent[parent]
+            if np.array_equal(grandparent, parent):
                 break
+            parent = grandparent
+    return parent
+
+
+def OpaqueMask(packed):
+    """
+    Return a mask of the packed colours whose alpha is non-zero.
+    """
+    return packed.view(np.uint8).reshape(packed.shape + (4,))[..., 3] != 0
+
+
+def LabelRegions(im, opaque=None):
+    """
+    Label the 4-connected regions of identical colour in an RGBA image.
+
+    Returns:
+    - labels: (height, width) int32 array of region ids, -1 for skipped pixels.
+      Regions are numbered in column-major order of their first pixel.
+    - regionColors: uint32 array holding the packed colour of every region.
+    """
+    packed = PackRgba(im)
+    valid = OpaqueMask(packed) if opaque else np.ones(packed.shape, dtype=bool)
+    return LabelPacked(packed, valid)
+
+
+def LabelPacked(packed, valid, tolerance=0):
+    """
+    Label the 4-connected regions of identical colour in a packed colour array.
+
+    Columns are split into runs of one colour; runs in neighbouring columns that
+    share a colour are merged with a vectorized union-find. Pixels outside valid
+    are labelled -1. Returns the same (labels, regionColors) pair as LabelRegions.
+
+    With a tolerance, neighbouring pixels join when none of their channels differ
+    by more than it, so a region can drift in colour along a gradient. Its colour
+    in regionColors is then that of its first run.
+    """
+    columns = packed.T
+    validColumns = valid.T
+    if tolerance:
+        channels = np.ascontiguousarray(packed).view(np.uint8)
+        channels = channels.reshape(packed.shape + (4,)).transpose(1, 0, 2)
+        channels = channels.astype(np.int16)
+        along = np.abs(channels[:, 1:] - channels[:, :-1]).max(axis=-1) <= tolerance
+        along &= validColumns[:, 1:] == validColumns[:, :-1]
+        across = np.abs(channels[1:] - channels[:-1]).max(axis=-1) <= tolerance
+        across &= validColumns[:-1]
+        del channels
+    else:
+        along = columns[:, 1:] == columns[:, :-1]
+        across = columns[1:] == columns[:-1]
+
+    runStarts = np.ones(columns.shape, dtype=bool)
+    runStarts[:, 1:] = ~along
+    runIds = np.cumsum(runStarts.ravel(), dtype=np.int64).reshape(columns.shape) - 1
+    runColors = columns.ravel()[runStarts.ravel()]
+    nRuns = runColors.size
+
+    same = across & validColumns[1:]
+    pairs = np.unique(runIds[1:][same] * nRuns + runIds[:-1][same])
+    roots = _UnionRuns(nRuns, pairs // nRuns, pairs % nRuns)
+
+    runValid = validColumns.ravel()[runStarts.ravel()]
+    regionRoots, runLabels = np.unique(roots[runValid], return_inverse=True)
+    runToLabel = np.full(nRuns, -1, dtype=np.int32)
+    runToLabel[runValid] = runLabels
+
+    labels = np.ascontiguousarray(runToLabel[runIds].T)
+    return labels, runColors[regionRoots]
+
+
+def _MergeSmallRegions(packed, minArea, maxRounds=8):
+    """
+    Repaint the regions of a packed colour array smaller than minArea pixels in the
+    colour of their largest neighbouring region, until none are left or maxRounds
+    relabelings have passed.
+
+    A region only takes the colour of a neighbour ranked above it by area, then
+    label, so a round never swaps two regions' colours; clusters of small regions
+    settle over a few rounds.
+    """
+    everyPixel = np.ones(packed.shape, dtype=bool)
+    for _ in range(maxRounds):
+        labels, regionColors = LabelPacked(packed, everyPixel)
+        areas = np.bincount(labels.ravel())
+        small = areas < minArea
+        if not small.any():
+            break
+
+        inner = []
+        outer = []
+        for a, b in ((labels[:, 1:], labels[:, :-1]), (labels[1:], labels[:-1])):
+            touching = (a != b) & (small[a] | small[b])
+            inner += [a[touching], b[touching]]
+            outer += [b[touching], a[touching]]
+        inner = np.concatenate(inner)
+        outer = np.concatenate(outer)
+        keep = small[inner]
+        inner, outer = inner[keep], outer[keep]
+
+        order = np.lexsort((outer, areas[outer], inner))
+        inner, outer = inner[order], outer[order]
+        last = np.flatnonzero(np.append(inner[1:] != inner[:-1], True))
+        inner, outer = inner[last], outer[last]
+        above = (areas[outer] > areas[inner]) | (
+            (areas[outer] == areas[inner]) & (outer > inner)
+        )
+        if not above.any():
+            break
+        regionColors[inner[above]] = regionColors[outer[above]]
+        packed = regionColors[labels]
+    return packed
+
+
+def ReduceColors(im, colors=None, tolerance=None, minArea=None):
+    """
+    Simplify the colours of an RGBA image before labeling, so anti-aliased edges
+    and noise no longer split it into thousands of tiny regions.
+
+    Parameters:
+    - im: RGBA image.
+    - colors: If set, map every pixel to the nearest colour of an adaptive palette
+      of this many colours, without dithering.
+    - tolerance: If set, join neighbouring pixels whose channels all differ by at
+      most this much into regions, each painted in its mean colour.
+    - minArea: If set, repaint regions smaller than this many pixels in the colour
+      of their largest neighbouring region.
+
+    Returns:
+    - The simplified RGBA image. Fully transparent pixels become transparent black.
+    """
+    rgba = np.array(im, dtype=np.uint8)
+    rgba[rgba[..., 3] == 0] = 0
+    if colors:
+        palette = Image.fromarray(rgba, "RGBA").quantize(
+            colors, method=Image.Quantize.FASTOCTREE, dither=Image.Dither.NONE
+        )
+        rgba = np.array(palette.convert("RGBA"), dtype=np.uint8)
+        rgba[rgba[..., 3] == 0] = 0
+    packed = rgba.view(np.uint32)[..., 0]
+
+    if tolerance:
+        labels, _ = LabelPacked(packed, np.ones(packed.shape, dtype=bool), tolerance)
+        flatLabels = labels.ravel()
+        areas = np.bincount(flatLabels)
+        means = np.empty((areas.size, 4), dtype=np.uint8)
+        for channel in range(4):
+            sums = np.bincount(flatLabels, weights=rgba[..., channel].ravel())
+            means[:, channel] = np.rint(sums / areas)
+        packed = means.view(np.uint32)[:, 0][labels]
+        del labels, flatLabels
+
+    if minArea and minArea > 1:
+        packed = _MergeSmallRegions(packed, minArea)
+
+    reduced = np.ascontiguousarray(packed).view(np.uint8).reshape(packed.shape + (4,))
+    return Image.fromarray(reduced, "RGBA")
+
+
+# Pixel sides, in the order edges are numbered. Each side is walked with the pixel
+# on its left: left side downwards, bottom side rightwards, right side upwards and
+# top side leftwards.
+_SIDES = ("left", "bottom", "right", "top")
+
+# Start vertex of each side relative to the pixel's top-left corner.
+_SIDE_STARTS = ((0, 0), (0, 1), (1, 1), (1, 0))
+
+# Neighbour across each side, as (dx, dy).
+_SIDE_NEIGHBOURS = ((-1, 0), (0, 1), (1, 0), (0, -1))
+
+# Candidate successors of each side as (side, dx, dy) relative to the pixel, in order
+# of preference: the tight turn around the same pixel, straight on, then the wide
+# turn. Preferring the tight turn keeps every ring inside one 4-connected region.
+_SIDE_SUCCESSORS = (
+    ((1, 0, 0), (0, 0, 1), (3, -1, 1)),
+    ((2, 0, 0), (1, 1, 0), (0, 1, 1)),
+    ((3, 0, 0), (2, 0, -1), (1, 1, -1)),
+    ((0, 0, 0), (3, -1, 0), (2, -1, -1)),
+)
+
+
+def _BoundaryCorners(keys, owned, keepEveryPoint=False, origin=(0, 0)):
+    """
+    Find the corners of the boundary edges of the owned pixels of a key map.
+
+    Every side of a pixel whose neighbour has a different key is a directed edge
+    with the pixel on its left. Keys of -1 mark pixels outside every region, and
+    edges are only found for pixels off the outer border, so owned pixels need a
+    border of at least one pixel, or two where the border pixels hold real keys.
+
+    Each edge has exactly one successor, found with array lookups, so the work is
+    linear in the number of edges. When keepEveryPoint is False, straight runs are
+    skipped with pointer doubling and only the corners are kept.
+
+    Returns:
+    - None if there are no edges, otherwise packed arrays with one entry per corner:
+      its x and y with the key map pixel at origin placed at (0, 0), its edge id,
+      the unowned edge a walk continues into after it or -1, the next corner along
+      the boundary or -1, and its key map pixel. Edges are ids side * keys.size +
+      flat pixel index. Last comes an array of the corners that walks must start
+      at because no owned edge leads into them.
+    """
+    height, width = keys.shape
+    nPixels = keys.size
+    interior = keys[1:-1, 1:-1]
+
+    hasEdge = np.zeros((len(_SIDES), height, width), dtype=bool)
+    for side, (dx, dy) in enumerate(_SIDE_NEIGHBOURS):
+        neighbour = keys[1 + dy : height - 1 + dy, 1 + dx : width - 1 + dx]
+        hasEdge[side, 1:-1, 1:-1] = (interior >= 0) & (neighbour != interior)
+    hasEdge = hasEdge.reshape(len(_SIDES), nPixels)
+    ownedEdge = hasEdge & owned.ravel()
+
+    # Edges are numbered side-major, pixel-minor; owned edges are indexed 0..nEdges-1
+    # in that order, found by binary search rather than a table over every edge id.
+    edgeIds = np.flatnonzero(ownedEdge)
+    nEdges = edgeIds.size
+    if not nEdges:
+        return None
+    sides, pixels = np.divmod(edgeIds, nPixels)
+
+    nextEdges = np.full(nEdges, -1, dtype=np.int64)
+    for side, candidates in enumerate(_SIDE_SUCCESSORS):
+        inSide = np.flatnonzero(sides == side)
+        for nextSide, dx, dy in candidates:
+            target = pixels[inSide] + dy * width + dx
+            found = (nextEdges[inSide] < 0) & hasEdge[nextSide, target]
+            nextEdges[inSide[found]] = nextSide * nPixels + target[found]
+    del hasEdge
+    nextOwned = ownedEdge.ravel()[nextEdges]
+    del ownedEdge
+    successors = np.full(nEdges, -1, dtype=np.int64)
+    successors[nextOwned] = np.searchsorted(edgeIds, nextEdges[nextOwned])
+
+    # Walks start at an edge with no owned predecessor and end at an edge with no
+    # owned successor; both ends are kept as corners so the walk can stop there.
+    predecessors = np.full(nEdges, -1, dtype=np.int64)
+    predecessors[successors[nextOwned]] = np.flatnonzero(nextOwned)
+    if keepEveryPoint:
+        isCorner = np.ones(nEdges, dtype=bool)
+    else:
+        isCorner = (predecessors < 0) | ~nextOwned
+        isCorner |= sides[predecessors] != sides
+
+    nextCorner = successors.copy()
+    pending = np.flatnonzero(nextOwned & ~isCorner[nextCorner])
+    while pending.size:
+        nextCorner[pending] = nextCorner[nextCorner[pending]]
+        pending = pending[~isCorner[nextCorner[pending]]]
+
+    corners = np.flatnonzero(isCorner)
+    cornerPixels = pixels[corners]
+    cornerY, cornerX = np.divmod(cornerPixels, width)
+    startOffsets = np.array(_SIDE_STARTS)[sides[corners]]
+    cornerXs = (cornerX + startOffsets[:, 0] - origin[0]).astype(np.int32)
+    cornerYs = (cornerY + startOffsets[:, 1] - origin[1]).astype(np.int32)
+    cornerNextEdges = np.where(nextOwned[corners], -1, nextEdges[corners])
+
+    cornerIndex = np.full(nEdges, -1, dtype=np.int64)
+    cornerIndex[corners] = np.arange(corners.size)
+    nextCornerIndex = np.where(nextOwned[corners], cornerIndex[nextCorner[corners]], -1)
+    openStarts = np.flatnonzero(predecessors[corners] < 0)
+    return (
+        cornerXs,
+        cornerYs,
+        edgeIds[corners],
+        cornerNextEdges,
+        nextCornerIndex,
+        cornerPixels,
+        openStarts,
+    )
+
+
+def _FollowCorners(corners, groups=None):
+    """
+    Follow the corners from _BoundaryCorners into walks, yielding each in turn.
+
+    Walks are found first as runs of corner ids, then their vertices are gathered
+    with one lookup into a packed (n, 2) int32 array, and each walk is yielded as a
+    view of it. With groups, a key per corner, walks are yielded group by group,
+    otherwise in edge order, in both cases after the open walks of their group.
+
+    Yields:
+    - (vertices, firstEdge, nextEdge, start) per walk, where nextEdge is the unowned
+      edge the walk continues into, or -1 for a closed ring, and start is the id of
+      the walk's first corner.
+    """
+    if corners is None:
+        return
+    xs, ys, edges, nextEdges, nextCorners, _, openStarts = corners
+    starts = np.concatenate([openStarts, np.arange(xs.size)])
+    if groups is not None:
+        starts = starts[np.argsort(groups[starts], kind="stable")]
+
+    nextCorners = nextCorners.tolist()
+    visited = bytearray(xs.size)
+    order = array("q")
+    bounds = array("q", [0])
+    for start in starts.tolist():
+        if visited[start]:
+            continue
+        current = start
+        while current >= 0 and not visited[current]:
+            visited[current] = 1
+            order.append(current)
+            current = nextCorners[current]
+        bounds.append(len(order))
+    del nextCorners, visited
+
+    order = np.frombuffer(order, dtype=np.int64)
+    vertices = np.column_stack((xs[order], ys[order]))
+    walkStarts = order[bounds[:-1]]
+    firstEdges = edges[walkStarts].tolist()
+    lastEdges = nextEdges[order[np.subtract(bounds[1:], 1)]].tolist()
+    walkStarts = walkStarts.tolist()
+    for walk, (begin, end) in enumerate(zip(bounds[:-1], bounds[1:])):
+        yield vertices[begin:end], firstEdges[walk], lastEdges[walk], walkStarts[walk]
+
+
+def _WalkBoundaries(keys, owned, keepEveryPoint=False, origin=(0, 0)):
+    """
+    Walk the boundary edges of the owned pixels of a key map.
+
+    Returns:
+    - A list of (vertices, firstEdge, nextEdge) walks as yielded by _FollowCorners.
+    """
+    corners = _BoundaryCorners(keys, owned, keepEveryPoint, origin)
+    return [walk[:3] for walk in _FollowCorners(corners)]
+
+
+def _PadLabels(labels):
+    """
+    Return the label map with a border of -1 around it, as the key map of a trace.
+    """
+    height, width = labels.shape
+    keys = np.full((height + 2, width + 2), -1, dtype=np.int32)
+    keys[1:-1, 1:-1] = labels
+    return keys
+
+
+def TraceContours(labels, regionColors, keepEveryPoint=False):
+    """
+    Trace the boundary rings of every labelled region in one pass over the label map.
+
+    Every pixel side that borders a different label is a directed edge with the
+    region on its left, so outer rings and hole rings fall out of the same walk and
+    fill correctly under the nonzero rule. Successors prefer the tight turn around
+    the same pixel, which keeps every ring inside one 4-connected region.
+
+    Parameters:
+    - labels: (height, width) label map from LabelRegions.
+    - regionColors: Packed colour of every region.
+    - keepEveryPoint: If True, keep a vertex at every pixel step instead of only
+      where the boundary changes direction.
+
+    Returns:
+    - A dict mapping each (r, g, b, a) colour to a list of shapes, one per region,
+      each a list of closed rings held as (n, 2) int32 arrays of (x, y) vertices.
+    """
+    keys = _PadLabels(labels)
+
+    labelRings = {}
+    for ring, firstEdge, _ in _WalkBoundaries(
+        keys, keys >= 0, keepEveryPoint, origin=(1, 1)
+    ):
+        label = int(keys.ravel()[firstEdge % keys.size])
+        labelRings.setdefault(label, []).append(ring)
+
+    return _GroupShapes(labelRings, regionColors)
+
+
+def StreamContours(labels, regionColors, keepEveryPoint=False):
+    """
+    Trace the same rings as TraceContours, but yield them one at a time, grouped by
+    colour.
+
+    Only the boundary corners are found up front, in packed arrays. Rings are
+    gathered from them as they are consumed, so no structure holding every ring as
+    Python objects is ever built.
+
+    Returns:
+    - The (r, g, b, a) colours, in the order their rings are yielded.
+    - A generator of (colour, ring) pairs, each ring a closed (n, 2) int32 array of
+      (x, y) vertices. All rings of one colour come together.
+    """
+    keys = _PadLabels(labels)
+    corners = _BoundaryCorners(keys, keys >= 0, keepEveryPoint, origin=(1, 1))
+    if corners is None:
+        return [], iter(())
+
+    uniqueColors, colorRanks = np.unique(regionColors, return_inverse=True)
+    cornerRanks = colorRanks.ravel()[keys.ravel()[corners[5]]]
+    del keys
+    ranks = np.unique(cornerRanks)
+    colors = [UnpackRgba(packed) for packed in uniqueColors[ranks]]
+    colorIndex = np.zeros(uniqueColors.size, dtype=np.int64)
+    colorIndex[ranks] = np.arange(ranks.size)
+    cornerColors = colorIndex[cornerRanks]
+
+    def Rings():
+        for ring, _, _, start in _FollowCorners(corners, cornerColors):
+            yield colors[cornerColors[start]], ring
+
+    return colors, Rings()
+
+
+def _GroupShapes(labelRings, regionColors):
+    """
+    Group rings by region into the per-colour shape lists the SVG writer takes.
+    """
+    colorShapes = {}
+    colorTuples = {}
+    for label in sorted(labelRings):
+        packed = int(regionColors[label])
+        if packed not in colorTuples:
+            colorTuples[packed] = UnpackRgba(packed)
+            colorShapes[colorTuples[packed]] = []
+        colorShapes[colorTuples[packed]].append(labelRings[label])
+    return colorShapes
+
+
+def _AbsoluteCurvedRingData(ring):
+    """
+    Encode a curved ring from SimplifyRing in absolute commands, for WritePathsSvg.
+    """
+    points = ring.tolist()
+    parts = [f" M {round(points[0][0])},{round(points[0][1])} "]
+    for (_, _, *controls), (nextX, nextY, *_) in zip(points, points[1:] + points[:1]):
+        end = f"{round(nextX)},{round(nextY)}"
+        if controls[0] != controls[0]:  # NaN marks a straight segment
+            parts.append(f" L {end} ")
+        else:
+            c1x, c1y, c2x, c2y = (_Number(value) for value in controls)
+            parts.append(f" C {c1x},{c1y} {c2x},{c2y} {end} ")
+    parts.append(" Z ")
+    return "".join(parts)
+
+
+def WritePathsSvg(colorShapes, size, out=None, instrumentation=NO_INSTRUMENTATION):
+    """
+    Write per-colour shapes as SVG paths, one <path> per shape.
+
+    The SVG is streamed to the text file handle out, or returned as a string if out is None.
+    The "writing" phase of instrumentation counts the paths written.
+    """
+    s = StringIO() if out is None else out
+
+    with instrumentation.Phase("writing", "paths") as phase:
+        s.write(SvgHeader(*size))
+        for color, shapes in colorShapes.items():
+            for shape in shapes:
+                s.write(' <path d=" ')
+                for ring in shape:
+                    if np.shape(ring)[1] == 6:
+                        s.write(_AbsoluteCurvedRingData(ring))
+                        continue
+                    here = ring[0]
+                    s.write(f" M {here[0]},{here[1]} ")
+                    for here in ring[1:]:
+                        s.write(f" L {here[0]},{here[1]} ")
+                    s.write(" Z ")
+                s.write(f'" style="{FillStyle(color)}" />\n')
+            phase.Add(len(shapes))
+        s.write("</svg>\n")
+
+    if out is None:
+        return s.getvalue()
+
+
+def CompactFill(rgba):
+    """
+    Return the shortest CSS declarations filling with an (r, g, b, a) colour, such as
+    "fill:#f80" or "fill:#ff8001;fill-opacity:.502".
+    """
+    r, g, b, a = (int(channel) for channel in rgba)
+    if r % 17 == g % 17 == b % 17 == 0:
+        fill = f"fill:#{r // 17:x}{g // 17:x}{b // 17:x}"
+    else:
+        fill = f"fill:#{r:02x}{g:02x}{b:02x}"
+    if a == 255:
+        return fill
+    opacity = f"{a / 255:.3f}".rstrip("0").rstrip(".").lstrip("0") or "0"
+    return f"{fill};fill-opacity:{opacity}"
+
+
+def _Pair(a, b):
+    """
+    Join two numbers of path data, with a space only where b has no minus sign.
+    """
+    return f"{a} {b}" if b >= 0 else f"{a}{b}"
+
+
+def _LineData(dx, dy):
+    """
+    Encode a relative straight step, with h or v where it is axis-aligned.
+    """
+    if dy == 0:
+        return f"h{dx}" if dx else ""
+    if dx == 0:
+        return f"v{dy}"
+    return f"l{_Pair(dx, dy)}"
+
+
+def _Number(value):
+    """
+    Format a coordinate of curved path data to a tenth of a pixel, as short as
+    possible.
+    """
+    text = f"{value:.1f}".rstrip("0").rstrip(".")
+    if text.startswith("0."):
+        text = text[1:]
+    elif text.startswith("-0."):
+        text = "-" + text[2:]
+    return "0" if text in ("", "-0") else text
+
+
+def _Numbers(values):
+    """
+    Join numbers of path data, with a space only where the next has no minus sign.
+    """
+    texts = [_Number(value) for value in values]
+    return texts[0] + "".join(
+        text if text.startswith("-") else " " + text for text in texts[1:]
+    )
+
+
+def _CurvedRingData(ring, start):
+    """
+    Encode the segments of a curved ring from SimplifyRing relative to its first
+    vertex, which is at start relative to the pen.
+    """
+    parts = [start]
+    points = ring.tolist()
+    for (x, y, *controls), (nextX, nextY, *_) in zip(points, points[1:] + points[:1]):
+        if controls[0] != controls[0]:  # NaN marks a straight segment
+            parts.append(_LineData(round(nextX - x), round(nextY - y)))
+        else:
+            parts.append(
+                "c"
+                + _Numbers(
+                    [
+                        controls[0] - x,
+                        controls[1] - y,
+                        controls[2] - x,
+                        controls[3] - y,
+                        nextX - x,
+                        nextY - y,
+                    ]
+                )
+            )
+    if parts[-1][:1] in ("h", "v", "l"):
+        parts.pop()
+    parts.append("z")
+    return "".join(parts)
+
+
+def EncodeRings(rings):
+    """
+    Encode rings as the path data of one path in relative commands, yielding the
+    data of one ring at a time.
+
+    The first ring starts with an absolute M and each later one with an m relative
+    to the previous ring's start, where the pen is left by its z. Horizontal and
+    vertical steps use h and v, and the closing step is left to z. Separators are
+    only written where a number would otherwise run into the next. Curved rings
+    from SimplifyRing use l and c for their segments instead.
+    """
+    penX = penY = None
+    for ring in rings:
+        ring = np.asarray(ring)
+        x, y = (round(value) for value in ring[0, :2].tolist())
+        if penX is None:
+            start = f"M{_Pair(x, y)}"
         else:
-            raise Exception("Failed to find connecting edge")
-    return pieces
+            start = f"m{_Pair(x - penX, y - penY)}"
+        penX, penY = x, y
+        if ring.shape[1] == 6:
+            yield _CurvedRingData(ring, start)
+            continue
+
+        points = ring.tolist()
+        parts = [start]
+        for nextX, nextY in points[1:]:
+            parts.append(_LineData(nextX - x, nextY - y))
+            x, y = nextX, nextY
+        parts.append("z")
+        yield "".join(parts)
+
+
+def WriteCompactPathsSvg(
+    colorShapes,
+    size,
+    out=None,
+    instrumentation=NO_INSTRUMENTATION,
+    cssClasses=True,
+    colors=None,
+):
+    """
+    Write per-colour shapes as compact SVG, one <path> per colour.
+
+    All shapes of a colour are merged into one path filled with the even-odd rule,
+    which fills exactly the pixels of that colour since its rings never cross. Path
+    data comes from EncodeRings and is written ring by ring. With cssClasses, fills
+    are declared once in a <style> block and paths refer to them by class,
+    otherwise each path carries its own fill attributes.
+
+    colorShapes is a dict of shapes by colour, or an iterable of (colour, shapes)
+    pairs consumed once, in which case colors lists the colours in the same order.
+
+    The SVG is streamed to the text file handle out, or returned as a string if out is None.
+    The "writing" phase of instrumentation counts the paths written.
+    """
+    s = StringIO() if out is None else out
+    if colors is None:
+        colors = list(colorShapes)
+    if isinstance(colorShapes, dict):
+        colorShapes = colorShapes.items()
+
+    with instrumentation.Phase("writing", "paths") as phase:
+        width, height = size
+        s.write(
+            f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}"'
+            f' viewBox="0 0 {width} {height}" fill-rule="evenodd">\n'
+        )
+        if cssClasses:
+            s.write("<style>")
+            for num, color in enumerate(colors):
+                s.write(f".c{num:x}{{{CompactFill(color)}}}")
+            s.write("</style>\n")
+        for num, (color, shapes) in enumerate(colorShapes):
+            if cssClasses:
+                fill = f'class="c{num:x}"'
+            else:
+                fill = " ".join(
+                    f'{name}="{value}"'
+                    for name, value in (
+                        declaration.split(":")
+                        for declaration in CompactFill(color).split(";")
+                    )
+                )
+            s.write(f'<path {fill} d="')
+            for ringData in EncodeRings(ring for shape in shapes for ring in shape):
+                s.write(ringData)
+            s.write('"/>\n')
+            phase.Add()
+        s.write("</svg>\n")
+
+    if out is None:
+        return s.getvalue()
+
+
+def JunctionKeys(packed, valid):
+    """
+    Find the pixel corners where boundaries of the packed colour array meet.
+
+    A corner is a junction when three or more colours, counting skipped pixels and
+    the outside of the image as one, surround it, or when two colours touch only
+    diagonally across it. Every other boundary corner lies on exactly one boundary
+    between two regions.
+
+    Returns:
+    - Sorted keys y * (width + 1) + x of the junction corners.
+    """
+    keys = np.pad(np.where(valid, packed.astype(np.int64), -1), 1, constant_values=-1)
+    topLeft, topRight = keys[:-1, :-1], keys[:-1, 1:]
+    bottomLeft, bottomRight = keys[1:, :-1], keys[1:, 1:]
+    distinct = (
+        1
+        + (topRight != topLeft)
+        + ((bottomLeft != topLeft) & (bottomLeft != topRight))
+        + (
+            (bottomRight != topLeft)
+            & (bottomRight != topRight)
+            & (bottomRight != bottomLeft)
+        )
+    )
+    diagonal = (
+        (topLeft == bottomRight) & (topRight == bottomLeft) & (topLeft != topRight)
+    )
+    return np.flatnonzero(((distinct >= 3) | diagonal).ravel())
+
+
+def _DouglasPeucker(points, pointKeys, tolerance, keep):
+    """
+    Mark in keep the vertices of an open chain that Douglas-Peucker decimation
+    retains, always including both ends.
+
+    Distances are compared through exact integer cross products and ties go to the
+    vertex with the smallest key, so a chain and its reverse keep the same vertices.
+    """
+    keep[0] = keep[-1] = True
+    pending = [(0, len(points) - 1)]
+    while pending:
+        first, last = pending.pop()
+        if last - first < 2:
+            continue
+        inner = points[first + 1 : last] - points[first]
+        dx, dy = (points[last] - points[first]).tolist()
+        if dx or dy:
+            distances = np.abs(inner[:, 0] * dy - inner[:, 1] * dx)
+            limit = tolerance * (dx * dx + dy * dy) ** 0.5
+        else:
+            distances = inner[:, 0] ** 2 + inner[:, 1] ** 2
+            limit = tolerance * tolerance
+        farthest = distances.max()
+        if farthest <= limit:
+            continue
+        candidates = np.flatnonzero(distances == farthest) + first + 1
+        split = int(candidates[np.argmin(pointKeys[candidates])])
+        keep[split] = True
+        pending += [(first, split), (split, last)]
+
+
+def _CurveControls(points, corners):
+    """
+    Return the cubic Bezier control points of each segment of a closed polygon,
+    as an (n, 4) array with NaN rows for segments left straight.
+
+    Tangents at smooth vertices point from the previous vertex to the next, as in
+    a Catmull-Rom spline, and control points sit a third of the segment along
+    them. At corners the segment leaves and arrives straight, so a segment between
+    two corners stays a line.
+    """
+    following = np.roll(points, -1, axis=0)
+    previous = np.roll(points, 1, axis=0)
+    lengths = np.hypot(*(following - points).T)[:, None]
+
+    tangents = following - previous
+    tangents /= np.maximum(np.hypot(*tangents.T), 1e-12)[:, None]
+    directions = (following - points) / np.maximum(lengths, 1e-12)
+    starts = np.where(corners[:, None], directions, tangents)
+    ends = np.where(np.roll(corners, -1)[:, None], directions, np.roll(tangents, -1, 0))
+
+    controls = np.hstack(
+        [points + starts * lengths / 3, following - ends * lengths / 3]
+    )
+    controls[corners & np.roll(corners, -1)] = np.nan
+    return controls
+
+
+def _DropStraightVertices(ring, kept, corners=None):
+    """
+    Drop the kept vertices lying on the straight line between their neighbours,
+    which junctions along a straight edge leave behind. The edge keeps its exact
+    course, so it still matches the rings that keep such a vertex.
+
+    With corners, a boolean array over kept, only vertices that are corners
+    between two corners are dropped, as only their segments are certain to stay
+    straight in every ring.
+    """
+    if kept.size < 3:
+        return kept
+    points = ring[kept]
+    incoming = points - np.roll(points, 1, axis=0)
+    outgoing = np.roll(points, -1, axis=0) - points
+    cross = incoming[:, 0] * outgoing[:, 1] - incoming[:, 1] * outgoing[:, 0]
+    dot = (incoming * outgoing).sum(axis=1)
+    straight = (cross == 0) & (dot > 0)
+    if corners is not None:
+        straight &= corners & np.roll(corners, 1) & np.roll(corners, -1)
+    return kept[~straight]
+
+
+def SimplifyRing(ring, junctionKeys, width, tolerance, curves=False, cornerAngle=60):
+    """
+    Simplify a ring traced with every point kept.
 
+    The ring is cut at the junctions on it, or, if it has none, at its smallest
+    corner key and the vertex farthest from it. Each piece is decimated by
+    _DouglasPeucker. Every piece lies on the boundary between the same two regions
+    whichever ring it is reached from, so neighbouring regions keep matching edges
+    and no gaps open between them.
 
-def RgbaImageToSvgContiguous(im, opaque=None, keepEveryPoint=False):
+    Parameters:
+    - ring: (n, 2) integer array of the ring's (x, y) vertices.
+    - junctionKeys: Junction corners of the image from JunctionKeys.
+    - width: Width of the image in pixels.
+    - tolerance: Farthest, in pixels, the simplified ring may stray from the traced one.
+    - curves: If True, join the kept vertices with cubic Bezier curves, see
+      _CurveControls, except at junctions and turns sharper than cornerAngle degrees.
+
+    Returns:
+    - The kept vertices as an (n, 2) int32 array or, with curves, an (n, 6) float
+      array whose last four columns hold the control points of the segment to the
+      next vertex, NaN where it is straight. None if fewer than three vertices are
+      kept, as the ring then encloses no area.
+    """
+    ring = np.asarray(ring, dtype=np.int64)
+    pointKeys = ring[:, 1] * (width + 1) + ring[:, 0]
+    positions = np.minimum(
+        np.searchsorted(junctionKeys, pointKeys), junctionKeys.size - 1
+    )
+    isJunction = (
+        junctionKeys[positions] == pointKeys
+        if junctionKeys.size
+        else np.zeros(pointKeys.size, dtype=bool)
+    )
+    cuts = np.flatnonzero(isJunction)
+    if not cuts.size:
+        start = int(np.argmin(pointKeys))
+        offsets = ring - ring[start]
+        distances = offsets[:, 0] ** 2 + offsets[:, 1] ** 2
+        candidates = np.flatnonzero(distances == distances.max())
+        far = int(candidates[np.argmin(pointKeys[candidates])])
+        cuts = np.array(sorted({start, far}))
+
+    # Walk from the first cut so every piece is a contiguous slice of the closed ring
+    order = np.roll(np.arange(ring.shape[0]), -int(cuts[0]))
+    closed = np.append(order, order[0])
+    cuts = np.append((cuts - cuts[0]) % ring.shape[0], ring.shape[0])
+    keep = np.zeros(closed.size, dtype=bool)
+    for first, last in zip(cuts[:-1], cuts[1:]):
+        piece = closed[first : last + 1]
+        _DouglasPeucker(
+            ring[piece], pointKeys[piece], tolerance, keep[first : last + 1]
+        )
+    kept = closed[:-1][keep[:-1]]
+    kept = _DropStraightVertices(ring, kept, isJunction[kept] if curves else None)
+    if kept.size < 3:
+        return None
+    if not curves:
+        return ring[kept].astype(np.int32)
+
+    points = ring[kept].astype(np.float64)
+    incoming = points - np.roll(points, 1, axis=0)
+    outgoing = np.roll(points, -1, axis=0) - points
+    cosines = (incoming * outgoing).sum(axis=1) / np.maximum(
+        np.hypot(*incoming.T) * np.hypot(*outgoing.T), 1e-12
+    )
+    corners = isJunction[kept] | (cosines < np.cos(np.radians(cornerAngle)))
+    return np.hstack([points, _CurveControls(points, corners)])
+
+
+def _SimplifiedRings(rings, junctionKeys, width, tolerance, curves):
+    for ring in rings:
+        simplified = SimplifyRing(ring, junctionKeys, width, tolerance, curves)
+        if simplified is not None:
+            yield simplified
+
+
+def SimplifyShapes(colorShapes, junctionKeys, width, tolerance, curves=False):
+    """
+    Simplify every ring of per-colour shapes with SimplifyRing, dropping rings and
+    shapes left without area.
+    """
+    simplified = {}
+    for color, shapes in colorShapes.items():
+        for shape in shapes:
+            rings = list(
+                _SimplifiedRings(shape, junctionKeys, width, tolerance, curves)
+            )
+            if rings:
+                simplified.setdefault(color, []).append(rings)
+    return simplified
+
+
+def RgbaImageToSvgContiguous(
+    im,
+    opaque=None,
+    keepEveryPoint=False,
+    out=None,
+    instrumentation=NO_INSTRUMENTATION,
+    compact=True,
+    simplify=None,
+    curves=False,
+):
     """
     Convert an RGBA image to SVG by grouping contiguous pixels of the same color into paths.
+
+    The SVG is streamed to the text file handle out, or returned as a string if out is None.
+    instrumentation records the "labeling", "edges" and "writing" phases. With compact,
+    paths are written by WriteCompactPathsSvg as StreamContours traces them, so
+    beyond the per-pixel arrays only one ring is held at a time. Otherwise every
+    shape is traced first and written as its own path by WritePathsSvg.
+
+    With simplify, rings are traced with every point and simplified to within that
+    many pixels by SimplifyRing, as curves if curves is set. Compact output
+    simplifies each ring as it is written, otherwise a "simplifying" phase is
+    recorded.
     """
-    # Define adjacent pixel offsets (right, down, left, up)
-    adjacent = ((1, 0), (0, 1), (-1, 0), (0, -1))
-    visited = Image.new("1", im.size, 0)
+    with instrumentation.Phase("labeling", "regions") as phase:
+        labels, regionColors = LabelRegions(im, opaque)
+        phase.Add(regionColors.size)
 
-    colorPixelLists = {}
+    if simplify:
+        packed = PackRgba(im)
+        junctionKeys = JunctionKeys(
+            packed, OpaqueMask(packed) if opaque else np.ones(packed.shape, dtype=bool)
+        )
+        del packed
+        keepEveryPoint = True
 
-    width, height = im.size
-    for x in tqdm(range(width), desc="Processing width"):
-        for y in tqdm(range(height), desc="Processing height", leave=False):
-            here = (x, y)
-            if visited.getpixel(here):
-                continue
-            rgba = im.getpixel(here)
-            if opaque and not rgba[3]:
-                continue
-            piece = []
-            queue = [here]
-            visited.putpixel(here, 1)
-            while queue:
-                current = queue.pop()
-                for offset in adjacent:
-                    neighbour = AddTuple(current, offset)
-                    if not (0 <= neighbour[0] < width) or not (
-                        0 <= neighbour[1] < height
-                    ):
-                        continue
-                    if visited.getpixel(neighbour):
-                        continue
-                    neighbourRgba = im.getpixel(neighbour)
-                    if neighbourRgba != rgba:
-                        continue
-                    queue.append(neighbour)
-                    visited.putpixel(neighbour, 1)
-                piece.append(current)
-
-            if rgba not in colorPixelLists:
-                colorPixelLists[rgba] = []
-            colorPixelLists[rgba].append(piece)
-
-    del adjacent
-    del visited
-
-    # Define edge positions relative to a pixel
-    edges = {
-        (-1, 0): ((0, 0), (0, 1)),
-        (0, 1): ((0, 1), (1, 1)),
-        (1, 0): ((1, 1), (1, 0)),
-        (0, -1): ((1, 0), (0, 0)),
-    }
+    if not compact:
+        with instrumentation.Phase("edges", "shapes") as phase:
+            colorShapes = TraceContours(labels, regionColors, keepEveryPoint)
+            phase.Add(sum(len(shapes) for shapes in colorShapes.values()))
+        del labels, regionColors
+        if simplify:
+            with instrumentation.Phase("simplifying", "shapes") as phase:
+                colorShapes = SimplifyShapes(
+                    colorShapes, junctionKeys, im.width, simplify, curves
+                )
+                phase.Add(sum(len(shapes) for shapes in colorShapes.values()))
+        return WritePathsSvg(colorShapes, im.size, out, instrumentation)
 
-    colorEdgeLists = {}
+    # Rings are traced while they are written, one at a time
+    with instrumentation.Phase("edges", "colors") as phase:
+        colors, colorRings = StreamContours(labels, regionColors, keepEveryPoint)
+        phase.Add(len(colors))
+    del labels, regionColors
 
-    for rgba, pieces in tqdm(colorPixelLists.items(), desc="Processing colors"):
-        for piecePixelList in tqdm(pieces, desc="Processing pieces", leave=False):
-            edgeSet = set()
-            for coord in tqdm(
-                piecePixelList, desc="Processing coordinates", leave=False
-            ):
-                for offset, (startOffset, endOffset) in edges.items():
-                    neighbour = AddTuple(coord, offset)
-                    start = AddTuple(coord, startOffset)
-                    end = AddTuple(coord, endOffset)
-                    edge = (start, end)
-                    if neighbour in piecePixelList:
-                        continue
-                    edgeSet.add(edge)
-            if rgba not in colorEdgeLists:
-                colorEdgeLists[rgba] = []
-            colorEdgeLists[rgba].append(edgeSet)
+    if simplify:
+        colorRings = (
+            (color, SimplifyRing(ring, junctionKeys, im.width, simplify, curves))
+            for color, ring in colorRings
+        )
+    # Rings simplified away still leave their colour's path, so classes stay in order
+    colorShapes = (
+        (color, ([ring] for _, ring in rings if ring is not None))
+        for color, rings in groupby(colorRings, key=itemgetter(0))
+    )
+    return WriteCompactPathsSvg(
+        colorShapes, im.size, out, instrumentation, colors=colors
+    )
 
-    del colorPixelLists
-    del edges
 
-    # Join edges of pixel groups to form continuous paths
-    colorJoinedPieces = {}
+# Width of the halo around each tile. Boundary edges of the tile's own pixels need
+# their neighbours, and the successor lookups need the neighbours' edges in turn.
+_TILE_HALO = 2
 
-    for color, pieces in tqdm(colorEdgeLists.items(), desc="Joining edges"):
-        colorJoinedPieces[color] = []
-        for assortedEdges in tqdm(
-            pieces, desc="Processing assorted edges", leave=False
-        ):
-            colorJoinedPieces[color].append(JoinedEdges(assortedEdges, keepEveryPoint))
-
-    s = StringIO()
-    s.write(SvgHeader(*im.size))
-
-    for color, shapes in tqdm(colorJoinedPieces.items(), desc="Writing SVG"):
-        for shape in tqdm(shapes, desc="Processing shapes", leave=False):
-            s.write(' <path d=" ')
-            for subShape in tqdm(shape, desc="Processing sub-shapes", leave=False):
-                here = subShape.pop(0)[0]
-                s.write(f" M {here[0]},{here[1]} ")
-                for edge in subShape:
-                    here = edge[0]
-                    s.write(f" L {here[0]},{here[1]} ")
-                s.write(" Z ")
-            s.write(
-                f'" style="fill:rgb{color[0:3]}; fill-opacity:{float(color[3]) / 255:.3f}; stroke:none;" />\n'
+
+def _TraceTile(block, pad, origin, imageSize, opaque, keepEveryPoint):
+    """
+    Label and trace one tile for RgbaImageToSvgTiled.
+
+    Parameters:
+    - block: Packed colours of the tile and as much of its halo as lies in the image.
+    - pad: (left, top, right, bottom) halo pixels missing from block at the image edge.
+    - origin: Image coordinates of the tile's top-left pixel.
+    - imageSize: (width, height) of the whole image, used to number edges globally.
+
+    Returns:
+    - regionColors: Packed colour of every local region.
+    - seams: Local labels along the tile's left, right, top and bottom borders.
+    - walks: (vertices, label, firstEdge, nextEdge) for every closed ring and every
+      chain cut by the tile border, with image coordinates and global edge ids.
+      nextEdge is the edge a chain continues into in another tile, -1 for rings.
+    """
+    valid = OpaqueMask(block) if opaque else np.ones(block.shape, dtype=bool)
+    keys = np.pad(
+        np.where(valid, block.astype(np.int64), -1),
+        ((pad[1], pad[3]), (pad[0], pad[2])),
+        constant_values=-1,
+    )
+    halo = _TILE_HALO
+    tileHeight = keys.shape[0] - 2 * halo
+    tileWidth = keys.shape[1] - 2 * halo
+    core = (slice(halo, halo + tileHeight), slice(halo, halo + tileWidth))
+
+    blockTop = halo - pad[1]
+    blockLeft = halo - pad[0]
+    labels, regionColors = LabelPacked(
+        block[blockTop : blockTop + tileHeight, blockLeft : blockLeft + tileWidth],
+        keys[core] >= 0,
+    )
+    seams = (labels[:, 0], labels[:, -1], labels[0, :], labels[-1, :])
+
+    owned = np.zeros(keys.shape, dtype=bool)
+    owned[core] = keys[core] >= 0
+    imageWidth, imageHeight = imageSize
+    keysWidth = keys.shape[1]
+
+    def GlobalEdge(edge):
+        side, pixel = divmod(edge, keys.size)
+        y, x = divmod(pixel, keysWidth)
+        x += origin[0] - halo
+        y += origin[1] - halo
+        return side * imageWidth * imageHeight + y * imageWidth + x
+
+    walks = []
+    for vertices, firstEdge, nextEdge in _WalkBoundaries(
+        keys,
+        owned,
+        keepEveryPoint,
+        origin=(halo - origin[0], halo - origin[1]),
+    ):
+        y, x = divmod(firstEdge % keys.size, keysWidth)
+        label = int(labels[y - halo, x - halo])
+        walks.append(
+            (
+                vertices,
+                label,
+                GlobalEdge(firstEdge),
+                GlobalEdge(nextEdge) if nextEdge >= 0 else -1,
+            )
+        )
+    return regionColors, seams, walks
+
+
+def _DropCollinear(ring):
+    """
+    Remove the vertices of a closed rectilinear (n, 2) ring that lie on a straight run.
+    """
+    before = np.roll(ring, 1, axis=0)
+    after = np.roll(ring, -1, axis=0)
+    straight = ((before == ring) & (ring == after)).any(axis=1)
+    return ring[~straight]
+
+
+def RgbaImageToSvgTiled(
+    im,
+    opaque=None,
+    keepEveryPoint=False,
+    out=None,
+    tileSize=512,
+    workers=None,
+    progress=True,
+    instrumentation=NO_INSTRUMENTATION,
+    compact=True,
+    simplify=None,
+    curves=False,
+):
+    """
+    Convert an RGBA image to SVG like RgbaImageToSvgContiguous, one tile at a time.
+
+    Tiles are labelled and traced in a process pool, each with a small halo so its
+    boundary edges and their successors match a whole-image trace. Regions that
+    touch across a seam are merged with a union-find over the tiles' border labels,
+    and boundary chains cut by the seams are joined back into closed rings by the
+    edge they continue into. Working memory per worker scales with tileSize, and
+    only a few tiles are queued at a time.
+
+    Parameters:
+    - im: RGBA image.
+    - opaque: If True, ignore fully transparent pixels.
+    - keepEveryPoint: If True, retain every point in the path edges.
+    - out: Text file handle to stream the SVG to. If None, the SVG is returned.
+    - tileSize: Width and height of each tile in pixels.
+    - workers: Number of worker processes. Defaults to the CPU count; 1 traces
+      the tiles in this process.
+    - progress: If False, hide the tile progress bar.
+    - instrumentation: Records the "tiles", "seams", "joining" and "writing" phases.
+      Labeling and edge extraction happen inside the tiles.
+    - compact: Write paths with WriteCompactPathsSvg rather than WritePathsSvg.
+    - simplify, curves: Simplify the joined rings, see RgbaImageToSvgContiguous,
+      in a "simplifying" phase.
+
+    Returns:
+    - The SVG as a string if out is None, otherwise None.
+    """
+    packed = PackRgba(im)
+    height, width = packed.shape
+    if simplify:
+        junctionKeys = JunctionKeys(
+            packed, OpaqueMask(packed) if opaque else np.ones(packed.shape, dtype=bool)
+        )
+        keepEveryPoint = True
+    halo = _TILE_HALO
+    tilesAcross = -(-width // tileSize)
+    tilesDown = -(-height // tileSize)
+
+    def TileArgs(index):
+        tileY, tileX = divmod(index, tilesAcross)
+        x0, y0 = tileX * tileSize, tileY * tileSize
+        x1, y1 = min(x0 + tileSize, width), min(y0 + tileSize, height)
+        bx0, by0 = max(x0 - halo, 0), max(y0 - halo, 0)
+        bx1, by1 = min(x1 + halo, width), min(y1 + halo, height)
+        pad = (bx0 - (x0 - halo), by0 - (y0 - halo), x1 + halo - bx1, y1 + halo - by1)
+        block = packed[by0:by1, bx0:bx1].copy()
+        return block, pad, (x0, y0), (width, height), opaque, keepEveryPoint
+
+    nTiles = tilesAcross * tilesDown
+    results = [None] * nTiles
+    with instrumentation.Phase("tiles", "tiles") as phase:
+        progressBar = tqdm(total=nTiles, desc="Tracing tiles", disable=not progress)
+        if workers == 1:
+            for index in range(nTiles):
+                results[index] = _TraceTile(*TileArgs(index))
+                progressBar.update()
+        else:
+            workers = workers or os.cpu_count()
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                # Submit tiles as earlier ones finish so only a few blocks are in flight
+                pending = {}
+                for index in range(nTiles):
+                    if len(pending) >= 2 * workers:
+                        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            results[pending.pop(future)] = future.result()
+                            progressBar.update()
+                    pending[executor.submit(_TraceTile, *TileArgs(index))] = index
+                for future in as_completed(pending):
+                    results[pending[future]] = future.result()
+                    progressBar.update()
+        progressBar.close()
+        phase.Add(nTiles)
+
+    del packed
+
+    with instrumentation.Phase("seams", "links") as phase:
+        offsets = np.cumsum([0] + [result[0].size for result in results])
+        regionColors = np.concatenate([result[0] for result in results])
+
+        # Merge regions across seams where border pixels of the same colour touch
+        linkedA = []
+        linkedB = []
+        for index, (_, seams, _) in enumerate(results):
+            tileY, tileX = divmod(index, tilesAcross)
+            neighbours = []
+            if tileX + 1 < tilesAcross:
+                neighbours.append((index + 1, seams[1], 0))
+            if tileY + 1 < tilesDown:
+                neighbours.append((index + tilesAcross, seams[3], 2))
+            for neighbour, border, facing in neighbours:
+                other = results[neighbour][1][facing]
+                a = border.astype(np.int64) + offsets[index]
+                b = other.astype(np.int64) + offsets[neighbour]
+                touching = (border >= 0) & (other >= 0)
+                touching[touching] = (
+                    regionColors[a[touching]] == regionColors[b[touching]]
+                )
+                linkedA.append(a[touching])
+                linkedB.append(b[touching])
+        roots = _UnionRuns(
+            regionColors.size,
+            np.concatenate(linkedA) if linkedA else np.empty(0, dtype=np.int64),
+            np.concatenate(linkedB) if linkedB else np.empty(0, dtype=np.int64),
+        )
+        phase.Add(sum(link.size for link in linkedA))
+
+    with instrumentation.Phase("joining", "chains") as phase:
+        # Join chains cut by the seams, in tile order so the output is deterministic
+        labelRings = {}
+        chains = {}
+        for index, (_, _, walks) in enumerate(results):
+            for vertices, label, firstEdge, nextEdge in walks:
+                root = int(roots[offsets[index] + label])
+                if nextEdge < 0:
+                    labelRings.setdefault(root, []).append(vertices)
+                else:
+                    chains[firstEdge] = (vertices, nextEdge, root)
+        del results
+
+        joined = set()
+        for firstEdge, (_, _, root) in chains.items():
+            if firstEdge in joined:
+                continue
+            pieces = []
+            edge = firstEdge
+            while edge not in joined:
+                joined.add(edge)
+                vertices, edge, _ = chains[edge]
+                pieces.append(vertices)
+            ring = np.concatenate(pieces)
+            labelRings.setdefault(root, []).append(
+                ring if keepEveryPoint else _DropCollinear(ring)
             )
+        phase.Add(len(chains))
+    del chains
 
-    s.write("</svg>\n")
-    return s.getvalue()
+    colorShapes = _GroupShapes(labelRings, regionColors)
+    if simplify:
+        with instrumentation.Phase("simplifying", "shapes") as phase:
+            colorShapes = SimplifyShapes(
+                colorShapes, junctionKeys, width, simplify, curves
+            )
+            phase.Add(sum(len(shapes) for shapes in colorShapes.values()))
 
+    writer = WriteCompactPathsSvg if compact else WritePathsSvg
+    return writer(colorShapes, im.size, out, instrumentation)
 
-def PngToSvg(filename, contiguous=None, opaque=None, keepEveryPoint=None):
+
+def PngToSvg(
+    filename,
+    contiguous=None,
+    opaque=None,
+    keepEveryPoint=None,
+    merge=None,
+    output=None,
+    progress=True,
+    tileSize=None,
+    tileWorkers=None,
+    instrumentation=NO_INSTRUMENTATION,
+    compact=True,
+    svgz=None,
+    colors=None,
+    tolerance=None,
+    minArea=None,
+    simplify=None,
+    curves=False,
+    keepSmaller=False,
+):
     """
     Convert a PNG file to SVG format.
 
@@ -224,55 +1406,394 @@ def PngToSvg(filename, contiguous=None, opaque=None, keepEveryPoint=None):
     - contiguous: If True, group contiguous pixels of the same color into paths.
     - opaque: If True, ignore fully transparent pixels.
     - keepEveryPoint: If True, retain every point in the path edges.
+    - merge: Rect merging mode for pixel output: None, "runs" or "spans".
+    - output: Path or text file handle to stream the SVG to.
+    - progress: If False, hide the tile progress bar of tiled tracing.
+    - tileSize: If set, trace contiguous output in tiles of this size in parallel.
+    - tileWorkers: Number of worker processes for tiled tracing.
+    - instrumentation: Records the time, item count and memory of each phase.
+    - compact: If True, write contiguous output as one even-odd path per colour in
+      relative commands, with fills shared through CSS classes.
+    - svgz: If True, gzip the SVG written to an output path. Defaults to whether
+      the path ends in .svgz.
+    - colors, tolerance, minArea: Simplify the image's colours first, see
+      ReduceColors. Anti-aliased images then trace to far fewer regions.
+    - simplify: If set, simplify contiguous paths to within this many pixels, see
+      SimplifyRing, so pixel staircases become straight lines. Edges are only
+      simplified between junctions, where three regions meet, and nearly every
+      edge vertex of an anti-aliased image is one, so such images need colors or
+      minArea as well.
+    - curves: With simplify, fit cubic Bezier curves through the simplified
+      vertices.
+    - keepSmaller: With simplify, also trace the image without simplifying, in a
+      "comparing" phase, and write that SVG instead if it is smaller. Both are
+      held in memory, so output is only written once they are complete.
 
     Returns:
-    - A string containing the SVG representation of the image.
+    - A string containing the SVG representation of the image, or None if output was given.
+
+    Raises:
+    - IOError: If the input cannot be opened as an image.
     """
     try:
         im = Image.open(filename)
-    except IOError:
-        sys.stderr.write(f"{filename}: Could not open as image file\n")
-        sys.exit(1)
+    except IOError as e:
+        raise IOError(f"{filename}: Could not open as image file") from e
     imRgba = im.convert("RGBA")
+    if colors or tolerance or minArea:
+        with instrumentation.Phase("reducing", "pixels") as phase:
+            imRgba = ReduceColors(imRgba, colors, tolerance, minArea)
+            phase.Add(imRgba.width * imRgba.height)
 
-    if contiguous:
-        return RgbaImageToSvgContiguous(imRgba, opaque, keepEveryPoint)
+    if output is None or hasattr(output, "write"):
+        svgFile = nullcontext(output)
+    elif svgz or (svgz is None and Path(output).suffix == ".svgz"):
+        # A fixed mtime keeps the output identical for identical input
+        svgFile = TextIOWrapper(
+            gzip.GzipFile(output, "wb", compresslevel=9, mtime=0), encoding="utf-8"
+        )
     else:
-        return RgbaImageToSvgPixels(imRgba, opaque)
+        svgFile = open(output, "w", encoding="utf-8")
+
+    def Trace(out, simplify, curves, progress, instrumentation):
+        if contiguous and tileSize:
+            return RgbaImageToSvgTiled(
+                imRgba,
+                opaque,
+                keepEveryPoint,
+                out,
+                tileSize,
+                tileWorkers,
+                progress,
+                instrumentation,
+                compact,
+                simplify,
+                curves,
+            )
+        elif contiguous:
+            return RgbaImageToSvgContiguous(
+                imRgba,
+                opaque,
+                keepEveryPoint,
+                out,
+                instrumentation,
+                compact,
+                simplify,
+                curves,
+            )
+        else:
+            return RgbaImageToSvgPixels(
+                imRgba, opaque, merge, out, instrumentation=instrumentation
+            )
+
+    with svgFile as out:
+        if not (contiguous and simplify and keepSmaller):
+            return Trace(out, simplify, curves, progress, instrumentation)
+
+        svg = Trace(None, simplify, curves, progress, instrumentation)
+        with instrumentation.Phase("comparing", "bytes") as phase:
+            plain = Trace(None, None, False, False, NO_INSTRUMENTATION)
+            phase.Add(len(plain))
+        if len(plain) < len(svg):
+            svg = plain
+        if out is None:
+            return svg
+        out.write(svg)
+
+
+def _ConvertFile(inputPath, outputPath, options):
+    """
+    Convert one file for BatchPngToSvg, returning (inputPath, seconds, error).
+
+    The SVG is written to a temporary file and moved into place, so a failed
+    conversion never leaves a truncated output behind.
+    """
+    start = time.perf_counter()
+    tempPath = outputPath.with_name(outputPath.name + ".tmp")
+    try:
+        outputPath.parent.mkdir(parents=True, exist_ok=True)
+        PngToSvg(inputPath, output=tempPath, progress=False, **options)
+        os.replace(tempPath, outputPath)
+        error = None
+    except Exception as e:
+        tempPath.unlink(missing_ok=True)
+        error = f"{type(e).__name__}: {e}"
+    return inputPath, time.perf_counter() - start, error
+
+
+def _CacheKey(cache, inputPath, options):
+    """
+    Build the AssetCache key for converting inputPath with the given PngToSvg options.
+    """
+    params = {
+        name: value
+        for name, value in options.items()
+        if name not in ("progress", "tileSize", "tileWorkers", "instrumentation")
+    }
+    return cache.Key("PngToSvg", cache.FileHash(inputPath), params)
+
+
+def BatchPngToSvg(
+    inputDir, outputDir, pattern="*.png", workers=None, cache=None, **options
+):
+    """
+    Convert every image in a directory to SVG across a process pool.
+
+    Parameters:
+    - inputDir: Directory to search for input images.
+    - outputDir: Directory to write SVGs to, mirroring the input layout. They are
+      written as .svgz files when options has svgz set.
+    - pattern: Glob pattern, relative to inputDir, selecting the input files.
+    - workers: Number of worker processes. Defaults to the CPU count.
+    - cache: Optional AssetCache; unchanged inputs reuse their previous SVG.
+    - options: Keyword arguments passed on to PngToSvg.
+
+    Returns:
+    - A list of (inputPath, seconds, error) tuples in completion order, where error
+      is None for successful conversions. A failing file never stops the batch.
+    """
+    inputDir = Path(inputDir)
+    outputDir = Path(outputDir)
+    inputPaths = sorted(path for path in inputDir.glob(pattern) if path.is_file())
+    suffix = ".svgz" if options.get("svgz") else ".svg"
+
+    results = []
+    pending = []
+    for inputPath in inputPaths:
+        outputPath = (outputDir / inputPath.relative_to(inputDir)).with_suffix(suffix)
+        start = time.perf_counter()
+        if cache is not None and cache.GetFile(
+            _CacheKey(cache, inputPath, options), outputPath
+        ):
+            seconds = time.perf_counter() - start
+            log.info(f"{inputPath}: cached, {seconds:.3f}s")
+            results.append((inputPath, seconds, None))
+        else:
+            pending.append((inputPath, outputPath))
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(_ConvertFile, inputPath, outputPath, options): outputPath
+            for inputPath, outputPath in pending
+        }
+        for future in tqdm(
+            as_completed(futures), desc="Converting images", total=len(futures)
+        ):
+            inputPath, seconds, error = future.result()
+            if error is None:
+                log.info(f"{inputPath}: {seconds:.3f}s")
+                if cache is not None:
+                    cache.PutFile(_CacheKey(cache, inputPath, options), futures[future])
+            else:
+                log.error(f"{inputPath}: failed after {seconds:.3f}s: {error}")
+            results.append((inputPath, seconds, error))
+    return results
 
 
 def Main():
     """
     Main function to execute the PNG to SVG conversion.
+
+    Converts a single image, or every image matching --pattern when the input is a
+    directory.
     """
-    # Define the input and output file paths
-    inputFilePath = "/Users/kadengruizenga/Development/Projects/WolverineAccess/Assets/Media/WolverineAccessBanner.png"
-    outputFilePath = "/Users/kadengruizenga/Development/Projects/WolverineAccess/Assets/Media/WolverineAccessBanner.svg"
+    mediaDir = Path(__file__).resolve().parent.parent / "Assets" / "Media"
 
-    # Define conversion options
-    contiguous = True  # Set to True to group contiguous pixels into paths
-    opaque = True  # Set to True to ignore fully transparent pixels
-    keepEveryPoint = False  # Set to True to retain every point in the path edges
+    parser = argparse.ArgumentParser(description="Convert PNG images to SVG.")
+    parser.add_argument(
+        "input",
+        nargs="?",
+        type=Path,
+        default=mediaDir / "WolverineAccessBanner.png",
+        help="Input image, or a directory of images to convert in batch.",
+    )
+    parser.add_argument(
+        "output",
+        nargs="?",
+        type=Path,
+        help="Output SVG file or directory. Defaults to next to the input.",
+    )
+    parser.add_argument(
+        "--pattern", default="*.png", help="Glob selecting images in batch mode."
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        help="Number of worker processes for batch mode or tiled tracing.",
+    )
+    parser.add_argument(
+        "--pixels",
+        dest="contiguous",
+        action="store_false",
+        help="Emit rects instead of grouping contiguous pixels into paths.",
+    )
+    parser.add_argument(
+        "--keep-transparent",
+        dest="opaque",
+        action="store_false",
+        help="Keep fully transparent pixels.",
+    )
+    parser.add_argument(
+        "--keep-every-point",
+        action="store_true",
+        help="Retain every point in the path edges.",
+    )
+    parser.add_argument(
+        "--merge",
+        choices=("runs", "spans"),
+        help="Rect merging mode for --pixels output.",
+    )
+    parser.add_argument(
+        "--tile-size",
+        type=int,
+        help="Trace contiguous output in tiles of this size, in parallel.",
+    )
+    parser.add_argument(
+        "--no-cache",
+        dest="cache",
+        action="store_false",
+        help="Reconvert every image instead of reusing cached SVGs.",
+    )
+    parser.add_argument(
+        "--verbose-paths",
+        dest="compact",
+        action="store_false",
+        help="Write one path per shape in absolute commands with inline styles.",
+    )
+    parser.add_argument(
+        "--colors",
+        type=int,
+        help="Reduce the image to an adaptive palette of this many colours first.",
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=int,
+        help="Join neighbouring pixels whose channels differ by at most this first.",
+    )
+    parser.add_argument(
+        "--min-area",
+        type=int,
+        help="Absorb regions smaller than this many pixels into a neighbour first.",
+    )
+    parser.add_argument(
+        "--simplify",
+        type=float,
+        metavar="PIXELS",
+        help="Simplify contiguous paths to within this many pixels of the traced edges."
+        " Anti-aliased images also need --colors or --min-area to simplify much.",
+    )
+    parser.add_argument(
+        "--curves",
+        action="store_true",
+        help="With --simplify, fit cubic Bezier curves through the simplified paths.",
+    )
+    parser.add_argument(
+        "--keep-smaller",
+        action="store_true",
+        help="With --simplify, also trace without simplifying and keep the smaller SVG.",
+    )
+    parser.add_argument(
+        "--svgz",
+        action="store_true",
+        help="Gzip the output as .svgz. Implied by an output path ending in .svgz.",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Print the time and item count of each conversion phase.",
+    )
+    parser.add_argument(
+        "--profile-memory",
+        action="store_true",
+        help="With --profile or --trace, also record each phase's peak memory.",
+    )
+    parser.add_argument(
+        "--trace",
+        type=Path,
+        help="Write the conversion phases to this JSON file.",
+    )
+    args = parser.parse_args()
 
     log.setLevel(
         logging.DEBUG
     )  # Set logging level (DEBUG, INFO, WARNING, ERROR, CRITICAL)
 
-    # Perform the conversion
-    svgOutput = PngToSvg(
-        inputFilePath,
-        contiguous=contiguous,
-        opaque=opaque,
-        keepEveryPoint=keepEveryPoint,
-    )
+    options = {
+        "contiguous": args.contiguous,
+        "opaque": args.opaque,
+        "keepEveryPoint": args.keep_every_point,
+        "merge": args.merge,
+        "tileSize": args.tile_size,
+        "compact": args.compact,
+        "colors": args.colors,
+        "tolerance": args.tolerance,
+        "minArea": args.min_area,
+        "simplify": args.simplify,
+        "curves": args.curves,
+        "keepSmaller": args.keep_smaller,
+        "svgz": args.svgz
+        or (args.output is not None and args.output.suffix == ".svgz"),
+    }
 
-    # Write the SVG output to the specified file
-    try:
-        with open(outputFilePath, "w", encoding="utf-8") as svgFile:
-            svgFile.write(svgOutput)
-        print(f"SVG file successfully created at: {outputFilePath}")
-    except IOError as e:
-        sys.stderr.write(f"Failed to write SVG file: {e}\n")
+    with AssetCache() if args.cache else nullcontext() as cache:
+        if args.input.is_dir():
+            outputDir = args.output or args.input
+            start = time.perf_counter()
+            # Files are already spread over the pool, so tiles are traced in-process
+            results = BatchPngToSvg(
+                args.input,
+                outputDir,
+                args.pattern,
+                args.workers,
+                cache,
+                tileWorkers=1,
+                **options,
+            )
+            failures = [result for result in results if result[2] is not None]
+            print(
+                f"Converted {len(results) - len(failures)} of {len(results)} images"
+                f" in {time.perf_counter() - start:.2f}s"
+            )
+        else:
+            outputFilePath = args.output or args.input.with_suffix(
+                ".svgz" if options["svgz"] else ".svg"
+            )
+            failures = []
+            instrumentation = Instrumentation(
+                enabled=args.profile or args.trace is not None,
+                memory=args.profile_memory,
+            )
+
+            # Perform the conversion, streaming the SVG output to the specified file
+            try:
+                key = _CacheKey(cache, args.input, options) if cache else None
+                if key is None or not cache.GetFile(key, outputFilePath):
+                    PngToSvg(
+                        args.input,
+                        output=outputFilePath,
+                        tileWorkers=args.workers,
+                        instrumentation=instrumentation,
+                        **options,
+                    )
+                    if key is not None:
+                        cache.PutFile(key, outputFilePath)
+                print(f"SVG file successfully created at: {outputFilePath}")
+            except IOError as e:
+                failures.append((args.input, 0.0, e))
+            finally:
+                instrumentation.Close()
+
+            if args.profile and instrumentation.phases:
+                print(instrumentation.Summary())
+            if args.trace is not None and instrumentation.phases:
+                instrumentation.WriteTrace(args.trace)
+
+        if cache is not None:
+            print(cache.Report())
+
+    for inputPath, _, error in failures:
+        sys.stderr.write(f"Failed to convert {inputPath}: {error}\n")
+    if failures:
         sys.exit(1)
 
 